@@ -4,13 +4,14 @@ Objetivo: Clase para control de router de ANN
 Cambios:
     1. Creacion de clase pmarin 05-07-2025
     2. Implementación de control de excepciones robusto pmarin 06-07-2025
+    3. Respuesta serializada directo a bytes JSON, sin conversión recursiva de tipos numpy 19-10-2026
 """
 from fastapi import APIRouter, Query, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import logging
-from typing import Dict, Any
 
 from api.services.Service_Ann import Service_Ann
+from src.utils.serializacion import a_json_bytes
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -63,7 +64,7 @@ class Route_Ann:
             )
 
     def obtener_modelo(self, precipitacion,  temperatura_max, temperatura_min,
-                       humedad_aire, ph_suelo) -> Dict[str, Any]:
+                       humedad_aire, ph_suelo) -> Response:
         """
         Obtiene predicción del modelo ANN usando Service_Ann
         Sigue el mismo patrón que la ejecución manual
@@ -101,8 +102,8 @@ class Route_Ann:
                 "status": "success"
             }
 
-            # Convertir tipos numpy a tipos nativos de Python antes de retornar
-            return self.convertir_numpy_a_python(respuesta)
+            # Los escalares y arreglos numpy se serializan directamente, sin copiar la respuesta
+            return Response(content=a_json_bytes(respuesta), media_type="application/json")
 
         except HTTPException:
             # Re-lanzar HTTPExceptions para que FastAPI las maneje correctamente
@@ -128,22 +129,3 @@ class Route_Ann:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Error interno del servidor. Contacte al administrador."
             )
-
-    def convertir_numpy_a_python(self, obj):
-        """
-        Convierte tipos numpy a tipos nativos de Python para serialización JSON
-        """
-        import numpy as np
-
-        if isinstance(obj, dict):
-            return {key: self.convertir_numpy_a_python(value) for key, value in obj.items()}
-        elif isinstance(obj, list):
-            return [self.convertir_numpy_a_python(item) for item in obj]
-        elif isinstance(obj, np.integer):
-            return int(obj)
-        elif isinstance(obj, np.floating):
-            return float(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        else:
-            return obj
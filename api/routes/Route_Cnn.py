@@ -7,15 +7,19 @@ Cambios:
 
     1. Creacion de clase pmarin 05-07-2025
     2. Implementación de control de excepciones robusto pmarin 06-07-2025
+    3. Probabilidades, top-k y confianza en la respuesta 19-10-2026
+    4. Respuesta armada sobre el fragmento JSON preserializado del diagnóstico 19-10-2026
+    5. Serialización con src.utils.serializacion 19-10-2026
 """
 import io
 
 from PIL import Image
 from fastapi import APIRouter, Query, HTTPException, status, UploadFile, File
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import logging
 from typing import Dict, Any
 from api.services.Service_Cnn import Service_Cnn
+from src.utils.serializacion import a_json_bytes
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -64,7 +68,7 @@ class Route_Cnn:
                 detail=f"Error interno al obtener router: {str(e)}"
             )
 
-    def obtener_modelo(self, file: UploadFile = File(...)) -> Dict[str, Any]:
+    def obtener_modelo(self, file: UploadFile = File(...)) -> Response:
         """
         Procesa una imagen para detectar enfermedades en papas usando CNN
 
@@ -72,7 +76,7 @@ class Route_Cnn:
             file: Archivo de imagen subido
 
         Returns:
-            Dict con el resultado del diagnóstico
+            Response JSON con el resultado del diagnóstico
         """
         try:
             # Validar tipo de archivo
@@ -97,27 +101,27 @@ class Route_Cnn:
             # Registro de operación exitosa
             logger.info(f"Diagnóstico exitoso para imagen: {file.filename}")
 
-            # Respuesta exitosa con información detallada del diagnóstico
-            return {
-                "mensaje": "Diagnóstico completado exitosamente",
-                "archivo": file.filename,
-                "diagnostico": {
-                    "resultado": resultado_diagnostico["emoji_resultado"],
-                    "estado": resultado_diagnostico["mensaje_estado"],
-                    "severidad": resultado_diagnostico["severidad"],
-                    "descripcion": resultado_diagnostico["descripcion"],
-                    "recomendacion": resultado_diagnostico["recomendacion"],
-                    "acciones_sugeridas": resultado_diagnostico["acciones_sugeridas"]
-                },
-                "metadata": {
-                    "tipo_mensaje": resultado_diagnostico["tipo_mensaje"],
-                    "icono_estado": resultado_diagnostico["icono_estado"],
-                    "color_metrica": resultado_diagnostico["color_metrica"]
-                },
-                "timestamp": None,  # Se podría agregar timestamp si es necesario
-                "status": "success"
+            prediccion = {
+                "clase": resultado_diagnostico["clase"],
+                "probabilidades": resultado_diagnostico["probabilidades"],
+                "top_k": resultado_diagnostico["top_k"],
+                "confianza": resultado_diagnostico["confianza"],
+                "baja_confianza": resultado_diagnostico["baja_confianza"]
             }
 
+            # Respuesta exitosa: las secciones "diagnostico" y "metadata" vienen ya serializadas
+            # del catálogo; solo se serializan el nombre del archivo y la predicción
+            contenido = b"".join([
+                '{"mensaje":"Diagnóstico completado exitosamente","archivo":'.encode("utf-8"),
+                a_json_bytes(file.filename),
+                b",",
+                servicio_cnn.fragmento_respuesta(resultado_diagnostico["clase"]),
+                b',"prediccion":',
+                a_json_bytes(prediccion),
+                b',"timestamp":null,"status":"success"}'  # Se podría agregar timestamp si es necesario
+            ])
+            return Response(content=contenido, media_type="application/json")
+
         except HTTPException:
             # Re-lanzar HTTPExceptions para que FastAPI las maneje correctamente
             raise
@@ -7,20 +7,40 @@ Cambios:
 
     1. Creacion de clase pmarin 05-07-2025
     2. Implementación de control de excepciones robusto pmarin 06-07-2025
+    3. Respuesta serializada directo a bytes; Arrow IPC o Parquet según el encabezado Accept 19-10-2026
+    4. Lectura en flujo del archivo subido, solo con las columnas del modelo; límite de 500MB 19-10-2026
+    5. Parámetro solo_ventana para leer únicamente la ventana final; archivos Parquet 19-10-2026
+    6. Parámetro escenarios para devolver bandas de pronóstico por cuantiles 19-10-2026
+    7. Predicción de la historia completa en el pool de hilos, como la de la ventana 19-10-2026
 """
-import io
+import csv
+import codecs
+from typing import BinaryIO, List, Tuple
 
 import pandas as pd
-from fastapi import APIRouter, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, HTTPException, status, UploadFile, File, Request, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
 import logging
-from typing import Dict, Any
 from api.services.Service_Rnn import Service_Rnn
+from src.train.rnn import FORMATOS_FECHA_CSV, convertir_fechas
+from src.utils.serializacion import (TIPO_ARROW, TIPO_JSON, dataframe_a_arrow, dataframe_a_json,
+                                     dataframe_a_parquet, negociar_formato, objeto_json)
 
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Columnas que usa el modelo; el resto del archivo no se carga
+COLUMNAS_MODELO = ['fecha', 'lluvia', 'humedad', 'temperatura', 'produccion']
+
+# El archivo se lee en flujo desde el temporal de la subida, la memoria no depende de su tamaño
+TAMANO_MAXIMO_MB = 500
+
+# Bloques de lectura del CSV
+TAMANO_BLOQUE_CSV = 4 * 1024 * 1024
+
 class Route_Rnn:
     def __init__(self):
         try:
@@ -65,7 +85,102 @@ class Route_Rnn:
                 detail=f"Error interno al obtener router: {str(e)}"
             )
 
-    async def obtener_modelo(self, file: UploadFile = File(...)) -> Dict[str, Any]:
+    @staticmethod
+    def _leer_csv(archivo: BinaryIO) -> Tuple[pd.DataFrame, List[str]]:
+        """
+        Lee un CSV por bloques con el lector en flujo de Arrow, convirtiendo solo COLUMNAS_MODELO.
+        Sin pyarrow se usa pandas con usecols sobre el mismo archivo.
+
+        Args:
+            archivo (BinaryIO): Archivo binario posicionado al inicio
+
+        Returns:
+            Tuple[pd.DataFrame, List[str]]: Datos del modelo y columnas del encabezado
+        """
+        # El encabezado se valida antes de leer los datos
+        columnas = next(csv.reader([codecs.decode(archivo.readline(), 'utf-8-sig')]), [])
+        columnas = [columna.strip() for columna in columnas]
+        if not columnas:
+            raise pd.errors.EmptyDataError("El archivo no tiene encabezado")
+        faltantes = [columna for columna in COLUMNAS_MODELO if columna not in columnas]
+        if faltantes:
+            raise KeyError(f"Columnas faltantes en el archivo: {', '.join(faltantes)}")
+        archivo.seek(0)
+
+        try:
+            import pyarrow as pa
+            from pyarrow import csv as pa_csv
+        except ImportError:
+            df = pd.read_csv(archivo, usecols=COLUMNAS_MODELO, encoding='utf-8-sig')
+            df['fecha'] = convertir_fechas(df['fecha'])
+            return df, columnas
+
+        # Tipos fijos: el lector en flujo infiere el tipo solo con el primer bloque, y un decimal
+        # que aparece después en una columna inferida como entera haría fallar la lectura
+        tipos = {columna: pa.float64() for columna in COLUMNAS_MODELO if columna != 'fecha'}
+        tipos['fecha'] = pa.timestamp('s')
+        lector = pa_csv.open_csv(
+            archivo,
+            read_options=pa_csv.ReadOptions(block_size=TAMANO_BLOQUE_CSV),
+            convert_options=pa_csv.ConvertOptions(include_columns=COLUMNAS_MODELO, column_types=tipos,
+                                                  timestamp_parsers=[pa_csv.ISO8601] + FORMATOS_FECHA_CSV)
+        )
+        tabla = pa.Table.from_batches(list(lector), schema=lector.schema)
+        return tabla.to_pandas(date_as_object=False), columnas
+
+    @classmethod
+    def _leer_archivo(cls, archivo: BinaryIO, filename: str) -> Tuple[pd.DataFrame, List[str]]:
+        if filename.endswith('.csv'):
+            return cls._leer_csv(archivo)
+        if filename.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            columnas = pq.ParquetFile(archivo).schema_arrow.names
+            faltantes = [columna for columna in COLUMNAS_MODELO if columna not in columnas]
+            if faltantes:
+                raise KeyError(f"Columnas faltantes en el archivo: {', '.join(faltantes)}")
+            return pd.read_parquet(archivo, columns=COLUMNAS_MODELO), columnas
+
+        df = pd.read_excel(archivo, usecols=lambda columna: str(columna).strip() in COLUMNAS_MODELO)
+        df.columns = [str(columna).strip() for columna in df.columns]
+        faltantes = [columna for columna in COLUMNAS_MODELO if columna not in df.columns]
+        if faltantes:
+            raise KeyError(f"Columnas faltantes en el archivo: {', '.join(faltantes)}")
+        return df, df.columns.tolist()
+
+    @staticmethod
+    def _respuesta(df: pd.DataFrame, columnas: List[str], df_prediccion: pd.DataFrame, filename: str,
+                   formato: str) -> Response:
+        """
+        Arma la respuesta en el formato negociado. En Arrow y Parquet se envía solo la tabla de
+        predicción, con la fecha como columna; los datos del archivo van en encabezados.
+        """
+        if formato == TIPO_JSON:
+            contenido = objeto_json({
+                "mensaje": "Archivo procesado exitosamente",
+                "filename": filename,
+                "rows": len(df),
+                "columns": len(columnas),
+                "column_names": columnas,
+                "prediction": dataframe_a_json(df_prediccion),  # DataFrame serializado sin pasar por dict
+                "timestamp": None,
+                "status": "success"
+            })
+            return Response(content=contenido, media_type=TIPO_JSON)
+
+        tabla = df_prediccion.rename_axis('fecha')
+        contenido = dataframe_a_arrow(tabla) if formato == TIPO_ARROW else dataframe_a_parquet(tabla)
+        return Response(content=contenido, media_type=formato,
+                        headers={"X-Filename": filename.encode('ascii', 'replace').decode('ascii'),
+                                 "X-Rows": str(len(df)),
+                                 "X-Columns": str(len(columnas))})
+
+    async def obtener_modelo(self, request: Request, file: UploadFile = File(...),
+                             solo_ventana: bool = Query(False, description="Leer solo las últimas filas que usa "
+                                                                            "el modelo (historia ordenada por fecha)"),
+                             escenarios: int = Query(0, ge=0, le=1000,
+                                                     description="Escenarios climáticos perturbados para "
+                                                                 "bandas q10/q50/q90; 0 = sin bandas")
+                             ) -> Response:
         try:
             # Validación de entrada
             if file is None:
@@ -83,28 +198,48 @@ class Route_Rnn:
                 )
 
             # Validar extensión
-            if not file.filename.endswith(('.csv', '.xlsx', '.xls')):
+            if not file.filename.endswith(('.csv', '.xlsx', '.xls', '.parquet')):
                 logger.warning(f"Formato no soportado: {file.filename}")
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Solo se permiten archivos CSV o Excel (.csv, .xlsx, .xls)"
+                    detail="Solo se permiten archivos CSV, Excel o Parquet (.csv, .xlsx, .xls, .parquet)"
                 )
 
-            # Validar tamaño (ejemplo: 10MB máximo)
-            if file.size and file.size > 10 * 1024 * 1024:
+            # Validar tamaño
+            if file.size and file.size > TAMANO_MAXIMO_MB * 1024 * 1024:
                 logger.warning(f"Archivo muy grande: {file.filename} ({file.size} bytes)")
                 raise HTTPException(
                     status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                    detail="El archivo es demasiado grande (máximo 10MB)"
+                    detail=f"El archivo es demasiado grande (máximo {TAMANO_MAXIMO_MB}MB)"
                 )
 
-            # Leer y procesar archivo
-            contents = await file.read()
-
-            if file.filename.endswith('.csv'):
-                df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
-            else:
-                df = pd.read_excel(io.BytesIO(contents))
+            # Leer y procesar archivo: la subida ya está en un temporal, se lee desde ahí sin copiarla
+            # completa a memoria, y fuera del bucle de eventos
+            await file.seek(0)
+            services_rnn = Service_Rnn()
+            try:
+                if solo_ventana:
+                    # Solo la ventana final: el costo no depende del largo de la historia
+                    df = await run_in_threadpool(services_rnn.leer_ventana, file.file, file.filename)
+                    columnas = df.columns.tolist()
+                else:
+                    df, columnas = await run_in_threadpool(self._leer_archivo, file.file, file.filename)
+            except (UnicodeDecodeError, pd.errors.EmptyDataError):
+                raise
+            except KeyError as e:
+                # Faltan columnas requeridas por el modelo
+                logger.error(f"Columnas faltantes en archivo {file.filename}: {str(e)}")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e).strip("'\"")
+                )
+            except ValueError as e:
+                # Valores que no se pueden convertir al leer el archivo
+                logger.error(f"Error de formato en archivo {file.filename}: {str(e)}")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Error de formato en el archivo: {str(e)}"
+                )
 
             # Validar que no esté vacío
             if df.empty:
@@ -114,27 +249,19 @@ class Route_Rnn:
                     detail="El archivo está vacío"
                 )
 
-            services_rnn= Service_Rnn()
-
-
-            df_prediccion = services_rnn.prediccion(df)
+            if solo_ventana:
+                df_prediccion = await run_in_threadpool(services_rnn.prediccion_ventana, df, escenarios)
+            else:
+                # Con escenarios sobre historias largas la predicción tarda: fuera del bucle de eventos
+                df_prediccion = await run_in_threadpool(services_rnn.prediccion, df, escenarios)
 
             # Registro de operación exitosa
             logger.info(f"Archivo procesado exitosamente: {file.filename} - "
-                        f"Filas: {len(df)}, Columnas: {len(df.columns)}")
+                        f"Filas: {len(df)}, Columnas: {len(columnas)}")
 
-            # Respuesta exitosa
-            # Respuesta exitosa CON DATAFRAME COMO JSON
-            return {
-                "mensaje": "Archivo procesado exitosamente",
-                "filename": file.filename,
-                "rows": len(df),
-                "columns": len(df.columns),
-                "column_names": df.columns.tolist(),
-                "prediction": df_prediccion.to_dict('index'),  # ← AQUÍ está el DataFrame como JSON
-                "timestamp": None,
-                "status": "success"
-            }
+            # Respuesta exitosa en el formato pedido por el cliente (JSON por defecto)
+            return self._respuesta(df, columnas, df_prediccion, file.filename,
+                                   negociar_formato(request.headers.get("accept")))
 
         except HTTPException:
             # Re-lanzar HTTPExceptions para que FastAPI las maneje correctamente
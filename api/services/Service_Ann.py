@@ -6,15 +6,55 @@ Objetivo: Clase para control de servicios de ANN
 Cambios:
 
     1. Creacion de clase pmarin 05-07-2025
+    2. Modo rejilla opcional con la variable de entorno AGROIA_ANN_GRID 19-10-2026
+    3. Pesos del modelo cargados una sola vez por proceso 19-10-2026
+    4. Escalador persistido cargado una sola vez por proceso 19-10-2026
+    5. Instancia en modo rejilla compartida por proceso 19-10-2026
 """
-from src.train.ann import ann
+import os
+import logging
+from functools import lru_cache
+
+from src.train.ann import ann, cargar_escalador
+from src.train.ann_numpy import cargar_modelo
 from src.utils.metrics import obtener_ruta_app
 
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _cargar_pesos_ann(ruta_raiz):
+    return cargar_modelo(os.path.join(ruta_raiz, 'models/modelo_pred_cultivopapa.h5'))
+
+
+@lru_cache(maxsize=None)
+def _cargar_escalador_ann(ruta_raiz):
+    return cargar_escalador(ruta_raiz)
+
+
+@lru_cache(maxsize=None)
+def _cargar_ann_grid(ruta_raiz):
+    # La instancia en modo rejilla no cambia al consultar: se arma una vez por proceso y se comparte
+    try:
+        return ann(ruta_raiz, modo_grid=True, modelo=_cargar_pesos_ann(ruta_raiz),
+                   escalador=_cargar_escalador_ann(ruta_raiz))
+    except Exception as e:
+        logger.warning(f"Modo rejilla no disponible, se usa la inferencia exacta: {str(e)}")
+        return None
+
 
 class Service_Ann:
     def __init__(self, fila):
-        self._ann = ann(obtener_ruta_app("AgroIA"))
+        ruta_raiz = obtener_ruta_app("AgroIA")
+        self._ann = None
+        if os.getenv('AGROIA_ANN_GRID', 'False').lower() == 'true':
+            self._ann = _cargar_ann_grid(ruta_raiz)
+        if self._ann is None:
+            # Pesos y escalador persistido se leen una vez por proceso; sin escalador persistido
+            # cada instancia ajusta el suyo
+            self._ann = ann(ruta_raiz, modelo=_cargar_pesos_ann(ruta_raiz),
+                            escalador=_cargar_escalador_ann(ruta_raiz))
         self._fila = fila
 
     def prediccion(self):
-        return self._ann.predecir_desde_fila(self._fila)
\ No newline at end of file
+        return self._ann.predecir_desde_fila(self._fila)
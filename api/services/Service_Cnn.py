@@ -6,13 +6,27 @@ Objetivo: Clase para control de servicios de CNN
 Cambios:
 
     1. Creacion de clase pmarin 05-07-2025
+    2. Modelo cargado una sola vez por proceso 19-10-2026
+    3. Fragmento de respuesta preserializado por clase 19-10-2026
 """
+from functools import lru_cache
+
 from src.train.cnn import cnn
 from src.utils.metrics import obtener_ruta_app
+
+
+@lru_cache(maxsize=None)
+def _cargar_cnn(ruta_raiz):
+    return cnn(ruta_raiz)
+
+
 class Service_Cnn:
     def __init__(self, imagen):
         self.imagen = imagen
-        self._cnn = cnn(obtener_ruta_app("AgroIA"))
+        self._cnn = _cargar_cnn(obtener_ruta_app("AgroIA"))
 
     def prediccion(self):
-        return self._cnn.predeccir_imagen_api(self.imagen)
\ No newline at end of file
+        return self._cnn.predeccir_imagen_api(self.imagen)
+
+    def fragmento_respuesta(self, clase):
+        return self._cnn.fragmento_respuesta(clase)
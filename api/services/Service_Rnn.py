@@ -6,12 +6,33 @@ Objetivo: Clase para control de servicios de RNN
 Cambios:
 
     1. Creacion de clase pmarin 05-07-2025
+    2. Modelo y escalador cargados una sola vez por proceso 19-10-2026
+    3. Predicción leyendo solo la ventana final del archivo 19-10-2026
+    4. Bandas de pronóstico con el modo de ensamble 19-10-2026
 """
+from functools import lru_cache
+
 from src.train.rnn import rnn
 from src.utils.metrics import obtener_ruta_app
 
+
+@lru_cache(maxsize=None)
+def _cargar_rnn(ruta_raiz):
+    return rnn(ruta_raiz)
+
+
 class Service_Rnn:
     def __init__(self):
-        self._rnn = rnn(obtener_ruta_app("AgroIA"))
-    def prediccion(self, df):
-        return self._rnn.obtener_prediccion_api(df)
\ No newline at end of file
+        self._rnn = _cargar_rnn(obtener_ruta_app("AgroIA"))
+    def prediccion(self, df, escenarios=0):
+        if escenarios:
+            return self._rnn.obtener_prediccion_ensamble(df, escenarios)
+        return self._rnn.obtener_prediccion_api(df)
+
+    def leer_ventana(self, archivo, nombre):
+        return self._rnn.leer_ventana(archivo, nombre)
+
+    def prediccion_ventana(self, ventana, escenarios=0):
+        if escenarios:
+            return self._rnn.obtener_prediccion_ensamble(ventana, escenarios)
+        return self._rnn.obtener_prediccion_api_ventana(ventana)
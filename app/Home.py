@@ -6,8 +6,10 @@ Objetivo: Clase para pagina principal web
 Cambios:
     1. Creacion de clase pmarin 05-07-2025
     2. Implementación de control de excepciones robusto 06-07-2025
+    3. Instanciación diferida: solo se construye el módulo que se renderiza 19-10-2026
 """
 import os
+import time
 import logging
 import streamlit as st
 from typing import Dict, Optional, Any
@@ -42,10 +44,11 @@ class Home:
                     logger.error(f"No se pudo crear el directorio base: {e}")
                     raise
 
+            # Se registran las clases; cada módulo se instancia al renderizarse por primera vez
             self.__menu = {
-                "Modelo ANN": Modulo3Web(),  # Representa el modulo ANN
-                "Modelo CNN": Modulo1Web(),  # Representa el modulo CNN
-                "Modelo RNN": Modulo2Web()  # Representa el modulo RNN
+                "Modelo ANN": Modulo3Web,  # Representa el modulo ANN
+                "Modelo CNN": Modulo1Web,  # Representa el modulo CNN
+                "Modelo RNN": Modulo2Web  # Representa el modulo RNN
             }
             self.__base_dir = base_dir
 
@@ -260,8 +263,11 @@ class Home:
                 st.error(f"Página no encontrada: {pagina_actual}")
                 return
 
-            # Obtener el módulo de la página
+            # Obtener el módulo de la página, instanciándolo si aún es una clase
             pagina_modulo = self.__menu[pagina_actual]
+            if isinstance(pagina_modulo, type):
+                pagina_modulo = pagina_modulo()
+                self.__menu[pagina_actual] = pagina_modulo
 
             if pagina_modulo is None:
                 logger.info(f"Módulo no implementado para: {pagina_actual}")
@@ -272,8 +278,9 @@ class Home:
 
             # Renderizar la página
             if hasattr(pagina_modulo, 'render'):
+                inicio = time.perf_counter()
                 pagina_modulo.render()
-                logger.debug(f"Página renderizada: {pagina_actual}")
+                logger.info(f"Página renderizada: {pagina_actual} en {time.perf_counter() - inicio:.2f} s")
             else:
                 logger.error(f"Módulo {pagina_actual} no tiene método render")
                 st.error(f"Error en el módulo {pagina_actual}")
@@ -352,7 +359,7 @@ class Home:
 
         Args:
             nombre (str): Nombre del módulo
-            modulo (Any): Instancia del módulo
+            modulo (Any): Instancia del módulo, o su clase para instanciarlo al renderizar
         """
         try:
             if not nombre:
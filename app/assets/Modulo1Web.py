@@ -2,8 +2,7 @@ import streamlit as st
 import time
 from PIL import Image
 
-from src.train.cnn import cnn
-from src.utils.metrics import obtener_ruta_app
+from app.assets.RecursosWeb import obtener_modelo_cnn
 
 
 class Modulo1Web:
@@ -114,7 +113,7 @@ class Modulo1Web:
 
                                 # Progreso inicial
                                 progreso.progress(20, text="Cargando modelo...")
-                                clasificador = cnn(obtener_ruta_app("AgroIA"))
+                                clasificador = obtener_modelo_cnn()
 
                                 progreso.progress(40, text="Modelo cargado, procesando imagen...")
 
@@ -1,11 +1,69 @@
+import altair as alt
 import streamlit as st
 import pandas as pd
-from src.train.rnn import rnn
-from src.utils.metrics import obtener_ruta_app
+from app.assets.RecursosWeb import obtener_modelo_rnn
+
+
+@st.cache_data(show_spinner="Calculando pronóstico...", max_entries=32)
+def calcular_pronostico(df: pd.DataFrame) -> dict:
+    # Streamlit cachea por el contenido del DataFrame: la misma historia no se vuelve a pronosticar
+    return obtener_modelo_rnn().obtener_datos_pronostico(df)
+
 
 class Modulo2Web:
-    def __init__(self):
-        self.modelo_rnn = rnn(obtener_ruta_app("AgroIA"))
+    color_produccion = '#2E86AB'  # Azul moderno
+    color_forecast = '#A23B72'  # Rosa/magenta
+
+    @property
+    def modelo_rnn(self):
+        # El modelo se carga en el primer uso y se comparte entre reruns
+        return obtener_modelo_rnn()
+
+    def mostrar_graficos(self, datos: dict):
+        """
+        Dashboard con gráficos nativos: solo se envían los puntos, el navegador dibuja
+        """
+        serie = datos['serie']
+        escala_color = alt.Scale(domain=['Histórico', 'Predicción'],
+                                 range=[self.color_produccion, self.color_forecast])
+        tooltip = [alt.Tooltip('fecha:T', format='%Y-%m'), alt.Tooltip('produccion:Q', format='.1f'), 'serie:N']
+
+        historico = serie[serie['serie'] == 'Histórico']
+        prediccion = serie[serie['serie'] == 'Predicción']
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("📈 Producción Histórica")
+            base = alt.Chart(historico).encode(x=alt.X('fecha:T', title='Período'),
+                                               y=alt.Y('produccion:Q', title='Producción (toneladas)'),
+                                               tooltip=tooltip)
+            promedio = alt.Chart(pd.DataFrame({'promedio': [datos['promedio']]})).mark_rule(
+                color='red', strokeDash=[6, 4]).encode(y='promedio:Q')
+            st.altair_chart(base.mark_area(opacity=0.3, color=self.color_produccion)
+                            + base.mark_line(point=True, color=self.color_produccion) + promedio,
+                            use_container_width=True)
+            st.caption(f"📊 Promedio: {datos['promedio']:.1f}")
+
+        with col2:
+            st.subheader("🔮 Predicción Futura")
+            base = alt.Chart(prediccion).encode(x=alt.X('fecha:T', title='Meses Futuros'),
+                                                y=alt.Y('produccion:Q', title='Producción Predicha (toneladas)'),
+                                                tooltip=tooltip)
+            st.altair_chart(base.mark_area(opacity=0.4, color=self.color_forecast)
+                            + base.mark_line(point=alt.OverlayMarkDef(shape='square'), color=self.color_forecast),
+                            use_container_width=True)
+
+        st.subheader("🔄 Histórico vs Predicción")
+        inicio = alt.Chart(prediccion.head(1)).mark_rule(color='red', strokeDash=[6, 4]).encode(x='fecha:T')
+        combinado = alt.Chart(serie).mark_line(point=True).encode(
+            x=alt.X('fecha:T', title='Período Total'),
+            y=alt.Y('produccion:Q', title='Producción (toneladas)'),
+            color=alt.Color('serie:N', scale=escala_color, title=None),
+            tooltip=tooltip
+        )
+        st.altair_chart(combinado + inicio, use_container_width=True)
+
+        st.dataframe(datos['forecast'].rename_axis('fecha'))
 
     def render(self):
         global df
@@ -28,7 +86,6 @@ class Modulo2Web:
         # Botón para generar recomendación
         if st.button('Obtener Recomendación'):
             try:
-                fig = self.modelo_rnn.obtener_prediccion(df)
-                st.pyplot(fig)
+                self.mostrar_graficos(calcular_pronostico(df))
             except Exception as e:
-                st.error(f"Error: {str(e)}")
\ No newline at end of file
+                st.error(f"Error: {str(e)}")
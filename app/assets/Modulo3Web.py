@@ -1,12 +1,13 @@
 import streamlit as st
 
-from src.train.ann import ann
-from src.utils.metrics import obtener_ruta_app
+from app.assets.RecursosWeb import obtener_modelo_ann
+
 
 class Modulo3Web:
-    def __init__(self):
-        # Crear instancia del recomendador climático
-        self.modelo_ann = ann(obtener_ruta_app("AgroIA"))
+    @property
+    def modelo_ann(self):
+        # Crear instancia del recomendador climático sobre los pesos compartidos
+        return obtener_modelo_ann()
 
     def render(self):
         st.set_page_config(
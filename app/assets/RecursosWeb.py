@@ -0,0 +1,85 @@
+"""
+Clase: RecursosWeb
+
+Objetivo: Capa compartida de recursos para las páginas de Streamlit. Mantiene cargados
+modelos, escaladores y rutas durante toda la vida del proceso del servidor
+
+Cambios:
+    1. Creacion del modulo 19-10-2026
+    2. Escalador ANN persistido compartido entre instancias 19-10-2026
+"""
+import os
+import time
+import logging
+
+import streamlit as st
+
+from src.utils.metrics import obtener_ruta_app
+
+logger = logging.getLogger(__name__)
+
+
+@st.cache_resource(show_spinner=False)
+def obtener_ruta_raiz(nombre_objetivo="AgroIA"):
+    """
+    Ruta raíz del proyecto, resuelta una sola vez por proceso
+    """
+    return obtener_ruta_app(nombre_objetivo)
+
+
+@st.cache_resource(show_spinner="Cargando modelo ANN...")
+def obtener_pesos_ann():
+    """
+    Pesos del modelo ANN (motor NumPy o Keras), cargados una sola vez por proceso
+    """
+    from src.train.ann_numpy import cargar_modelo
+
+    inicio = time.perf_counter()
+    modelo = cargar_modelo(os.path.join(obtener_ruta_raiz(), 'models/modelo_pred_cultivopapa.h5'))
+    logger.info(f"Modelo ANN cargado en {time.perf_counter() - inicio:.2f} s")
+    return modelo
+
+
+@st.cache_resource(show_spinner=False)
+def obtener_escalador_ann():
+    """
+    Escalador persistido por entrenar_ann (models/escalador_ann.pkl), o None si no existe
+    """
+    from src.train.ann import cargar_escalador
+
+    return cargar_escalador(obtener_ruta_raiz())
+
+
+def obtener_modelo_ann():
+    """
+    Instancia de ann sobre los pesos y el escalador compartidos; construirla no lee archivos
+    """
+    from src.train.ann import ann
+
+    return ann(obtener_ruta_raiz(), modelo=obtener_pesos_ann(), escalador=obtener_escalador_ann())
+
+
+@st.cache_resource(show_spinner="Cargando modelo CNN...")
+def obtener_modelo_cnn():
+    """
+    Modelo CNN cargado una sola vez por proceso; TensorFlow se importa aquí
+    """
+    from src.train.cnn import cnn
+
+    inicio = time.perf_counter()
+    modelo = cnn(obtener_ruta_raiz())
+    logger.info(f"Modelo CNN cargado en {time.perf_counter() - inicio:.2f} s")
+    return modelo
+
+
+@st.cache_resource(show_spinner="Cargando modelo RNN...")
+def obtener_modelo_rnn():
+    """
+    Modelo RNN y su escalador persistido, cargados una sola vez por proceso
+    """
+    from src.train.rnn import rnn
+
+    inicio = time.perf_counter()
+    modelo = rnn(obtener_ruta_raiz())
+    logger.info(f"Modelo RNN cargado en {time.perf_counter() - inicio:.2f} s")
+    return modelo
@@ -6,7 +6,14 @@ Objetivo: Clase principal donde llama al menu principal
 Cambios:
     1. Creacion de la clase y cascarazon visual pmarin 06-07-2025
     2. Implementación de control de excepciones robusto 06-07-2025
+    3. Medición del tiempo de arranque 19-10-2026
+    4. Menú Home conservado en session_state entre reruns 19-10-2026
 """
+import time
+
+# Inicio de la ejecución del script, para medir el tiempo de arranque
+INICIO_EJECUCION = time.perf_counter()
+
 import os
 import sys
 import threading
@@ -131,6 +138,21 @@ def lanzar_api():
         st.error(f"No se pudo iniciar la API: {e}")
         return False
 
+def reportar_tiempo_arranque():
+    """
+    Registra el tiempo desde el inicio del script hasta el primer render completo de la sesión
+    y, en las ejecuciones siguientes, el tiempo de cada rerun
+    """
+    duracion = time.perf_counter() - INICIO_EJECUCION
+    if "tiempo_arranque" not in st.session_state:
+        st.session_state["tiempo_arranque"] = duracion
+        logger.info(f"Tiempo de arranque (primer render): {duracion:.2f} s")
+    else:
+        logger.debug(f"Tiempo de rerun: {duracion:.2f} s")
+
+    if os.getenv('DEBUG', 'False').lower() == 'true':
+        st.sidebar.caption(f"Arranque: {st.session_state['tiempo_arranque']:.2f} s · Rerun: {duracion:.2f} s")
+
 def main():
     """
     Función principal con manejo completo de excepciones
@@ -149,10 +171,12 @@ def main():
         if not os.path.exists(directorio_actual):
             raise FileNotFoundError(f"Directorio no encontrado: {directorio_actual}")
 
-        # Inicializar menú
+        # Inicializar menú una vez por sesión; en cada rerun se reutiliza con sus módulos ya creados
         try:
-            menu = Home(directorio_actual)
-            logger.info("Menú Home inicializado exitosamente")
+            if "menu_home" not in st.session_state:
+                st.session_state["menu_home"] = Home(directorio_actual)
+                logger.info("Menú Home inicializado exitosamente")
+            menu = st.session_state["menu_home"]
         except Exception as e:
             logger.error(f"Error al inicializar Home: {e}")
             st.error("Error al inicializar el menú principal")
@@ -171,6 +195,7 @@ def main():
         try:
             menu.home()
             logger.info("Aplicación ejecutándose correctamente")
+            reportar_tiempo_arranque()
         except AttributeError as e:
             logger.error(f"Error en método home(): {e}")
             st.error("Error en el método home del menú")
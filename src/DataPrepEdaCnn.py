@@ -5,16 +5,28 @@ Objetivo: Clase para el Eda de CNN
 
 Cambios:
     1. Creacion de la clase
+    2. Lectura de dimensiones desde el encabezado de la imagen, en paralelo 19-10-2026
+    3. Consultas del EDA y generadores sobre el manifiesto persistente de imágenes 19-10-2026
+    4. Pipeline tf.data como alternativa a ImageDataGenerator 19-10-2026
+    5. Lectura desde shards uint8 preempaquetados 19-10-2026
+    6. Partición de validación desde entrenamiento y redimensionado como el servicio 19-10-2026
 """
 import os
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from matplotlib.image import imread
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
+from PIL import Image
 from typing import Tuple, List, Optional
 import cv2
+from sklearn.model_selection import train_test_split
+
+from src.ManifiestoImagenes import ManifiestoImagenes
+from src.ShardsImagenes import ShardsImagenes
 
 
 class DataPrepEdaCnn:
@@ -34,10 +46,19 @@ class DataPrepEdaCnn:
         self.ruta_train = None
         self.ruta_test = None
         self.forma_imagen = (256, 256, 3)
+        self.forma_servicio = None
         self.tamano_lote = 16
         self.generador_imagenes = None
         self.generador_train = None
         self.generador_test = None
+        self.manifiesto = None
+        self.parametros_aumento = None
+        self.dataset_train = None
+        self.dataset_test = None
+        self.dataset_validacion = None
+        self.indices_validacion = None
+        self.indices_clases = None
+        self.shards = None
 
     def configurar_rutas(self, carpeta_train: str = "data/raw/CNN/train",
                          carpeta_test: str = "data/raw/CNN/test") -> None:
@@ -51,6 +72,30 @@ class DataPrepEdaCnn:
         self.ruta_train = os.path.join(self.directorio_base, carpeta_train)
         self.ruta_test = os.path.join(self.directorio_base, carpeta_test)
 
+    def usar_manifiesto(self, ruta_manifiesto: Optional[str] = None, actualizar: bool = True) -> dict:
+        """
+        Activa el manifiesto de imágenes para que el EDA y los generadores lo consulten
+        en lugar de recorrer las carpetas.
+
+        Args:
+            ruta_manifiesto (str, optional): Archivo SQLite del manifiesto
+            actualizar (bool): Sincronizar el manifiesto con las carpetas (solo relee archivos modificados)
+
+        Returns:
+            dict: Resumen de la actualización (vacío si actualizar es False)
+        """
+        if self.ruta_train is None or self.ruta_test is None:
+            raise ValueError("Debe configurar las rutas primero usando configurar_rutas()")
+
+        self.manifiesto = ManifiestoImagenes(self.directorio_base, ruta_manifiesto)
+        if not actualizar:
+            return {}
+        return self.manifiesto.actualizar({'entrenamiento': self.ruta_train, 'pruebas': self.ruta_test})
+
+    @staticmethod
+    def _conjunto(tipo_movimiento: str) -> str:
+        return "entrenamiento" if tipo_movimiento == "entrenamiento" else "pruebas"
+
     def listar_contenido(self, ruta: str = None) -> List[str]:
         """
         Lista el contenido de un directorio.
@@ -74,6 +119,8 @@ class DataPrepEdaCnn:
         """
         if self.ruta_train is None:
             raise ValueError("Debe configurar las rutas primero usando configurar_rutas()")
+        if self.manifiesto is not None:
+            return self.manifiesto.clases("entrenamiento")
         return self.listar_contenido(self.ruta_train)
 
     def obtener_clases_disponibles_pruebas(self) -> List[str]:
@@ -85,6 +132,8 @@ class DataPrepEdaCnn:
         """
         if self.ruta_test is None:
             raise ValueError("Debe configurar las rutas primero usando configurar_rutas()")
+        if self.manifiesto is not None:
+            return self.manifiesto.clases("pruebas")
         return self.listar_contenido(self.ruta_test)
 
     def contar_imagenes_por_clase(self, tipo_movimiento = "entrenamiento") -> dict:
@@ -94,6 +143,9 @@ class DataPrepEdaCnn:
         Returns:
             dict: Diccionario con el conteo de imágenes por clase
         """
+        if self.manifiesto is not None:
+            return self.manifiesto.conteos(self._conjunto(tipo_movimiento))
+
         if tipo_movimiento == "entrenamiento":
             clases = self.obtener_clases_disponibles_entrenamiento()
         else:
@@ -111,7 +163,49 @@ class DataPrepEdaCnn:
 
         return conteos
 
-    def obtener_dimensiones_carpeta(self, ruta_carpeta: str) -> Tuple[List[int], List[int]]:
+    @staticmethod
+    def _leer_dimensiones_encabezado(ruta_imagen: str) -> Optional[Tuple[int, int]]:
+        """
+        Lee alto y ancho de una imagen sin decodificar sus píxeles.
+        PIL abre el archivo de forma diferida y solo interpreta el encabezado JPEG/PNG.
+
+        Args:
+            ruta_imagen (str): Ruta a la imagen
+
+        Returns:
+            Optional[Tuple[int, int]]: (altura, ancho) o None si no es una imagen válida
+        """
+        try:
+            with Image.open(ruta_imagen) as imagen:
+                ancho, altura = imagen.size
+            return altura, ancho
+        except Exception:
+            return None
+
+    def escanear_dimensiones(self, rutas_imagenes: List[str],
+                             max_hilos: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Obtiene las dimensiones de una lista de imágenes leyendo solo sus encabezados
+        en un pool de hilos.
+
+        Args:
+            rutas_imagenes (List[str]): Rutas de las imágenes
+            max_hilos (int, optional): Número de hilos. Si es None se calcula según los CPUs
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Arreglos con alturas y anchos de las imágenes válidas
+        """
+        if max_hilos is None:
+            max_hilos = min(32, (os.cpu_count() or 1) * 4)
+
+        with ThreadPoolExecutor(max_workers=max_hilos) as ejecutor:
+            resultados = [r for r in ejecutor.map(self._leer_dimensiones_encabezado, rutas_imagenes)
+                          if r is not None]
+
+        dimensiones = np.array(resultados, dtype=np.int64).reshape(-1, 2)
+        return dimensiones[:, 0], dimensiones[:, 1]
+
+    def obtener_dimensiones_carpeta(self, ruta_carpeta: str) -> Tuple[np.ndarray, np.ndarray]:
         """
         Obtiene las dimensiones de todas las imágenes en una carpeta.
 
@@ -119,23 +213,13 @@ class DataPrepEdaCnn:
             ruta_carpeta (str): Ruta a la carpeta con imágenes
 
         Returns:
-            Tuple[List[int], List[int]]: Listas con alturas y anchos
-        """
-        alturas = []
-        anchos = []
-
-        for archivo in os.listdir(ruta_carpeta):
-            ruta_imagen = os.path.join(ruta_carpeta, archivo)
-            try:
-                imagen = imread(ruta_imagen)
-                if imagen is not None and len(imagen.shape) >= 2:
-                    altura, ancho = imagen.shape[:2]
-                    alturas.append(altura)
-                    anchos.append(ancho)
-            except Exception:
-                continue
+            Tuple[np.ndarray, np.ndarray]: Arreglos con alturas y anchos
+        """
+        if self.manifiesto is not None and self.manifiesto.contiene_directorio(ruta_carpeta):
+            return self.manifiesto.dimensiones_directorio(ruta_carpeta)
 
-        return alturas, anchos
+        rutas = [os.path.join(ruta_carpeta, archivo) for archivo in os.listdir(ruta_carpeta)]
+        return self.escanear_dimensiones(rutas)
 
     def analizar_dimensiones_por_clase(self, tipo_movimiento = "entrenamiento") -> dict:
         """
@@ -156,21 +240,25 @@ class DataPrepEdaCnn:
             else:
                 ruta_clase = os.path.join(self.ruta_test, clase)
 
-            if os.path.isdir(ruta_clase):
+            if self.manifiesto is not None:
+                alturas, anchos = self.manifiesto.dimensiones(self._conjunto(tipo_movimiento), clase)
+            elif os.path.isdir(ruta_clase):
                 alturas, anchos = self.obtener_dimensiones_carpeta(ruta_clase)
+            else:
+                continue
 
-                if alturas and anchos:
-                    estadisticas[clase] = {
-                        'altura_promedio': np.mean(alturas),
-                        'ancho_promedio': np.mean(anchos),
-                        'altura_mediana': np.median(alturas),
-                        'ancho_mediana': np.median(anchos),
-                        'altura_min': np.min(alturas),
-                        'altura_max': np.max(alturas),
-                        'ancho_min': np.min(anchos),
-                        'ancho_max': np.max(anchos),
-                        'total_imagenes': len(alturas)
-                    }
+            if alturas.size:
+                estadisticas[clase] = {
+                    'altura_promedio': np.mean(alturas),
+                    'ancho_promedio': np.mean(anchos),
+                    'altura_mediana': np.median(alturas),
+                    'ancho_mediana': np.median(anchos),
+                    'altura_min': np.min(alturas),
+                    'altura_max': np.max(alturas),
+                    'ancho_min': np.min(anchos),
+                    'ancho_max': np.max(anchos),
+                    'total_imagenes': len(alturas)
+                }
 
         return estadisticas
 
@@ -184,7 +272,7 @@ class DataPrepEdaCnn:
         """
         alturas, anchos = self.obtener_dimensiones_carpeta(ruta_carpeta)
 
-        if not alturas or not anchos:
+        if alturas.size == 0:
             return
 
         plt.figure(figsize=(12, 5))
@@ -230,16 +318,24 @@ class DataPrepEdaCnn:
             axes = [axes]
 
         for i, clase in enumerate(clases):
-            if tipo_movimiento == "entrenamiento":
-                ruta_clase = os.path.join(self.ruta_train, clase)
+            if self.shards is not None:
+                lector = self.shards[self._conjunto(tipo_movimiento)]
+                posiciones = np.flatnonzero(np.asarray(lector.etiquetas) == lector.indices_clases[clase])
+                # Vistas sobre el shard, sin decodificar
+                imagenes = [lector[k][0] for k in posiciones[:num_imagenes]]
+            elif self.manifiesto is not None:
+                imagenes = self.manifiesto.rutas(self._conjunto(tipo_movimiento), clase, num_imagenes)
             else:
-                ruta_clase = os.path.join(self.ruta_test, clase)
-            imagenes = os.listdir(ruta_clase)[:num_imagenes]
+                if tipo_movimiento == "entrenamiento":
+                    ruta_clase = os.path.join(self.ruta_train, clase)
+                else:
+                    ruta_clase = os.path.join(self.ruta_test, clase)
+                imagenes = [os.path.join(ruta_clase, imagen)
+                            for imagen in os.listdir(ruta_clase)[:num_imagenes]]
 
             for j, imagen in enumerate(imagenes):
-                ruta_imagen = os.path.join(ruta_clase, imagen)
                 try:
-                    img = imread(ruta_imagen)
+                    img = imread(imagen) if isinstance(imagen, str) else imagen
                     if len(clases) == 1:
                         axes[j].imshow(img)
                         axes[j].set_title(f'{clase} - {j + 1}')
@@ -272,6 +368,18 @@ class DataPrepEdaCnn:
             zoom_max (float): Zoom máximo
             giro_horizontal (bool): Permitir giro horizontal
         """
+        from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+        # Se guardan para construir las capas equivalentes del pipeline tf.data
+        self.parametros_aumento = {
+            'rotacion_max': rotacion_max,
+            'desplazamiento_ancho': desplazamiento_ancho,
+            'desplazamiento_alto': desplazamiento_alto,
+            'distorsion': distorsion,
+            'zoom_max': zoom_max,
+            'giro_horizontal': giro_horizontal
+        }
+
         self.generador_imagenes = ImageDataGenerator(
             rotation_range=rotacion_max,
             width_shift_range=desplazamiento_ancho,
@@ -296,6 +404,23 @@ class DataPrepEdaCnn:
         if self.ruta_train is None or self.ruta_test is None:
             raise ValueError("Debe configurar las rutas primero")
 
+        from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+        # Generador para test sin aumento de datos
+        generador_test = ImageDataGenerator(rescale=1 / 255)
+
+        if self.manifiesto is not None:
+            # Las rutas salen del manifiesto; no se vuelve a listar ni validar cada archivo
+            parametros = dict(x_col='ruta', y_col='clase', target_size=self.forma_imagen[:2],
+                              color_mode='rgb', batch_size=self.tamano_lote, class_mode=modo_clase,
+                              validate_filenames=False)
+
+            self.generador_train = self.generador_imagenes.flow_from_dataframe(
+                self.manifiesto.como_dataframe("entrenamiento"), **parametros)
+            self.generador_test = generador_test.flow_from_dataframe(
+                self.manifiesto.como_dataframe("pruebas"), shuffle=False, **parametros)
+            return
+
         self.generador_train = self.generador_imagenes.flow_from_directory(
             self.ruta_train,
             target_size=self.forma_imagen[:2],
@@ -304,9 +429,6 @@ class DataPrepEdaCnn:
             class_mode=modo_clase
         )
 
-        # Generador para test sin aumento de datos
-        generador_test = ImageDataGenerator(rescale=1 / 255)
-
         self.generador_test = generador_test.flow_from_directory(
             self.ruta_test,
             target_size=self.forma_imagen[:2],
@@ -316,6 +438,307 @@ class DataPrepEdaCnn:
             shuffle=False
         )
 
+    def _listar_imagenes(self, tipo_movimiento: str) -> Tuple[List[str], List[str]]:
+        """
+        Rutas y clases de las imágenes de un conjunto, en el mismo orden que flow_from_directory
+        """
+        if self.manifiesto is not None:
+            df = self.manifiesto.como_dataframe(self._conjunto(tipo_movimiento))
+            return df['ruta'].tolist(), df['clase'].tolist()
+
+        ruta_conjunto = self.ruta_train if tipo_movimiento == "entrenamiento" else self.ruta_test
+        rutas, clases = [], []
+        for clase in sorted(os.listdir(ruta_conjunto)):
+            ruta_clase = os.path.join(ruta_conjunto, clase)
+            if not os.path.isdir(ruta_clase):
+                continue
+            for archivo in sorted(os.listdir(ruta_clase)):
+                if archivo.lower().endswith(ManifiestoImagenes.EXTENSIONES_IMAGEN):
+                    rutas.append(os.path.join(ruta_clase, archivo))
+                    clases.append(clase)
+        return rutas, clases
+
+    def _crear_aumento_lote(self):
+        """
+        Aumento de datos vectorizado equivalente a configurar_generador_imagenes: rotación,
+        desplazamiento, distorsión, zoom y giro se componen en una sola matriz proyectiva por
+        imagen y se aplican al lote completo con una única transformación de TensorFlow.
+
+        Returns:
+            callable: Función que recibe un lote float32 (n, alto, ancho, 3) y lo retorna aumentado
+        """
+        import tensorflow as tf
+
+        if self.parametros_aumento is None:
+            self.configurar_generador_imagenes()
+        p = self.parametros_aumento
+        altura, ancho = self.forma_imagen[:2]
+
+        def uniforme(n, limite):
+            return tf.random.uniform((n,), -limite, limite)
+
+        def aumentar(imagenes):
+            n = tf.shape(imagenes)[0]
+            unos = tf.ones((n,))
+            ceros = tf.zeros((n,))
+
+            def matriz(a0, a1, a2, b0, b1, b2):
+                return tf.reshape(tf.stack([a0, a1, a2, b0, b1, b2, ceros, ceros, unos], axis=1), (-1, 3, 3))
+
+            # Mismos rangos que ImageDataGenerator: grados, fracción del tamaño e intervalo [1 - z, 1 + z]
+            theta = uniforme(n, p['rotacion_max']) * (math.pi / 180)
+            tx = uniforme(n, p['desplazamiento_ancho']) * ancho
+            ty = uniforme(n, p['desplazamiento_alto']) * altura
+            corte = uniforme(n, p['distorsion']) * (math.pi / 180)
+            zx = 1 + uniforme(n, p['zoom_max'])
+            zy = 1 + uniforme(n, p['zoom_max'])
+
+            # Las matrices llevan cada pixel de salida a su posición en la imagen de entrada
+            centro_x, centro_y = ancho / 2 - 0.5, altura / 2 - 0.5
+            transformacion = tf.linalg.matmul(
+                matriz(tf.cos(theta), -tf.sin(theta), ceros, tf.sin(theta), tf.cos(theta), ceros),
+                tf.linalg.matmul(
+                    matriz(unos, ceros, tx, ceros, unos, ty),
+                    tf.linalg.matmul(matriz(unos, -tf.sin(corte), ceros, ceros, tf.cos(corte), ceros),
+                                     matriz(zx, ceros, ceros, ceros, zy, ceros))))
+            transformacion = tf.linalg.matmul(
+                matriz(unos, ceros, centro_x * unos, ceros, unos, centro_y * unos),
+                tf.linalg.matmul(transformacion,
+                                 matriz(unos, ceros, -centro_x * unos, ceros, unos, -centro_y * unos)))
+
+            if p['giro_horizontal']:
+                girar = tf.random.uniform((n,)) < 0.5
+                signo = tf.where(girar, -unos, unos)
+                desplazamiento = tf.where(girar, (ancho - 1) * unos, ceros)
+                transformacion = tf.linalg.matmul(
+                    transformacion, matriz(signo, ceros, desplazamiento, ceros, unos, ceros))
+
+            return tf.raw_ops.ImageProjectiveTransformV3(
+                images=imagenes,
+                transforms=tf.reshape(transformacion, (-1, 9))[:, :8],
+                output_shape=tf.constant([altura, ancho], dtype=tf.int32),
+                fill_value=0.0,
+                interpolation='BILINEAR',
+                fill_mode='NEAREST')
+
+        return aumentar
+
+    def _forma_lectura(self) -> Tuple[int, int, int]:
+        """
+        Forma en que se decodifican o empaquetan las imágenes antes de llevarlas a forma_imagen
+        """
+        if self.forma_servicio is None:
+            return tuple(self.forma_imagen)
+        return tuple(self.forma_servicio) + (3,)
+
+    def _crear_dataset(self, tipo_movimiento: str, modo_clase: str, aumentar: bool,
+                       mezclar: bool, cache: Optional[str], seleccion: Optional[np.ndarray] = None):
+        import tensorflow as tf
+
+        altura, ancho = self.forma_imagen[:2]
+
+        if self.shards is not None:
+            # Los shards ya están decodificados y redimensionados: no hace falta caché
+            lector = self.shards[self._conjunto(tipo_movimiento)]
+            dataset = lector.crear_dataset(self.tamano_lote, mezclar, seleccion)
+            if lector.forma_imagen[:2] != (altura, ancho):
+                # Shards a la forma del servicio: se reducen por lote como la capa Resizing del modelo
+                dataset = dataset.map(
+                    lambda imagenes, indices_lote: (
+                        tf.image.resize(imagenes, (altura, ancho), method='nearest'), indices_lote),
+                    num_parallel_calls=tf.data.AUTOTUNE)
+        else:
+            rutas, clases = self._listar_imagenes(tipo_movimiento)
+            if seleccion is not None:
+                rutas = [rutas[i] for i in seleccion]
+                clases = [clases[i] for i in seleccion]
+            indices = [self.indices_clases[clase] for clase in clases]
+
+            def redimensionar_servicio(imagen):
+                return cv2.resize(imagen, self.forma_servicio[::-1])
+
+            def decodificar(ruta):
+                contenido = tf.io.read_file(ruta)
+                if self.forma_servicio is None:
+                    imagen = tf.io.decode_image(contenido, channels=3, expand_animations=False)
+                else:
+                    # JPEG con la IDCT exacta, que da los mismos pixeles que PIL en el servicio
+                    imagen = tf.cond(
+                        tf.io.is_jpeg(contenido),
+                        lambda: tf.io.decode_jpeg(contenido, channels=3, dct_method='INTEGER_ACCURATE'),
+                        lambda: tf.io.decode_image(contenido, channels=3, expand_animations=False))
+                    # Mismo cv2.resize que cnn._preprocesar_imagen, luego 'nearest' como la capa
+                    # Resizing que entrenar_cnn antepone al modelo exportado
+                    imagen = tf.numpy_function(redimensionar_servicio, [imagen], tf.uint8)
+                    imagen.set_shape(self._forma_lectura())
+                # 'nearest' es la interpolación por defecto de flow_from_directory y conserva uint8 en la caché
+                imagen = tf.image.resize(imagen, (altura, ancho), method='nearest')
+                imagen.set_shape((altura, ancho, 3))
+                return imagen
+
+            dataset = tf.data.Dataset.from_tensor_slices((rutas, indices))
+            dataset = dataset.map(lambda ruta, indice: (decodificar(ruta), indice),
+                                  num_parallel_calls=tf.data.AUTOTUNE)
+            dataset = dataset.cache(cache) if cache is not None else dataset.cache()
+
+            if mezclar:
+                dataset = dataset.shuffle(len(rutas), reshuffle_each_iteration=True)
+            dataset = dataset.batch(self.tamano_lote)
+
+        num_clases = len(self.indices_clases)
+        aumento = self._crear_aumento_lote() if aumentar else None
+
+        def preparar(imagenes, indices_lote):
+            imagenes = tf.cast(imagenes, tf.float32)
+            if aumento is not None:
+                imagenes = aumento(imagenes)
+            imagenes = imagenes / 255.0
+
+            if modo_clase == 'categorical':
+                return imagenes, tf.one_hot(indices_lote, num_clases)
+            if modo_clase == 'binary':
+                return imagenes, tf.cast(indices_lote, tf.float32)
+            if modo_clase == 'sparse':
+                return imagenes, indices_lote
+            return imagenes
+
+        dataset = dataset.map(preparar, num_parallel_calls=tf.data.AUTOTUNE)
+        return dataset.prefetch(tf.data.AUTOTUNE)
+
+    def crear_datasets_tf(self, modo_clase: str = 'categorical', cache_train: Optional[str] = '',
+                          cache_test: Optional[str] = '', fraccion_validacion: float = 0.0,
+                          semilla: Optional[int] = None) -> None:
+        """
+        Crea los datasets tf.data de entrenamiento y prueba: decodificación en paralelo, caché de
+        las imágenes ya redimensionadas, aumento de datos vectorizado por lote y prefetch.
+        Usa el mismo mapeo de clases que crear_generadores_datos (orden alfabético).
+        Si hay shards activos (usar_shards) las imágenes se leen de ellos sin decodificar JPEG.
+        Con fraccion_validacion > 0 se separa de entrenamiento una partición estratificada en
+        dataset_validacion, sin aumento, y el conjunto de prueba queda intacto.
+
+        Args:
+            modo_clase (str): 'categorical', 'binary', 'sparse' o None
+            cache_train (str, optional): '' para caché en memoria, una ruta para caché en disco, None sin caché
+            cache_test (str, optional): Igual que cache_train para el conjunto de prueba
+            fraccion_validacion (float): Fracción de entrenamiento reservada para validación
+            semilla (int, optional): Semilla de la partición de validación
+        """
+        if self.ruta_train is None or self.ruta_test is None:
+            raise ValueError("Debe configurar las rutas primero")
+
+        if self.shards is not None:
+            self.indices_clases = self.shards["entrenamiento"].indices_clases
+            etiquetas_train = np.asarray(self.shards["entrenamiento"].etiquetas)
+        else:
+            _, clases_train = self._listar_imagenes("entrenamiento")
+            self.indices_clases = {clase: i for i, clase in enumerate(sorted(set(clases_train)))}
+            etiquetas_train = np.array([self.indices_clases[clase] for clase in clases_train])
+
+        seleccion_train = None
+        self.dataset_validacion = self.indices_validacion = None
+        if fraccion_validacion:
+            seleccion_train, self.indices_validacion = (np.sort(indices) for indices in train_test_split(
+                np.arange(len(etiquetas_train)), test_size=fraccion_validacion,
+                stratify=etiquetas_train, random_state=semilla))
+            # Cada partición necesita su propio archivo si la caché es en disco
+            cache_validacion = f"{cache_train}_validacion" if cache_train else cache_train
+            self.dataset_validacion = self._crear_dataset("entrenamiento", modo_clase, aumentar=False,
+                                                          mezclar=False, cache=cache_validacion,
+                                                          seleccion=self.indices_validacion)
+
+        self.dataset_train = self._crear_dataset("entrenamiento", modo_clase, aumentar=True,
+                                                 mezclar=True, cache=cache_train, seleccion=seleccion_train)
+        self.dataset_test = self._crear_dataset("pruebas", modo_clase, aumentar=False,
+                                                mezclar=False, cache=cache_test)
+
+    def empaquetar_shards(self, directorio: Optional[str] = None,
+                          imagenes_por_shard: int = 1024) -> dict:
+        """
+        Empaqueta entrenamiento y pruebas en shards uint8 con la forma_imagen actual y los activa.
+        Con forma_servicio configurada se empaquetan a esa forma con el redimensionado del servicio.
+
+        Args:
+            directorio (str, optional): Carpeta de salida. Por defecto data/processed/CNN/shards
+            imagenes_por_shard (int): Imágenes por archivo
+
+        Returns:
+            dict: Lector de shards por conjunto
+        """
+        if self.ruta_train is None or self.ruta_test is None:
+            raise ValueError("Debe configurar las rutas primero")
+        if directorio is None:
+            directorio = os.path.join(self.directorio_base, 'data', 'processed', 'CNN', 'shards')
+
+        rutas_train, clases_train = self._listar_imagenes("entrenamiento")
+        indices_clases = {clase: i for i, clase in enumerate(sorted(set(clases_train)))}
+
+        self.shards = {}
+        for conjunto, (rutas, clases) in (("entrenamiento", (rutas_train, clases_train)),
+                                          ("pruebas", self._listar_imagenes("pruebas"))):
+            self.shards[conjunto] = ShardsImagenes.empaquetar(
+                os.path.join(directorio, conjunto), rutas, clases, indices_clases,
+                self._forma_lectura(), imagenes_por_shard, como_servicio=self.forma_servicio is not None)
+
+        return self.shards
+
+    def usar_shards(self, directorio: Optional[str] = None) -> None:
+        """
+        Activa shards ya empaquetados para los datasets tf.data y las muestras del EDA.
+
+        Args:
+            directorio (str, optional): Carpeta de los shards. Por defecto data/processed/CNN/shards
+        """
+        if directorio is None:
+            directorio = os.path.join(self.directorio_base, 'data', 'processed', 'CNN', 'shards')
+
+        shards = {conjunto: ShardsImagenes(os.path.join(directorio, conjunto))
+                  for conjunto in ("entrenamiento", "pruebas")}
+
+        if shards["entrenamiento"].forma_imagen != self._forma_lectura():
+            raise ValueError(f"Los shards tienen forma {shards['entrenamiento'].forma_imagen} "
+                             f"y la configurada es {self._forma_lectura()}")
+        if self.forma_servicio is not None and not shards["entrenamiento"].como_servicio:
+            raise ValueError(f"Los shards de {directorio} no se empaquetaron con el redimensionado del servicio")
+        self.shards = shards
+
+    def medir_rendimiento_pipeline(self, epocas: int = 2) -> pd.DataFrame:
+        """
+        Compara imágenes por segundo del generador ImageDataGenerator contra el dataset tf.data
+        sobre el conjunto de entrenamiento. Se recorren épocas completas porque la caché de tf.data
+        solo se conserva al terminar la primera; esa época incluye el llenado de la caché.
+
+        Args:
+            epocas (int): Épocas medidas por cada pipeline
+
+        Returns:
+            pd.DataFrame: Imágenes por segundo por pipeline y época
+        """
+        if self.generador_train is None:
+            self.crear_generadores_datos()
+        if self.dataset_train is None:
+            self.crear_datasets_tf()
+
+        resultados = []
+
+        for epoca in range(1, epocas + 1):
+            inicio = time.perf_counter()
+            imagenes = 0
+            for _ in range(len(self.generador_train)):
+                lote, _ = next(self.generador_train)
+                imagenes += len(lote)
+            resultados.append({'Pipeline': 'ImageDataGenerator', 'Epoca': epoca,
+                               'Imagenes_por_segundo': imagenes / (time.perf_counter() - inicio)})
+
+        for epoca in range(1, epocas + 1):
+            inicio = time.perf_counter()
+            imagenes = 0
+            for lote, _ in self.dataset_train:
+                imagenes += int(lote.shape[0])
+            resultados.append({'Pipeline': 'tf.data', 'Epoca': epoca,
+                               'Imagenes_por_segundo': imagenes / (time.perf_counter() - inicio)})
+
+        return pd.DataFrame(resultados)
+
     def obtener_indices_clases(self, tipo_movimiento = "entrenamiento") -> dict:
         """
         Obtiene los índices de las clases del generador de entrenamiento.
@@ -323,6 +746,9 @@ class DataPrepEdaCnn:
         Returns:
             dict: Diccionario con índices de clases
         """
+        if self.generador_train is None and self.indices_clases is not None:
+            return self.indices_clases
+
         if tipo_movimiento == "entrenamiento":
             if self.generador_train is None:
                 raise ValueError("Debe crear los generadores primero")
@@ -343,6 +769,17 @@ class DataPrepEdaCnn:
         """
         self.forma_imagen = (altura, ancho, canales)
 
+    def configurar_forma_servicio(self, altura: int = 256, ancho: int = 256) -> None:
+        """
+        Hace que los datasets tf.data reciban las imágenes como el servicio: primero cv2.resize a
+        (altura, ancho) como cnn._preprocesar_imagen y después 'nearest' hasta forma_imagen.
+
+        Args:
+            altura (int): Altura de entrada del servicio
+            ancho (int): Ancho de entrada del servicio
+        """
+        self.forma_servicio = (altura, ancho)
+
     def configurar_tamano_lote(self, tamano: int) -> None:
         """
         Configura el tamaño del lote para el procesamiento.
@@ -397,7 +834,20 @@ class DataPrepEdaCnn:
         """
         conteos = self.contar_imagenes_por_clase(tipo_movimiento)
         estadisticas = self.analizar_dimensiones_por_clase(tipo_movimiento)
+        return self.construir_reporte(conteos, estadisticas)
 
+    @staticmethod
+    def construir_reporte(conteos: dict, estadisticas: dict) -> pd.DataFrame:
+        """
+        Arma el reporte a partir de conteos y estadísticas ya calculados.
+
+        Args:
+            conteos (dict): Resultado de contar_imagenes_por_clase
+            estadisticas (dict): Resultado de analizar_dimensiones_por_clase
+
+        Returns:
+            pd.DataFrame: DataFrame con estadísticas del dataset
+        """
         datos_reporte = []
 
         for clase in conteos.keys():
@@ -0,0 +1,250 @@
+"""
+Clase: ManifiestoImagenes
+
+Objetivo: Índice persistente (SQLite) de las imágenes del dataset CNN, para que el EDA
+y los generadores consulten el manifiesto en lugar de recorrer el sistema de archivos
+
+Cambios:
+    1. Creacion de la clase 19-10-2026
+    2. Huella del conjunto calculada desde el manifiesto 19-10-2026
+"""
+import os
+import hashlib
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+
+class ManifiestoImagenes:
+    """
+    Registra ruta, conjunto, clase, tamaño, dimensiones, mtime y hash de cada imagen.
+    Se actualiza de forma incremental: solo se vuelven a leer los archivos cuyo mtime o tamaño cambió.
+    """
+
+    # Extensiones que también acepta flow_from_directory
+    EXTENSIONES_IMAGEN = ('.png', '.jpg', '.jpeg', '.bmp', '.ppm', '.tif', '.tiff')
+
+    def __init__(self, directorio_base: str, ruta_manifiesto: Optional[str] = None):
+        """
+        Args:
+            directorio_base (str): Directorio del proyecto; las rutas se guardan relativas a él
+            ruta_manifiesto (str, optional): Archivo SQLite. Por defecto data/processed/CNN/manifiesto_imagenes.sqlite
+        """
+        self.directorio_base = directorio_base
+        if ruta_manifiesto is None:
+            ruta_manifiesto = os.path.join(directorio_base, 'data', 'processed', 'CNN', 'manifiesto_imagenes.sqlite')
+        self.ruta_manifiesto = ruta_manifiesto
+
+        os.makedirs(os.path.dirname(self.ruta_manifiesto), exist_ok=True)
+        # check_same_thread=False: Streamlit y el pool de hilos pueden consultar desde otro hilo
+        self._conexion = sqlite3.connect(self.ruta_manifiesto, check_same_thread=False)
+        self._crear_esquema()
+
+    def _crear_esquema(self) -> None:
+        with self._conexion:
+            self._conexion.execute("""
+                CREATE TABLE IF NOT EXISTS imagenes (
+                    ruta TEXT PRIMARY KEY,
+                    directorio TEXT NOT NULL,
+                    conjunto TEXT NOT NULL,
+                    clase TEXT NOT NULL,
+                    tamano_bytes INTEGER NOT NULL,
+                    altura INTEGER,
+                    ancho INTEGER,
+                    mtime_ns INTEGER NOT NULL,
+                    hash TEXT
+                )
+            """)
+            self._conexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_imagenes_conjunto_clase ON imagenes (conjunto, clase)")
+            self._conexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_imagenes_directorio ON imagenes (directorio)")
+
+    def _relativa(self, ruta: str) -> str:
+        return os.path.relpath(ruta, self.directorio_base).replace(os.sep, '/')
+
+    def _absoluta(self, ruta_relativa: str) -> str:
+        return os.path.join(self.directorio_base, *ruta_relativa.split('/'))
+
+    @staticmethod
+    def _leer_metadatos_archivo(ruta: str) -> Tuple[Optional[int], Optional[int], str]:
+        """
+        Lee dimensiones desde el encabezado y calcula el hash SHA-1 del contenido
+        """
+        altura = ancho = None
+        try:
+            with Image.open(ruta) as imagen:
+                ancho, altura = imagen.size
+        except Exception:
+            pass
+
+        digest = hashlib.sha1()
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(bloque)
+
+        return altura, ancho, digest.hexdigest()
+
+    def actualizar(self, conjuntos: Dict[str, str], max_hilos: Optional[int] = None) -> Dict[str, int]:
+        """
+        Sincroniza el manifiesto con las carpetas de cada conjunto (una subcarpeta por clase).
+
+        Args:
+            conjuntos (Dict[str, str]): Nombre del conjunto -> ruta absoluta de su carpeta
+            max_hilos (int, optional): Hilos para leer encabezados y calcular hashes
+
+        Returns:
+            Dict[str, int]: Conteo de archivos nuevos, modificados, eliminados y sin cambios
+        """
+        registrados = {
+            ruta: (mtime_ns, tamano)
+            for ruta, mtime_ns, tamano in self._conexion.execute(
+                "SELECT ruta, mtime_ns, tamano_bytes FROM imagenes WHERE conjunto IN ({})".format(
+                    ','.join('?' * len(conjuntos))), list(conjuntos.keys()))
+        }
+
+        pendientes = []
+        vistos = set()
+        sin_cambios = 0
+
+        for conjunto, ruta_conjunto in conjuntos.items():
+            if not os.path.isdir(ruta_conjunto):
+                continue
+            for entrada_clase in os.scandir(ruta_conjunto):
+                if not entrada_clase.is_dir():
+                    continue
+                for entrada in os.scandir(entrada_clase.path):
+                    if not entrada.is_file():
+                        continue
+                    estado = entrada.stat()
+                    ruta = self._relativa(entrada.path)
+                    vistos.add(ruta)
+
+                    if registrados.get(ruta) == (estado.st_mtime_ns, estado.st_size):
+                        sin_cambios += 1
+                        continue
+
+                    pendientes.append((ruta, self._relativa(entrada_clase.path), conjunto,
+                                       entrada_clase.name, estado.st_size, estado.st_mtime_ns, entrada.path))
+
+        if max_hilos is None:
+            max_hilos = min(32, (os.cpu_count() or 1) * 4)
+
+        with ThreadPoolExecutor(max_workers=max_hilos) as ejecutor:
+            metadatos = list(ejecutor.map(self._leer_metadatos_archivo, [p[-1] for p in pendientes]))
+
+        eliminados = [(ruta,) for ruta in registrados if ruta not in vistos]
+        nuevos = sum(1 for p in pendientes if p[0] not in registrados)
+
+        with self._conexion:
+            self._conexion.executemany(
+                "INSERT OR REPLACE INTO imagenes "
+                "(ruta, directorio, conjunto, clase, tamano_bytes, altura, ancho, mtime_ns, hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(ruta, directorio, conjunto, clase, tamano, altura, ancho, mtime_ns, hash_contenido)
+                 for (ruta, directorio, conjunto, clase, tamano, mtime_ns, _), (altura, ancho, hash_contenido)
+                 in zip(pendientes, metadatos)])
+            self._conexion.executemany("DELETE FROM imagenes WHERE ruta = ?", eliminados)
+
+        return {
+            'nuevos': nuevos,
+            'modificados': len(pendientes) - nuevos,
+            'eliminados': len(eliminados),
+            'sin_cambios': sin_cambios
+        }
+
+    def clases(self, conjunto: str) -> List[str]:
+        """
+        Clases registradas en un conjunto, en orden alfabético
+        """
+        return [fila[0] for fila in self._conexion.execute(
+            "SELECT DISTINCT clase FROM imagenes WHERE conjunto = ? ORDER BY clase", (conjunto,))]
+
+    def conteos(self, conjunto: str) -> Dict[str, int]:
+        """
+        Número de archivos por clase en un conjunto
+        """
+        return dict(self._conexion.execute(
+            "SELECT clase, COUNT(*) FROM imagenes WHERE conjunto = ? GROUP BY clase ORDER BY clase",
+            (conjunto,)))
+
+    def dimensiones(self, conjunto: str, clase: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Alturas y anchos de las imágenes válidas de un conjunto, opcionalmente de una sola clase
+        """
+        consulta = "SELECT altura, ancho FROM imagenes WHERE conjunto = ? AND altura IS NOT NULL"
+        parametros = [conjunto]
+        if clase is not None:
+            consulta += " AND clase = ?"
+            parametros.append(clase)
+
+        dimensiones = np.array(self._conexion.execute(consulta, parametros).fetchall(),
+                               dtype=np.int64).reshape(-1, 2)
+        return dimensiones[:, 0], dimensiones[:, 1]
+
+    def contiene_directorio(self, ruta_carpeta: str) -> bool:
+        """
+        Indica si la carpeta está registrada en el manifiesto
+        """
+        return self._conexion.execute(
+            "SELECT 1 FROM imagenes WHERE directorio = ? LIMIT 1",
+            (self._relativa(ruta_carpeta),)).fetchone() is not None
+
+    def dimensiones_directorio(self, ruta_carpeta: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Alturas y anchos de las imágenes válidas de una carpeta registrada
+        """
+        dimensiones = np.array(self._conexion.execute(
+            "SELECT altura, ancho FROM imagenes WHERE directorio = ? AND altura IS NOT NULL",
+            (self._relativa(ruta_carpeta),)).fetchall(), dtype=np.int64).reshape(-1, 2)
+        return dimensiones[:, 0], dimensiones[:, 1]
+
+    def rutas(self, conjunto: str, clase: Optional[str] = None, limite: Optional[int] = None) -> List[str]:
+        """
+        Rutas absolutas de las imágenes válidas, ordenadas por clase y nombre
+        """
+        consulta = "SELECT ruta FROM imagenes WHERE conjunto = ? AND altura IS NOT NULL"
+        parametros = [conjunto]
+        if clase is not None:
+            consulta += " AND clase = ?"
+            parametros.append(clase)
+        consulta += " ORDER BY clase, ruta"
+        if limite is not None:
+            consulta += " LIMIT ?"
+            parametros.append(int(limite))
+
+        return [self._absoluta(fila[0]) for fila in self._conexion.execute(consulta, parametros)]
+
+    def como_dataframe(self, conjunto: str, solo_imagenes: bool = True) -> pd.DataFrame:
+        """
+        Manifiesto de un conjunto como DataFrame, con la ruta absoluta en la columna 'ruta'
+
+        Args:
+            conjunto (str): Nombre del conjunto
+            solo_imagenes (bool): Excluir archivos sin dimensiones o con extensión no soportada
+        """
+        df = pd.read_sql_query(
+            "SELECT * FROM imagenes WHERE conjunto = ? ORDER BY clase, ruta", self._conexion, params=(conjunto,))
+
+        if solo_imagenes:
+            df = df[df['altura'].notna() & df['ruta'].str.lower().str.endswith(self.EXTENSIONES_IMAGEN)]
+
+        df['ruta'] = [self._absoluta(ruta) for ruta in df['ruta']]
+        return df.reset_index(drop=True)
+
+    def huella(self, conjunto: str) -> str:
+        """
+        Huella del conjunto a partir de ruta, tamaño y mtime registrados, sin recorrer las carpetas
+        """
+        digest = hashlib.sha1()
+        for ruta, tamano, mtime_ns in self._conexion.execute(
+                "SELECT ruta, tamano_bytes, mtime_ns FROM imagenes WHERE conjunto = ? ORDER BY ruta", (conjunto,)):
+            digest.update(f"{ruta}|{tamano}|{mtime_ns}\n".encode())
+        return digest.hexdigest()
+
+    def cerrar(self) -> None:
+        self._conexion.close()
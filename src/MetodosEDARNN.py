@@ -2,6 +2,7 @@
 #%%
 import os
 from datetime import datetime
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -17,26 +18,39 @@ class MetodosEDARNN:
         self.base_path_func = base_path_func
         self.proyecto = proyecto
         self.scaler = MinMaxScaler()
-        self.meses_es_en = {
-
-            'enero': 'January', 'febrero': 'February', 'marzo': 'March',
-            'abril': 'April', 'mayo': 'May', 'junio': 'June',
-            'julio': 'July', 'agosto': 'August', 'septiembre': 'September',
-            'octubre': 'October', 'noviembre': 'November', 'diciembre': 'December'
+        self.meses_numero = {
+            'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6,
+            'julio': 7, 'agosto': 8, 'septiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12
         }
 
+    @staticmethod
+    def _meses_absolutos(fechas: pd.Series) -> np.ndarray:
+        # Meses desde 1970-01 como enteros: la fecha se trunca al mes sin pasar por Period
+        return fechas.to_numpy(dtype='datetime64[ns]').astype('datetime64[M]').astype(np.int64)
 
     def transformar_fechas(self):
+        # Los nombres de mes se traducen una vez por valor distinto, no por fila
+        codigos, nombres = pd.factorize(self.df['mes'])
+        numeros = pd.Index(nombres).str.lower().str.strip().map(self.meses_numero)
+        desconocidos = [nombre for nombre, numero in zip(nombres, numeros) if pd.isna(numero)]
+        if desconocidos or (codigos < 0).any():
+            raise ValueError(f"Meses no reconocidos: {desconocidos or ['vacío']}")
+
+        mes = numeros.to_numpy(dtype=np.int64)[codigos]
+        anio = pd.to_numeric(self.df['anio']).to_numpy(dtype=np.int64)
 
-            self.df['mes_en'] = self.df['mes'].str.lower().map(self.meses_es_en)
-            self.df['fecha'] = pd.to_datetime(
-                self.df['mes_en'] + ' ' + self.df['anio'].astype(str), format='%B %Y'
-            )
-            self.df.drop(columns=['mes', 'anio', 'mes_en'], inplace=True)
+        # Fecha armada directo desde enteros año/mes
+        self.df['fecha'] = ((anio - 1970) * 12 + mes - 1).astype('datetime64[M]').astype('datetime64[ns]')
+        self.df.drop(columns=['mes', 'anio'], inplace=True)
 
     def preparar_categorica(self, columna: str):
         try:
-            self.df[f'{columna}_id'] = self.df[columna].astype('category').cat.codes
+            # Códigos en orden alfabético de categoría (-1 para nulos) y el menor entero que los
+            # contiene, igual que astype('category').cat.codes
+            codigos, categorias = pd.factorize(self.df[columna], sort=True)
+            tipo = next((tipo for tipo in (np.int8, np.int16, np.int32)
+                         if len(categorias) < np.iinfo(tipo).max), np.int64)
+            self.df[f'{columna}_id'] = codigos.astype(tipo)
             num_categorias = self.df[f'{columna}_id'].nunique()
             self.df.drop(columns=[columna], inplace=True)
             return num_categorias
@@ -51,13 +65,23 @@ class MetodosEDARNN:
 
     def validar_cobertura(self, fecha_inicio: str = '2005-01-01', fecha_fin: str = '2025-05-01') -> pd.DataFrame:
         try:
-            fechas = pd.date_range(start=fecha_inicio, end=fecha_fin, freq='MS')
-            cantones = self.df['canton'].unique()
-            combinaciones = pd.MultiIndex.from_product([cantones, fechas], names=['canton', 'fecha']).to_frame(index=False)
-            self.df['fecha'] = self.df['fecha'].dt.to_period('M').dt.to_timestamp()
-            df_existente = self.df[['canton', 'fecha']].drop_duplicates()
-            faltantes = combinaciones.merge(df_existente, on=['canton', 'fecha'], how='left', indicator=True)
-            faltantes = faltantes[faltantes['_merge'] == 'left_only'].drop(columns=['_merge'])
+            inicio, fin = self._meses_absolutos(pd.Series(pd.to_datetime([fecha_inicio, fecha_fin])))
+            num_meses = max(int(fin - inicio) + 1, 0)
+
+            meses = self._meses_absolutos(self.df['fecha'])
+            self.df['fecha'] = meses.astype('datetime64[M]').astype('datetime64[ns]')
+
+            # Cada par (cantón, mes) es un entero: código de cantón * num_meses + mes relativo
+            codigos, cantones = pd.factorize(self.df['canton'], use_na_sentinel=False)
+            en_rango = (meses >= inicio) & (meses <= fin)
+            existentes = np.unique(codigos[en_rango] * num_meses + (meses[en_rango] - inicio))
+            claves = np.setdiff1d(np.arange(len(cantones) * num_meses), existentes, assume_unique=True)
+
+            canton, desplazamiento = np.divmod(claves, num_meses) if num_meses else (claves, claves)
+            faltantes = pd.DataFrame({
+                'canton': cantones.take(canton),
+                'fecha': (inicio + desplazamiento).astype('datetime64[M]').astype('datetime64[ns]')
+            }, index=claves)
 
             return faltantes
         except Exception as e:
@@ -4,6 +4,11 @@ Este script replica todo el flujo del notebook EDA_CNN.ipynb de manera automatiz
 """
 
 import os
+import json
+import time
+import sqlite3
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -17,22 +22,39 @@ class PipelineEDA:
     Pipeline que replica exactamente el flujo del Jupyter Notebook EDA_CNN.ipynb
     """
 
-    def __init__(self, directorio_proyecto="AgroIA", mostrar_graficos=False):
+    def __init__(self, directorio_proyecto="AgroIA", mostrar_graficos=False, usar_cache=True):
         """
         Inicializa el pipeline EDA.
 
         Args:
             directorio_proyecto: Nombre del directorio del proyecto
             mostrar_graficos: Si mostrar los gráficos (False para ejecución silenciosa)
+            usar_cache: Reutilizar el análisis de un conjunto si sus archivos no cambiaron
         """
         self.directorio_proyecto = directorio_proyecto
         self.mostrar_graficos = mostrar_graficos
+        self.usar_cache = usar_cache
         self.analizador = None
         self.clases = None
         self.conteos_train = None
         self.conteos_test = None
+        self.analisis_conjuntos = None
+        self.tiempos_pasos = []
         self.configurado = False
 
+    def _ejecutar_paso(self, nombre, funcion):
+        """Ejecuta un paso y registra su duración"""
+        inicio = time.perf_counter()
+        funcion()
+        self.tiempos_pasos.append({'Paso': nombre, 'Segundos': round(time.perf_counter() - inicio, 3)})
+
+    def _mostrar_tiempos(self):
+        """Imprime la tabla de tiempos por paso"""
+        tabla = pd.DataFrame(self.tiempos_pasos)
+        print("\n⏱️ Tiempo por paso:")
+        print(tabla.to_string(index=False))
+        print(f"  Total: {tabla['Segundos'].sum():.3f} s")
+
     def ejecutar_eda_completo(self):
         """
         Ejecuta todo el EDA siguiendo exactamente el flujo del notebook.
@@ -41,50 +63,31 @@ class PipelineEDA:
         print("🚀 Iniciando Pipeline EDA Automatizado")
         print("=" * 50)
 
-        # Paso 1: Importaciones y configuración inicial
-        self._paso_1_importaciones()
-
-        # Paso 2: Inicializar el analizador
-        self._paso_2_inicializar_analizador()
-
-        # Paso 3: Configurar rutas y explorar estructura
-        self._paso_3_configurar_rutas()
-
-        # Paso 4: Análisis cuantitativo del dataset
-        self._paso_4_analisis_cuantitativo()
-
-        # Paso 5: Análisis de dimensiones
-        self._paso_5_analisis_dimensiones()
-
-        # Paso 6: Generar reporte completo
-        self._paso_6_generar_reporte()
-
-        # Paso 7: Visualizaciones (opcional)
-        if self.mostrar_graficos:
-            self._paso_7_visualizaciones()
-
-        # Paso 8: Mostrar imágenes de muestra (opcional)
-        if self.mostrar_graficos:
-            self._paso_8_mostrar_muestras()
-
-        # Paso 9: Configuración del procesamiento
-        self._paso_9_configurar_procesamiento()
-
-        # Paso 10: Configurar generador con aumento de datos
-        self._paso_10_configurar_generador()
-
-        # Paso 11: Crear generadores de datos
-        self._paso_11_crear_generadores()
-
-        # Paso 12: Mostrar índices de clases
-        self._paso_12_mostrar_indices()
-
-        # Paso 13: Transformaciones de ejemplo (opcional)
-        if self.mostrar_graficos:
-            self._paso_13_transformaciones_ejemplo()
-
-        # Paso 14: Resumen final
-        self._paso_14_resumen_final()
+        self.tiempos_pasos = []
+
+        # Los pasos opcionales solo se ejecutan si se muestran gráficos
+        pasos = [
+            ("1. Importaciones", self._paso_1_importaciones, True),
+            ("2. Inicializar analizador", self._paso_2_inicializar_analizador, True),
+            ("3. Configurar rutas", self._paso_3_configurar_rutas, True),
+            ("4. Análisis cuantitativo", self._paso_4_analisis_cuantitativo, True),
+            ("5. Análisis de dimensiones", self._paso_5_analisis_dimensiones, True),
+            ("6. Reporte completo", self._paso_6_generar_reporte, True),
+            ("7. Visualizaciones", self._paso_7_visualizaciones, self.mostrar_graficos),
+            ("8. Imágenes de muestra", self._paso_8_mostrar_muestras, self.mostrar_graficos),
+            ("9. Configurar procesamiento", self._paso_9_configurar_procesamiento, True),
+            ("10. Configurar generador", self._paso_10_configurar_generador, True),
+            ("11. Crear generadores", self._paso_11_crear_generadores, True),
+            ("12. Índices de clases", self._paso_12_mostrar_indices, True),
+            ("13. Transformaciones de ejemplo", self._paso_13_transformaciones_ejemplo, self.mostrar_graficos),
+            ("14. Resumen final", self._paso_14_resumen_final, True),
+        ]
+
+        for nombre, funcion, activo in pasos:
+            if activo:
+                self._ejecutar_paso(nombre, funcion)
+
+        self._mostrar_tiempos()
 
         self.configurado = True
         print("\n✅ Pipeline EDA completado exitosamente")
@@ -122,6 +125,15 @@ class PipelineEDA:
         # Configurar rutas de train y test
         self.analizador.configurar_rutas()
 
+        # El EDA y los generadores consultan el manifiesto; si SQLite no está disponible se
+        # recorren las carpetas como antes
+        try:
+            cambios = self.analizador.usar_manifiesto()
+            print(f"🗂️ Manifiesto de imágenes actualizado: {cambios}")
+        except (sqlite3.Error, OSError) as e:
+            self.analizador.manifiesto = None
+            print(f"⚠️ Manifiesto no disponible ({e}); se recorrerán las carpetas")
+
         print("📁 Contenido del directorio principal:")
         contenido_principal = self.analizador.listar_contenido()
         for item in contenido_principal:
@@ -140,12 +152,82 @@ class PipelineEDA:
 
         self.clases = clases_train
 
+    def _huella_conjunto(self, ruta_conjunto):
+        """Huella del conjunto a partir de nombre, tamaño y fecha de modificación de cada archivo"""
+        digest = hashlib.sha1()
+        for entrada_clase in sorted(os.scandir(ruta_conjunto), key=lambda e: e.name):
+            if not entrada_clase.is_dir():
+                continue
+            for entrada in sorted(os.scandir(entrada_clase.path), key=lambda e: e.name):
+                estado = entrada.stat()
+                digest.update(f"{entrada_clase.name}/{entrada.name}|{estado.st_size}|{estado.st_mtime_ns}\n".encode())
+        return digest.hexdigest()
+
+    def _analizar_conjunto(self, tipo_movimiento):
+        """
+        Conteos y estadísticas de dimensiones de un conjunto, leídos de la caché
+        si la huella del conjunto no cambió
+        """
+        ruta_conjunto = self.analizador.ruta_train if tipo_movimiento == "entrenamiento" else self.analizador.ruta_test
+        ruta_cache = os.path.join(self.analizador.directorio_base, 'data', 'processed', 'CNN', 'cache_eda',
+                                  f'{tipo_movimiento}.json')
+
+        huella = None
+        if self.usar_cache:
+            # Con manifiesto, la huella sale de los tamaños y mtime ya registrados
+            manifiesto = self.analizador.manifiesto
+            huella = (manifiesto.huella(tipo_movimiento) if manifiesto is not None
+                      else self._huella_conjunto(ruta_conjunto))
+        if huella is not None and os.path.exists(ruta_cache):
+            try:
+                with open(ruta_cache, 'r', encoding='utf-8') as f:
+                    cache = json.load(f)
+                if cache['huella'] == huella:
+                    return {'conteos': cache['conteos'], 'estadisticas': cache['estadisticas'], 'desde_cache': True}
+            except (OSError, ValueError, KeyError):
+                pass
+
+        conteos = self.analizador.contar_imagenes_por_clase(tipo_movimiento)
+        estadisticas = self.analizador.analizar_dimensiones_por_clase(tipo_movimiento)
+
+        # Tipos nativos para poder serializar a JSON
+        conteos = {clase: int(cantidad) for clase, cantidad in conteos.items()}
+        estadisticas = {
+            clase: {clave: (int(valor) if clave in ('altura_min', 'altura_max', 'ancho_min', 'ancho_max',
+                                                    'total_imagenes') else float(valor))
+                    for clave, valor in stats.items()}
+            for clase, stats in estadisticas.items()
+        }
+
+        if huella is not None:
+            os.makedirs(os.path.dirname(ruta_cache), exist_ok=True)
+            ruta_temporal = ruta_cache + '.tmp'
+            with open(ruta_temporal, 'w', encoding='utf-8') as f:
+                json.dump({'huella': huella, 'conteos': conteos, 'estadisticas': estadisticas}, f)
+            os.replace(ruta_temporal, ruta_cache)
+
+        return {'conteos': conteos, 'estadisticas': estadisticas, 'desde_cache': False}
+
+    def _analizar_conjuntos(self):
+        """Analiza entrenamiento y pruebas en paralelo; son independientes entre sí"""
+        with ThreadPoolExecutor(max_workers=2) as ejecutor:
+            futuros = {tipo: ejecutor.submit(self._analizar_conjunto, tipo) for tipo in ("entrenamiento", "pruebas")}
+            self.analisis_conjuntos = {tipo: futuro.result() for tipo, futuro in futuros.items()}
+
+        for tipo, analisis in self.analisis_conjuntos.items():
+            analisis['reporte'] = self.analizador.construir_reporte(analisis['conteos'], analisis['estadisticas'])
+            if analisis['desde_cache']:
+                print(f"♻️ Análisis de {tipo} recuperado de la caché (sin cambios en los archivos)")
+
     def _paso_4_analisis_cuantitativo(self):
         """Paso 4: Análisis cuantitativo del dataset"""
         print("\n📊 Paso 4: Análisis cuantitativo del dataset")
 
+        # Los pasos 4 a 6 usan el análisis de ambos conjuntos, calculado una sola vez y en paralelo
+        self._analizar_conjuntos()
+
         # Contar imágenes por clase - entrenamiento
-        self.conteos_train = self.analizador.contar_imagenes_por_clase("entrenamiento")
+        self.conteos_train = self.analisis_conjuntos["entrenamiento"]["conteos"]
 
         print("📊 Distribución de imágenes entrenamiento por clase:")
         total_imagenes_train = 0
@@ -156,7 +238,7 @@ class PipelineEDA:
         print(f"\n📈 Total de imágenes entrenamiento: {total_imagenes_train:,}")
 
         # Contar imágenes por clase - pruebas
-        self.conteos_test = self.analizador.contar_imagenes_por_clase("pruebas")
+        self.conteos_test = self.analisis_conjuntos["pruebas"]["conteos"]
 
         print("\n📊 Distribución de imágenes pruebas por clase:")
         total_imagenes_test = 0
@@ -214,7 +296,7 @@ class PipelineEDA:
         print("\n📏 Paso 5: Análisis de dimensiones de las imágenes")
 
         # Analizar dimensiones entrenamiento
-        estadisticas_dim_train = self.analizador.analizar_dimensiones_por_clase("entrenamiento")
+        estadisticas_dim_train = self.analisis_conjuntos["entrenamiento"]["estadisticas"]
 
         print("📏 Estadísticas de dimensiones por clase para entrenamiento:\n")
         for clase, stats in estadisticas_dim_train.items():
@@ -227,7 +309,7 @@ class PipelineEDA:
             print()
 
         # Analizar dimensiones pruebas
-        estadisticas_dim_test = self.analizador.analizar_dimensiones_por_clase("pruebas")
+        estadisticas_dim_test = self.analisis_conjuntos["pruebas"]["estadisticas"]
 
         print("📏 Estadísticas de dimensiones por clase para pruebas:\n")
         for clase, stats in estadisticas_dim_test.items():
@@ -244,7 +326,7 @@ class PipelineEDA:
         print("📋 Paso 6: Generar reporte completo del dataset")
 
         # Reporte entrenamiento
-        reporte_df_train = self.analizador.generar_reporte_dataset("entrenamiento")
+        reporte_df_train = self.analisis_conjuntos["entrenamiento"]["reporte"]
 
         print("📋 Reporte completo del dataset entrenamiento:")
         print(reporte_df_train.to_string(index=False))
@@ -256,7 +338,7 @@ class PipelineEDA:
         print(f"  • Total de imágenes: {reporte_df_train['Num_Imagenes'].sum():,}")
 
         # Reporte pruebas
-        reporte_df_test = self.analizador.generar_reporte_dataset("pruebas")
+        reporte_df_test = self.analisis_conjuntos["pruebas"]["reporte"]
 
         print("\n📋 Reporte completo del dataset pruebas:")
         print(reporte_df_test.to_string(index=False))
@@ -336,12 +418,12 @@ class PipelineEDA:
         # Mostrar información de los generadores
         print(f"\n📊 Información del generador de entrenamiento:")
         print(f"  • Número de muestras: {self.analizador.generador_train.samples}")
-        print(f"  • Número de clases: {self.analizador.generador_train.num_classes}")
+        print(f"  • Número de clases: {len(self.analizador.generador_train.class_indices)}")
         print(f"  • Tamaño de lote: {self.analizador.generador_train.batch_size}")
 
         print(f"\n📊 Información del generador de prueba:")
         print(f"  • Número de muestras: {self.analizador.generador_test.samples}")
-        print(f"  • Número de clases: {self.analizador.generador_test.num_classes}")
+        print(f"  • Número de clases: {len(self.analizador.generador_test.class_indices)}")
         print(f"  • Tamaño de lote: {self.analizador.generador_test.batch_size}")
 
     def _paso_12_mostrar_indices(self):
@@ -368,9 +450,12 @@ class PipelineEDA:
 
         # Seleccionar una imagen de ejemplo
         clase_ejemplo = self.clases[0]
-        ruta_clase_ejemplo = os.path.join(self.analizador.ruta_train, clase_ejemplo)
-        imagenes_ejemplo = os.listdir(ruta_clase_ejemplo)
-        imagen_ejemplo = os.path.join(ruta_clase_ejemplo, imagenes_ejemplo[0])
+        if self.analizador.manifiesto is not None:
+            imagen_ejemplo = self.analizador.manifiesto.rutas("entrenamiento", clase_ejemplo, 1)[0]
+        else:
+            ruta_clase_ejemplo = os.path.join(self.analizador.ruta_train, clase_ejemplo)
+            imagenes_ejemplo = os.listdir(ruta_clase_ejemplo)
+            imagen_ejemplo = os.path.join(ruta_clase_ejemplo, imagenes_ejemplo[0])
 
         print(f"🔄 Ejemplos de transformaciones aplicadas a: {clase_ejemplo}")
         self.analizador.mostrar_transformacion_ejemplo(imagen_ejemplo, num_transformaciones=5)
@@ -420,7 +505,7 @@ class PipelineEDA:
             'conteos_test': self.conteos_test,
             'forma_imagen': self.analizador.forma_imagen,
             'tamano_lote': self.analizador.tamano_lote,
-            'num_clases': self.analizador.generador_train.num_classes,
+            'num_clases': len(self.analizador.generador_train.class_indices),
             'indices_clases': self.analizador.obtener_indices_clases("entrenamiento")
         }
 
@@ -0,0 +1,219 @@
+"""
+Clase: ShardsImagenes
+
+Objetivo: Formato empaquetado del dataset CNN: imágenes ya redimensionadas en shards uint8
+mapeados en memoria, para leer muestras sin decodificar JPEG y con acceso aleatorio O(1)
+
+Cambios:
+    1. Creacion de la clase 19-10-2026
+    2. Datasets sobre un subconjunto de índices y empaquetado con el redimensionado del servicio 19-10-2026
+"""
+import os
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+class ShardsImagenes:
+    """
+    Lector de un conjunto empaquetado. Estructura del directorio:
+        imagenes_00000.npy ... : arreglos uint8 (n, alto, ancho, 3) de tamaño fijo salvo el último
+        etiquetas.npy          : índice de clase de cada imagen
+        manifiesto.json        : forma, clases, shards y ruta de origen de cada imagen
+    """
+
+    ARCHIVO_MANIFIESTO = 'manifiesto.json'
+    ARCHIVO_ETIQUETAS = 'etiquetas.npy'
+
+    def __init__(self, directorio: str):
+        """
+        Args:
+            directorio (str): Carpeta generada por empaquetar()
+        """
+        self.directorio = directorio
+
+        with open(os.path.join(directorio, self.ARCHIVO_MANIFIESTO), 'r', encoding='utf-8') as f:
+            self.manifiesto = json.load(f)
+
+        self.forma_imagen = tuple(self.manifiesto['forma_imagen'])
+        self.como_servicio = bool(self.manifiesto.get('como_servicio', False))
+        self.imagenes_por_shard = int(self.manifiesto['imagenes_por_shard'])
+        self.indices_clases = self.manifiesto['indices_clases']
+        self.rutas = self.manifiesto['rutas']
+        self.etiquetas = np.load(os.path.join(directorio, self.ARCHIVO_ETIQUETAS), mmap_mode='r')
+        self.shards = [np.load(os.path.join(directorio, archivo), mmap_mode='r')
+                       for archivo in self.manifiesto['shards']]
+
+    def __len__(self) -> int:
+        return len(self.etiquetas)
+
+    def __getitem__(self, indice: int) -> Tuple[np.ndarray, int]:
+        """
+        Imagen (vista sin copia sobre el shard) y etiqueta de una muestra
+        """
+        shard, posicion = divmod(int(indice), self.imagenes_por_shard)
+        return self.shards[shard][posicion], int(self.etiquetas[indice])
+
+    def lote(self, indices) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Copia en un arreglo contiguo las imágenes de un lote de índices arbitrarios.
+
+        Args:
+            indices (array-like): Índices de las muestras
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Imágenes uint8 (n, alto, ancho, 3) y etiquetas (n,)
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        imagenes = np.empty((len(indices),) + self.forma_imagen, dtype=np.uint8)
+        shards, posiciones = np.divmod(indices, self.imagenes_por_shard)
+
+        # Una lectura por shard en lugar de una por imagen
+        for shard in np.unique(shards):
+            mascara = shards == shard
+            imagenes[mascara] = self.shards[shard][posiciones[mascara]]
+
+        return imagenes, np.asarray(self.etiquetas[indices], dtype=np.int64)
+
+    def crear_dataset(self, tamano_lote: int, mezclar: bool = False, indices=None):
+        """
+        Dataset tf.data de lotes (imágenes uint8, índices de clase) leídos desde los shards.
+
+        Args:
+            tamano_lote (int): Tamaño del lote
+            mezclar (bool): Mezclar los índices en cada época
+            indices (array-like, optional): Solo estas muestras; por defecto todas
+
+        Returns:
+            tf.data.Dataset: Lotes (imágenes, etiquetas)
+        """
+        import tensorflow as tf
+
+        if indices is None:
+            dataset = tf.data.Dataset.range(len(self))
+            total = len(self)
+        else:
+            dataset = tf.data.Dataset.from_tensor_slices(np.asarray(indices, dtype=np.int64))
+            total = len(indices)
+        if mezclar:
+            dataset = dataset.shuffle(total, reshuffle_each_iteration=True)
+        dataset = dataset.batch(tamano_lote)
+
+        def leer(indices):
+            imagenes, etiquetas = tf.numpy_function(self.lote, [indices], (tf.uint8, tf.int64))
+            imagenes.set_shape((None,) + self.forma_imagen)
+            etiquetas.set_shape((None,))
+            return imagenes, etiquetas
+
+        return dataset.map(leer, num_parallel_calls=tf.data.AUTOTUNE)
+
+    @staticmethod
+    def _leer_imagen(ruta: str, altura: int, ancho: int, como_servicio: bool = False) -> np.ndarray:
+        with Image.open(ruta) as imagen:
+            imagen = imagen.convert('RGB')
+            if imagen.size == (ancho, altura):
+                return np.asarray(imagen, dtype=np.uint8)
+            if como_servicio:
+                # Mismo cv2.resize (bilineal) que cnn._preprocesar_imagen
+                return cv2.resize(np.asarray(imagen, dtype=np.uint8), (ancho, altura))
+            # Misma conversión que load_img de Keras: RGB e interpolación 'nearest'
+            return np.asarray(imagen.resize((ancho, altura), Image.NEAREST), dtype=np.uint8)
+
+    @classmethod
+    def empaquetar(cls, directorio: str, rutas: List[str], clases: List[str],
+                   indices_clases: Dict[str, int], forma_imagen: Tuple[int, int, int],
+                   imagenes_por_shard: int = 1024, max_hilos: Optional[int] = None,
+                   como_servicio: bool = False) -> 'ShardsImagenes':
+        """
+        Decodifica y redimensiona una sola vez las imágenes y las escribe en shards.
+
+        Args:
+            directorio (str): Carpeta de salida
+            rutas (List[str]): Rutas de las imágenes, en el orden en que se guardarán
+            clases (List[str]): Clase de cada imagen
+            indices_clases (Dict[str, int]): Mapeo clase -> índice
+            forma_imagen (Tuple[int, int, int]): (alto, ancho, canales)
+            imagenes_por_shard (int): Imágenes por archivo
+            max_hilos (int, optional): Hilos de decodificación
+            como_servicio (bool): Redimensionar con cv2 como el servicio en lugar de 'nearest'
+
+        Returns:
+            ShardsImagenes: Lector sobre los shards generados
+        """
+        os.makedirs(directorio, exist_ok=True)
+        altura, ancho = forma_imagen[:2]
+        if max_hilos is None:
+            max_hilos = min(32, (os.cpu_count() or 1) * 4)
+
+        ruta_manifiesto = os.path.join(directorio, cls.ARCHIVO_MANIFIESTO)
+        if os.path.exists(ruta_manifiesto):
+            # Un manifiesto viejo junto a shards a medio escribir no debe poder cargarse
+            os.remove(ruta_manifiesto)
+
+        archivos_shards = []
+        with ThreadPoolExecutor(max_workers=max_hilos) as ejecutor:
+            for numero, inicio in enumerate(range(0, len(rutas), imagenes_por_shard)):
+                rutas_shard = rutas[inicio:inicio + imagenes_por_shard]
+                archivo = f'imagenes_{numero:05d}.npy'
+                shard = np.lib.format.open_memmap(os.path.join(directorio, archivo), mode='w+',
+                                                  dtype=np.uint8, shape=(len(rutas_shard), altura, ancho, 3))
+
+                for posicion, imagen in enumerate(
+                        ejecutor.map(lambda ruta: cls._leer_imagen(ruta, altura, ancho, como_servicio),
+                                     rutas_shard)):
+                    shard[posicion] = imagen
+
+                shard.flush()
+                del shard
+                archivos_shards.append(archivo)
+
+        np.save(os.path.join(directorio, cls.ARCHIVO_ETIQUETAS),
+                np.array([indices_clases[clase] for clase in clases], dtype=np.int64))
+
+        # El manifiesto se escribe al final para que un empaquetado interrumpido no se cargue
+        with open(ruta_manifiesto, 'w', encoding='utf-8') as f:
+            json.dump({
+                'forma_imagen': [altura, ancho, 3],
+                'imagenes_por_shard': imagenes_por_shard,
+                'como_servicio': como_servicio,
+                'indices_clases': indices_clases,
+                'shards': archivos_shards,
+                'rutas': list(rutas)
+            }, f)
+
+        return cls(directorio)
+
+
+def main():
+    from src.DataPrepEdaCnn import DataPrepEdaCnn
+
+    parser = argparse.ArgumentParser(description="Empaqueta el dataset CNN en shards uint8 redimensionados")
+    parser.add_argument('--directorio-base', default='.', help="Directorio raíz del proyecto")
+    parser.add_argument('--salida', default=os.path.join('data', 'processed', 'CNN', 'shards'),
+                        help="Carpeta de salida, relativa al directorio base")
+    parser.add_argument('--alto', type=int, default=256)
+    parser.add_argument('--ancho', type=int, default=256)
+    parser.add_argument('--imagenes-por-shard', type=int, default=1024)
+    parser.add_argument('--sin-manifiesto', action='store_true',
+                        help="Listar las carpetas en lugar de usar el manifiesto de imágenes")
+    argumentos = parser.parse_args()
+
+    analizador = DataPrepEdaCnn(os.path.abspath(argumentos.directorio_base))
+    analizador.configurar_rutas()
+    analizador.configurar_forma_imagen(argumentos.alto, argumentos.ancho)
+    if not argumentos.sin_manifiesto:
+        analizador.usar_manifiesto()
+
+    for conjunto, lector in analizador.empaquetar_shards(
+            os.path.join(analizador.directorio_base, argumentos.salida),
+            argumentos.imagenes_por_shard).items():
+        print(f"{conjunto}: {len(lector)} imágenes en {len(lector.shards)} shards -> {lector.directorio}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""
+Clase: VentanasRNN
+
+Objetivo: Construcción de los tensores de entrenamiento del LSTM (muestras, 12, 4) a partir del
+formato largo por cantón, con vistas de ventana deslizante y salida en arreglos mapeados en memoria
+
+Cambios:
+    1. Creacion de la clase 19-10-2026
+    2. Cero muestras, sin error, cuando hay menos filas que longitud + horizonte 19-10-2026
+"""
+import os
+import json
+import logging
+import argparse
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.train.rnn import COLUMNAS_MODELO, VENTANA
+
+logger = logging.getLogger(__name__)
+
+
+class VentanasRNN:
+    """
+    Cada muestra es una ventana de `longitud` meses consecutivos de un mismo cantón y su objetivo
+    son los `horizonte` meses siguientes. Las ventanas no cruzan cantones ni huecos de meses.
+    Estructura del directorio generado por escribir():
+        x.npy           : float32 (muestras, longitud, variables)
+        y.npy           : float32 (muestras, horizonte, objetivos)
+        origenes.npy    : primer mes pronosticado de cada muestra, en meses desde 1970-01
+        series.npy      : índice del cantón de cada muestra
+        manifiesto.json : columnas, cantones y formas
+    """
+
+    ARCHIVO_MANIFIESTO = 'manifiesto.json'
+    ARCHIVO_X = 'x.npy'
+    ARCHIVO_Y = 'y.npy'
+    ARCHIVO_ORIGENES = 'origenes.npy'
+    ARCHIVO_SERIES = 'series.npy'
+
+    def __init__(self, longitud: int = VENTANA, horizonte: int = 1,
+                 columnas: Sequence[str] = tuple(COLUMNAS_MODELO),
+                 columnas_objetivo: Sequence[str] = ('produccion',),
+                 columna_serie: str = 'canton', escalador=None):
+        """
+        Args:
+            longitud (int): Meses de historia por muestra
+            horizonte (int): Meses objetivo por muestra
+            columnas (Sequence[str]): Variables de entrada, en el orden del modelo
+            columnas_objetivo (Sequence[str]): Variables objetivo (subconjunto de columnas)
+            columna_serie (str): Columna que identifica la serie; si no existe hay una sola serie
+            escalador (MinMaxScaler, optional): Escalador ajustado con feature_names_in_, por
+                ejemplo models/scaler.pkl; sin él se usan los valores originales
+        """
+        self.longitud = longitud
+        self.horizonte = horizonte
+        self.columnas = list(columnas)
+        self.columnas_objetivo = list(columnas_objetivo)
+        self.columna_serie = columna_serie
+        self.escalador = escalador
+
+    def _preparar(self, df: pd.DataFrame):
+        """
+        Valores escalados, meses enteros y código de serie de cada fila, ordenados por serie y mes
+        """
+        if self.columna_serie in df.columns:
+            codigos, series = pd.factorize(df[self.columna_serie], sort=True)
+        else:
+            codigos, series = np.zeros(len(df), dtype=np.int64), pd.Index([None])
+
+        meses = pd.to_datetime(df['fecha']).to_numpy(dtype='datetime64[ns]') \
+            .astype('datetime64[M]').astype(np.int64)
+        orden = np.lexsort((meses, codigos))
+        codigos, meses = codigos[orden], meses[orden]
+
+        if np.any((codigos[1:] == codigos[:-1]) & (meses[1:] == meses[:-1])):
+            raise ValueError("Hay meses repetidos dentro de una misma serie")
+
+        valores = df[self.columnas].to_numpy(dtype=np.float32)[orden]
+        if self.escalador is not None:
+            nombres = list(self.escalador.feature_names_in_)
+            indices = [nombres.index(columna) for columna in self.columnas]
+            valores *= self.escalador.scale_[indices].astype(np.float32)
+            valores += self.escalador.min_[indices].astype(np.float32)
+
+        return valores, meses, codigos, series
+
+    def _inicios_validos(self, meses: np.ndarray, codigos: np.ndarray) -> np.ndarray:
+        # Una muestra que empieza en i usa las filas i..i+longitud+horizonte-1: deben ser de la
+        # misma serie y meses consecutivos (con filas ordenadas y únicas basta comparar extremos)
+        tramo = self.longitud + self.horizonte - 1
+        if len(meses) <= tramo:
+            return np.empty(0, dtype=np.int64)
+        misma_serie = codigos[tramo:] == codigos[:-tramo]
+        consecutivos = (meses[tramo:] - meses[:-tramo]) == tramo
+        return np.flatnonzero(misma_serie & consecutivos)
+
+    def vistas(self, df: pd.DataFrame) -> dict:
+        """
+        Ventanas como vistas sin copia sobre los valores, junto con los inicios válidos.
+        x[inicios] e y[inicios] materializan las muestras. Con menos de longitud + horizonte
+        filas no hay muestras y los arreglos quedan vacíos.
+
+        Returns:
+            dict: 'x' (n, longitud, variables), 'y' (n, horizonte, objetivos), 'inicios',
+            'origenes' (meses enteros), 'series' (códigos) y 'nombres_series'
+        """
+        valores, meses, codigos, series = self._preparar(df)
+        inicios = self._inicios_validos(meses, codigos)
+        indices_objetivo = [self.columnas.index(columna) for columna in self.columnas_objetivo]
+
+        if len(valores) < self.longitud + self.horizonte:
+            # sliding_window_view no admite ventanas más largas que los datos
+            x = np.empty((0, self.longitud, len(self.columnas)), dtype=np.float32)
+            y = np.empty((0, self.horizonte, len(indices_objetivo)), dtype=np.float32)
+        else:
+            x = sliding_window_view(valores, self.longitud, axis=0).transpose(0, 2, 1)
+            y = sliding_window_view(valores[self.longitud:, indices_objetivo], self.horizonte, axis=0) \
+                .transpose(0, 2, 1)
+
+        return {
+            'x': x,
+            'y': y,
+            'inicios': inicios,
+            'origenes': meses[inicios + self.longitud],
+            'series': codigos[inicios],
+            'nombres_series': [None if pd.isna(serie) else str(serie) for serie in series]
+        }
+
+    def escribir(self, df: pd.DataFrame, directorio: str, muestras_por_bloque: int = 65536) -> dict:
+        """
+        Escribe las muestras en arreglos .npy mapeados en memoria, copiando por bloques desde
+        las vistas: en RAM solo hay un bloque de ventanas a la vez.
+
+        Args:
+            df (pd.DataFrame): Formato largo con fecha, columnas y columna_serie
+            directorio (str): Carpeta de salida
+            muestras_por_bloque (int): Muestras copiadas por paso
+
+        Returns:
+            dict: Manifiesto escrito
+        """
+        os.makedirs(directorio, exist_ok=True)
+        ruta_manifiesto = os.path.join(directorio, self.ARCHIVO_MANIFIESTO)
+        if os.path.exists(ruta_manifiesto):
+            # Un manifiesto viejo junto a arreglos a medio escribir no debe poder cargarse
+            os.remove(ruta_manifiesto)
+
+        datos = self.vistas(df)
+        inicios = datos['inicios']
+        forma_x = (len(inicios), self.longitud, len(self.columnas))
+        forma_y = (len(inicios), self.horizonte, len(self.columnas_objetivo))
+
+        if len(inicios) == 0:
+            # Un archivo sin datos no se puede mapear en memoria: se guardan arreglos vacíos
+            np.save(os.path.join(directorio, self.ARCHIVO_X), np.empty(forma_x, dtype=np.float32))
+            np.save(os.path.join(directorio, self.ARCHIVO_Y), np.empty(forma_y, dtype=np.float32))
+        else:
+            x = np.lib.format.open_memmap(os.path.join(directorio, self.ARCHIVO_X), mode='w+',
+                                          dtype=np.float32, shape=forma_x)
+            y = np.lib.format.open_memmap(os.path.join(directorio, self.ARCHIVO_Y), mode='w+',
+                                          dtype=np.float32, shape=forma_y)
+            for desde in range(0, len(inicios), muestras_por_bloque):
+                bloque = inicios[desde:desde + muestras_por_bloque]
+                x[desde:desde + len(bloque)] = datos['x'][bloque]
+                y[desde:desde + len(bloque)] = datos['y'][bloque]
+            x.flush()
+            y.flush()
+            del x, y
+
+        np.save(os.path.join(directorio, self.ARCHIVO_ORIGENES), datos['origenes'])
+        np.save(os.path.join(directorio, self.ARCHIVO_SERIES), datos['series'])
+
+        manifiesto = {
+            'longitud': self.longitud,
+            'horizonte': self.horizonte,
+            'columnas': self.columnas,
+            'columnas_objetivo': self.columnas_objetivo,
+            'columna_serie': self.columna_serie,
+            'escalado': self.escalador is not None,
+            'series': datos['nombres_series'],
+            'muestras': int(len(inicios)),
+            'forma_x': list(forma_x),
+            'forma_y': list(forma_y)
+        }
+        # El manifiesto se escribe al final para que una escritura interrumpida no se cargue
+        with open(ruta_manifiesto, 'w', encoding='utf-8') as f:
+            json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+
+        logger.info(f"{len(inicios)} muestras de {len(datos['nombres_series'])} series -> {directorio}")
+        return manifiesto
+
+    @classmethod
+    def cargar(cls, directorio: str) -> dict:
+        """
+        Abre las muestras escritas por escribir() sin leerlas a memoria
+
+        Returns:
+            dict: 'x', 'y', 'origenes', 'series' (memmaps de solo lectura) y 'manifiesto'
+        """
+        with open(os.path.join(directorio, cls.ARCHIVO_MANIFIESTO), 'r', encoding='utf-8') as f:
+            manifiesto = json.load(f)
+
+        return {
+            'x': np.load(os.path.join(directorio, cls.ARCHIVO_X), mmap_mode='r'),
+            'y': np.load(os.path.join(directorio, cls.ARCHIVO_Y), mmap_mode='r'),
+            'origenes': np.load(os.path.join(directorio, cls.ARCHIVO_ORIGENES), mmap_mode='r'),
+            'series': np.load(os.path.join(directorio, cls.ARCHIVO_SERIES), mmap_mode='r'),
+            'manifiesto': manifiesto
+        }
+
+
+def main():
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Genera las ventanas de entrenamiento del LSTM")
+    parser.add_argument('--directorio-base', default='.', help="Directorio raíz del proyecto")
+    parser.add_argument('--archivo', default=os.path.join('data', 'processed', 'RNN', 'rnn_produccion.csv'),
+                        help="CSV en formato largo, relativo al directorio base")
+    parser.add_argument('--salida', default=os.path.join('data', 'processed', 'RNN', 'ventanas'),
+                        help="Carpeta de salida, relativa al directorio base")
+    parser.add_argument('--columna-serie', default='canton')
+    parser.add_argument('--longitud', type=int, default=VENTANA)
+    parser.add_argument('--horizonte', type=int, default=1)
+    parser.add_argument('--sin-escalar', action='store_true', help="No aplicar models/scaler.pkl")
+    argumentos = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    ruta_raiz = os.path.abspath(argumentos.directorio_base)
+    escalador = None
+    if not argumentos.sin_escalar:
+        escalador = joblib.load(os.path.join(ruta_raiz, 'models', 'scaler.pkl'))
+
+    ventanas = VentanasRNN(argumentos.longitud, argumentos.horizonte,
+                           columna_serie=argumentos.columna_serie, escalador=escalador)
+    manifiesto = ventanas.escribir(pd.read_csv(os.path.join(ruta_raiz, argumentos.archivo)),
+                                   os.path.join(ruta_raiz, argumentos.salida))
+    print(f"{manifiesto['muestras']} muestras: x {manifiesto['forma_x']}, y {manifiesto['forma_y']}")
+
+
+if __name__ == '__main__':
+    main()
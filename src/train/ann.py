@@ -1,18 +1,51 @@
-import streamlit as st
 import pandas as pd
 import numpy as np
+import joblib
 from sklearn.preprocessing import MinMaxScaler
-from tensorflow.keras.models import load_model
 import os
 
+from src.train.ann_grid import ann_grid
+from src.train.ann_numpy import cargar_modelo
+
+
+def cargar_escalador(ruta_raiz):
+    """
+    Escalador que guarda entrenar_ann junto al modelo, o None si no existe
+
+    Args:
+        ruta_raiz (str): Directorio raíz del proyecto
+
+    Returns:
+        MinMaxScaler | None: Escalador ajustado con los datos de entrenamiento
+    """
+    ruta_escalador = os.path.join(ruta_raiz, 'models/escalador_ann.pkl')
+    if not os.path.exists(ruta_escalador):
+        return None
+    return joblib.load(ruta_escalador)
+
 
 class ann:
-    def __init__(self, ruta_raiz):
+    def __init__(self, ruta_raiz, modo_grid=False, puntos_grid=16, interpolar_grid=False, modelo=None,
+                 escalador=None):
         try:
-            self.model = load_model(os.path.join(ruta_raiz, 'models/modelo_pred_cultivopapa.h5'))
-            # Inicializar el escalador
-            self.escalador = MinMaxScaler()
-            self.is_fitted = False
+            self.ruta_modelo = os.path.join(ruta_raiz, 'models/modelo_pred_cultivopapa.h5')
+            # Usa el motor NumPy (.npz junto al .h5) y solo recurre a Keras si no está disponible.
+            # Se puede recibir un modelo ya cargado para reutilizarlo entre instancias
+            self.model = modelo if modelo is not None else cargar_modelo(self.ruta_modelo)
+            # Inicializar el escalador: el persistido por entrenar_ann, recibido ya cargado para
+            # compartirlo entre instancias o leído de disco si no se recibe. Solo se comparte
+            # ajustado, porque entonces ninguna instancia lo modifica
+            if escalador is None:
+                escalador = cargar_escalador(ruta_raiz)
+            if escalador is not None:
+                self.escalador = escalador
+                self.is_fitted = True
+            else:
+                self.escalador = MinMaxScaler()
+                self.is_fitted = False
+            self.grid = None
+            if modo_grid:
+                self.activar_modo_grid(os.path.join(ruta_raiz, 'models/ann_grid'), puntos_grid, interpolar_grid)
         except FileNotFoundError:
             raise FileNotFoundError(
                 f"No se encontró el archivo del modelo en la ruta: {os.path.join(ruta_raiz, 'models/modelo_pred_cultivopapa.h5')}")
@@ -123,6 +156,97 @@ class ann:
             print(f"Error transformando recomendaciones: {e}")
             raise
 
+    def _predecir_probabilidades(self, X):
+        """
+        Inferencia exacta sobre un arreglo en unidades originales, usando el escalador ya ajustado
+
+        Args:
+            X (np.ndarray): Arreglo (n, 5) en el orden de ann_grid.columnas
+
+        Returns:
+            np.ndarray: Probabilidades (n, 3)
+        """
+        # Misma operación que MinMaxScaler.transform, sin pasar por DataFrames
+        X_scaled = np.asarray(X, dtype=np.float64) * self.escalador.scale_ + self.escalador.min_
+        return self.model.predict(X_scaled.astype(np.float32), batch_size=len(X_scaled), verbose=0)
+
+    def _firma_grid(self):
+        """
+        Identifica el modelo y el escalador con que se construye la rejilla, para invalidarla si cambian
+        """
+        estado_modelo = os.stat(self.ruta_modelo)
+        return (f"{estado_modelo.st_mtime_ns}-{estado_modelo.st_size}-"
+                f"{np.round(self.escalador.scale_, 12).tolist()}-{np.round(self.escalador.min_, 12).tolist()}")
+
+    def activar_modo_grid(self, directorio_grid, puntos=16, interpolar=False, limites=None):
+        """
+        Activa el modo rejilla: predecir_desde_fila responde por búsqueda de índice en la superficie
+        precalculada. La rejilla se construye la primera vez y luego se reutiliza desde disco.
+
+        Args:
+            directorio_grid (str): Carpeta donde se guardan los arreglos de la rejilla
+            puntos (int | dict): Puntos por eje de la rejilla
+            interpolar (bool): Interpolar entre vértices en lugar de tomar el más cercano
+            limites (dict, optional): Rango (min, max) por columna
+        """
+        try:
+            # La rejilla se construye con el mismo escalador fijo que usa la inferencia exacta, para
+            # que activarla solo cambie la latencia. Sin escalador persistido la inferencia exacta
+            # lo ajusta en cada consulta y no hay un escalado que la rejilla pueda reproducir
+            if not self.is_fitted:
+                raise ValueError("El modo rejilla requiere el escalador persistido models/escalador_ann.pkl "
+                                 "(python -m src.train.entrenar_ann --publicar)")
+
+            grid = ann_grid(directorio_grid, limites=limites, puntos=puntos, interpolar=interpolar)
+
+            firma = self._firma_grid()
+            if not grid.cargar(firma):
+                grid.construir(self._predecir_probabilidades, firma)
+
+            self.grid = grid
+        except Exception as e:
+            raise Exception(f"Error al activar el modo rejilla: {str(e)}")
+
+    def evaluar_error_grid(self, n_muestras=10000, semilla=42):
+        """
+        Reporta el error de la rejilla contra la inferencia exacta del modelo, con el mismo
+        escalador y los mismos pesos que usa generar_prediccion
+
+        Returns:
+            dict: Tasa de discrepancia de clase y errores de probabilidad
+        """
+        if self.grid is None:
+            raise ValueError("El modo rejilla no está activo")
+        return self.grid.evaluar_error(self._predecir_probabilidades, n_muestras, semilla)
+
+    def _predecir_desde_grid(self, fila_datos):
+        """
+        Responde predecir_desde_fila con la rejilla precalculada
+        """
+        columnas_faltantes = [col for col in ann_grid.columnas if col not in fila_datos]
+        if columnas_faltantes:
+            raise ValueError(f"Faltan las siguientes columnas: {columnas_faltantes}")
+
+        if any(fila_datos[col] is None for col in ann_grid.columnas):
+            raise ValueError("Los datos contienen valores nulos")
+
+        X = np.array([[float(fila_datos[col]) for col in ann_grid.columnas]])
+        # Fuera de los límites de la rejilla se usa la inferencia exacta en lugar del borde
+        indices, probabilidades = self.grid.consultar(X, self._predecir_probabilidades)
+        indice = int(indices[0])
+
+        mapeo_recomendaciones = {
+            0: 'riego',
+            1: 'fertilizacion',
+            2: 'poda_preventiva'
+        }
+
+        return {
+            'indice': indice,
+            'probabilidad_porcentaje': round(float(probabilidades[0, indice]) * 100, 2),
+            'prediccion': mapeo_recomendaciones.get(indice, 'desconocido')
+        }
+
     def predecir_desde_fila(self, fila_datos):
         """
         Método específico para predecir desde un diccionario de datos (ideal para Streamlit)
@@ -141,6 +265,9 @@ class ann:
             if not fila_datos:
                 raise ValueError("El diccionario de datos no puede estar vacío")
 
+            if self.grid is not None:
+                return self._predecir_desde_grid(fila_datos)
+
             # Convertir el diccionario a DataFrame
             try:
                 df_entrada = pd.DataFrame([fila_datos])
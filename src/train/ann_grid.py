@@ -0,0 +1,243 @@
+"""
+Clase: ann_grid
+
+Objetivo: Rejilla precalculada de la superficie de recomendación del modelo ANN,
+para responder predicciones por búsqueda de índice en lugar de inferencia
+
+Cambios:
+    1. Creacion de clase 19-10-2026
+    2. Entradas fuera de los límites respondidas con inferencia exacta en lugar de recortarse 19-10-2026
+"""
+import os
+import json
+
+import numpy as np
+
+
+class ann_grid:
+    """
+    Evalúa el modelo una sola vez sobre una rejilla cuantizada del dominio de entrada
+    y guarda el índice de clase y las probabilidades en arreglos NumPy mapeados en memoria.
+
+    La búsqueda del vértice más cercano es una aproximación: con 16 puntos por eje y
+    limites_defecto la clase difiere de la inferencia exacta en un 2-3% de las entradas
+    según el modelo (evaluar_error lo mide). interpolar=True reduce el error de probabilidad.
+    """
+
+    columnas = ['lluvia_mm', 'temp_max', 'temp_min', 'humedad', 'ph_suelo']
+
+    # Mismos rangos que acepta el formulario de Modulo3Web
+    limites_defecto = {
+        'lluvia_mm': (0.0, 1000.0),
+        'temp_max': (0.0, 50.0),
+        'temp_min': (0.0, 50.0),
+        'humedad': (0.0, 100.0),
+        'ph_suelo': (0.0, 14.0)
+    }
+
+    def __init__(self, directorio, limites=None, puntos=16, interpolar=False):
+        """
+        Args:
+            directorio (str): Carpeta donde se guardan los arreglos de la rejilla
+            limites (dict, optional): Rango (min, max) por columna. Si es None usa limites_defecto
+            puntos (int | dict): Número de puntos por eje, global o por columna
+            interpolar (bool): Si True interpola multilinealmente entre vértices vecinos
+        """
+        limites = limites or self.limites_defecto
+        if isinstance(puntos, dict):
+            puntos = [int(puntos[col]) for col in self.columnas]
+        else:
+            puntos = [int(puntos)] * len(self.columnas)
+
+        if any(p < 2 for p in puntos):
+            raise ValueError("La rejilla necesita al menos 2 puntos por eje")
+
+        self.directorio = directorio
+        self.interpolar = interpolar
+        self.puntos = tuple(puntos)
+        self.minimos = np.array([limites[col][0] for col in self.columnas], dtype=np.float64)
+        self.maximos = np.array([limites[col][1] for col in self.columnas], dtype=np.float64)
+        self.pasos = (self.maximos - self.minimos) / (np.array(self.puntos) - 1)
+
+        self.indices = None
+        self.probabilidades = None
+
+    def _rutas(self):
+        return (os.path.join(self.directorio, 'indices.npy'),
+                os.path.join(self.directorio, 'probabilidades.npy'),
+                os.path.join(self.directorio, 'metadatos.json'))
+
+    def _metadatos(self, firma):
+        return {
+            'columnas': self.columnas,
+            'minimos': self.minimos.tolist(),
+            'maximos': self.maximos.tolist(),
+            'puntos': list(self.puntos),
+            'firma': firma
+        }
+
+    def cargar(self, firma):
+        """
+        Abre una rejilla existente si fue construida con la misma configuración y firma de modelo.
+
+        Args:
+            firma (str): Identificador del modelo y escalador con que se construyó la rejilla
+
+        Returns:
+            bool: True si la rejilla quedó cargada
+        """
+        ruta_indices, ruta_probabilidades, ruta_metadatos = self._rutas()
+        if not all(os.path.exists(ruta) for ruta in self._rutas()):
+            return False
+
+        try:
+            with open(ruta_metadatos, 'r', encoding='utf-8') as f:
+                metadatos = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if metadatos != self._metadatos(firma):
+            return False
+
+        self.indices = np.load(ruta_indices, mmap_mode='r')
+        self.probabilidades = np.load(ruta_probabilidades, mmap_mode='r')
+        return True
+
+    def construir(self, predecir_probabilidades, firma, tamano_lote=65536):
+        """
+        Evalúa el modelo sobre todos los vértices de la rejilla en lotes grandes.
+
+        Args:
+            predecir_probabilidades (callable): Recibe un arreglo (n, 5) en unidades originales
+                                                y retorna las probabilidades (n, clases)
+            firma (str): Identificador del modelo y escalador
+            tamano_lote (int): Vértices evaluados por llamada al modelo
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta_indices, ruta_probabilidades, ruta_metadatos = self._rutas()
+
+        total = int(np.prod(self.puntos))
+        indices = None
+        probabilidades = None
+
+        for inicio in range(0, total, tamano_lote):
+            planos = np.arange(inicio, min(inicio + tamano_lote, total))
+            coordenadas = np.stack(np.unravel_index(planos, self.puntos), axis=1)
+            X = self.minimos + coordenadas * self.pasos
+
+            prob_lote = np.asarray(predecir_probabilidades(X))
+
+            if probabilidades is None:
+                # El número de clases se conoce con el primer lote
+                indices = np.lib.format.open_memmap(ruta_indices, mode='w+', dtype=np.uint8,
+                                                    shape=self.puntos)
+                probabilidades = np.lib.format.open_memmap(ruta_probabilidades, mode='w+',
+                                                           dtype=np.float16,
+                                                           shape=self.puntos + (prob_lote.shape[1],))
+
+            indices.reshape(-1)[planos] = np.argmax(prob_lote, axis=1)
+            probabilidades.reshape(-1, prob_lote.shape[1])[planos] = prob_lote
+
+        indices.flush()
+        probabilidades.flush()
+        del indices, probabilidades
+
+        # Los metadatos se escriben al final para que una construcción interrumpida no se cargue
+        with open(ruta_metadatos, 'w', encoding='utf-8') as f:
+            json.dump(self._metadatos(firma), f)
+
+        self.indices = np.load(ruta_indices, mmap_mode='r')
+        self.probabilidades = np.load(ruta_probabilidades, mmap_mode='r')
+
+    def dentro_dominio(self, X):
+        """
+        Filas de X dentro de los límites de la rejilla (los valores no finitos quedan fuera)
+
+        Returns:
+            np.ndarray: Máscara booleana (n,)
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        return np.all((X >= self.minimos) & (X <= self.maximos), axis=1)
+
+    def consultar(self, X, predecir_probabilidades=None):
+        """
+        Responde la predicción por búsqueda de índice (o interpolación) en la rejilla. La rejilla
+        no tiene información fuera de sus límites: esas filas se responden con
+        predecir_probabilidades o, si no se entrega, se rechazan.
+
+        Args:
+            X (np.ndarray): Arreglo (n, 5) en unidades originales, en el orden de `columnas`
+            predecir_probabilidades (callable, optional): Inferencia exacta para las filas fuera
+                                                          del dominio, igual que en construir()
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Índices de clase (n,) y probabilidades (n, clases)
+        """
+        if self.probabilidades is None:
+            raise ValueError("La rejilla no está cargada. Use cargar() o construir() primero")
+
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        dentro = self.dentro_dominio(X)
+        if dentro.all():
+            return self._consultar_rejilla(X)
+        if predecir_probabilidades is None:
+            raise ValueError("Hay entradas fuera de los límites de la rejilla")
+
+        probabilidades = np.empty((X.shape[0], self.probabilidades.shape[-1]), dtype=np.float32)
+        if dentro.any():
+            probabilidades[dentro] = self._consultar_rejilla(X[dentro])[1]
+        probabilidades[~dentro] = np.asarray(predecir_probabilidades(X[~dentro]), dtype=np.float32)
+        return np.argmax(probabilidades, axis=1), probabilidades
+
+    def _consultar_rejilla(self, X):
+        limite = np.array(self.puntos) - 1
+        posicion = np.clip((X - self.minimos) / self.pasos, 0, limite)
+
+        probabilidades_planas = self.probabilidades.reshape(-1, self.probabilidades.shape[-1])
+
+        if not self.interpolar:
+            vertices = np.rint(posicion).astype(np.intp)
+            planos = np.ravel_multi_index(vertices.T, self.puntos)
+            return (np.asarray(self.indices.reshape(-1)[planos], dtype=np.int64),
+                    np.asarray(probabilidades_planas[planos], dtype=np.float32))
+
+        # Interpolación multilineal sobre los 2^5 vértices de la celda
+        base = np.minimum(np.floor(posicion).astype(np.intp), limite - 1)
+        fraccion = posicion - base
+        resultado = np.zeros((X.shape[0], probabilidades_planas.shape[1]), dtype=np.float64)
+
+        for esquina in range(2 ** len(self.puntos)):
+            desplazamiento = np.array([(esquina >> eje) & 1 for eje in range(len(self.puntos))])
+            pesos = np.prod(np.where(desplazamiento == 1, fraccion, 1.0 - fraccion), axis=1)
+            planos = np.ravel_multi_index((base + desplazamiento).T, self.puntos)
+            resultado += pesos[:, None] * probabilidades_planas[planos]
+
+        resultado = resultado.astype(np.float32)
+        return np.argmax(resultado, axis=1), resultado
+
+    def evaluar_error(self, predecir_probabilidades, n_muestras=10000, semilla=42):
+        """
+        Compara la rejilla contra la inferencia exacta en puntos aleatorios del dominio.
+
+        Args:
+            predecir_probabilidades (callable): Inferencia exacta, igual que en construir()
+            n_muestras (int): Número de puntos aleatorios
+            semilla (int): Semilla del generador aleatorio
+
+        Returns:
+            dict: Tasa de discrepancia de clase y errores absolutos de probabilidad
+        """
+        generador = np.random.default_rng(semilla)
+        X = generador.uniform(self.minimos, self.maximos, size=(n_muestras, len(self.columnas)))
+
+        prob_exacta = np.asarray(predecir_probabilidades(X), dtype=np.float32)
+        indices_grid, prob_grid = self.consultar(X)
+        error = np.abs(prob_exacta - prob_grid)
+
+        return {
+            'n_muestras': int(n_muestras),
+            'interpolar': self.interpolar,
+            'tasa_discrepancia_clase': float(np.mean(indices_grid != np.argmax(prob_exacta, axis=1))),
+            'error_abs_medio_probabilidad': float(error.mean()),
+            'error_abs_max_probabilidad': float(error.max())
+        }
@@ -0,0 +1,169 @@
+"""
+Clase: ann_numpy
+
+Objetivo: Motor de inferencia en NumPy para la red densa del modelo ANN, sin importar TensorFlow
+
+Cambios:
+    1. Creacion de clase 19-10-2026
+"""
+import os
+import json
+
+import numpy as np
+
+
+def _relu(x):
+    return np.maximum(x, 0)
+
+
+def _softmax(x):
+    exp = np.exp(x - np.max(x, axis=-1, keepdims=True))
+    return exp / np.sum(exp, axis=-1, keepdims=True)
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+ACTIVACIONES = {
+    'linear': lambda x: x,
+    'relu': _relu,
+    'softmax': _softmax,
+    'sigmoid': _sigmoid,
+    'tanh': np.tanh
+}
+
+# Capas que no alteran la salida en inferencia
+CAPAS_IGNORADAS = {'InputLayer', 'Dropout'}
+
+
+def exportar_npz(ruta_h5, ruta_npz):
+    """
+    Extrae pesos y activaciones de las capas densas de un modelo Keras .h5 a un archivo .npz.
+    Solo necesita h5py, no TensorFlow.
+
+    Args:
+        ruta_h5 (str): Ruta del modelo Keras en formato H5
+        ruta_npz (str): Ruta del archivo .npz a generar
+
+    Returns:
+        str: Ruta del archivo generado
+    """
+    import h5py
+
+    with h5py.File(ruta_h5, 'r') as f:
+        configuracion = json.loads(f.attrs['model_config'])
+        capas = configuracion['config']['layers']
+        grupo_pesos = f['model_weights'] if 'model_weights' in f else f
+
+        pesos = {}
+        activaciones = []
+
+        for capa in capas:
+            tipo = capa['class_name']
+            config = capa['config']
+
+            if tipo in CAPAS_IGNORADAS:
+                continue
+
+            if tipo == 'Activation':
+                # Una capa Activation se aplica sobre la salida de la densa anterior
+                if not activaciones or activaciones[-1] != 'linear':
+                    raise ValueError("Capa Activation sin capa Dense lineal previa")
+                activaciones[-1] = config['activation']
+                continue
+
+            if tipo != 'Dense':
+                raise ValueError(f"Capa no soportada por el motor NumPy: {tipo}")
+
+            grupo = grupo_pesos[config['name']]
+            arreglos = [np.asarray(grupo[nombre]) for nombre in grupo.attrs['weight_names']]
+            kernel = next(a for a in arreglos if a.ndim == 2)
+            bias = next((a for a in arreglos if a.ndim == 1), np.zeros(kernel.shape[1], dtype=kernel.dtype))
+
+            indice = len(activaciones)
+            pesos[f'kernel_{indice}'] = kernel.astype(np.float32)
+            pesos[f'bias_{indice}'] = bias.astype(np.float32)
+            activaciones.append(config.get('activation', 'linear'))
+
+    no_soportadas = [a for a in activaciones if a not in ACTIVACIONES]
+    if no_soportadas:
+        raise ValueError(f"Activaciones no soportadas por el motor NumPy: {no_soportadas}")
+
+    # np.savez agrega la extensión si falta; se escribe a un archivo temporal y se renombra
+    ruta_temporal = ruta_npz + '.tmp.npz'
+    np.savez(ruta_temporal, activaciones=np.array(activaciones), **pesos)
+    os.replace(ruta_temporal, ruta_npz)
+    return ruta_npz
+
+
+class ann_numpy:
+    """
+    Red densa evaluada con NumPy. Expone predict() con la misma firma que un modelo Keras
+    para poder usarse en lugar de éste.
+    """
+
+    def __init__(self, ruta_npz):
+        with np.load(ruta_npz) as datos:
+            self.activaciones = [str(a) for a in datos['activaciones']]
+            self.kernels = [datos[f'kernel_{i}'] for i in range(len(self.activaciones))]
+            self.biases = [datos[f'bias_{i}'] for i in range(len(self.activaciones))]
+
+    def predict(self, X, batch_size=None, verbose=0):
+        """
+        Calcula la salida de la red para un lote de cualquier tamaño.
+
+        Args:
+            X (array-like): Arreglo (n, entradas)
+            batch_size: Ignorado, se acepta por compatibilidad con Keras
+            verbose: Ignorado, se acepta por compatibilidad con Keras
+
+        Returns:
+            np.ndarray: Salida (n, clases) en float32
+        """
+        salida = np.asarray(X, dtype=np.float32)
+        if salida.ndim == 1:
+            salida = salida.reshape(1, -1)
+
+        for kernel, bias, activacion in zip(self.kernels, self.biases, self.activaciones):
+            salida = ACTIVACIONES[activacion](salida @ kernel + bias)
+
+        return salida
+
+
+def cargar_modelo(ruta_h5):
+    """
+    Carga el modelo ANN con el motor NumPy cuando existe (o puede generarse) el .npz junto al .h5;
+    en caso contrario recurre a Keras.
+
+    Args:
+        ruta_h5 (str): Ruta del modelo Keras en formato H5
+
+    Returns:
+        ann_numpy | keras.Model: Objeto con método predict()
+    """
+    ruta_npz = os.path.splitext(ruta_h5)[0] + '.npz'
+
+    if os.path.exists(ruta_h5):
+        desactualizado = (not os.path.exists(ruta_npz)
+                          or os.path.getmtime(ruta_npz) < os.path.getmtime(ruta_h5))
+        if desactualizado:
+            try:
+                exportar_npz(ruta_h5, ruta_npz)
+            except (ImportError, OSError, KeyError, ValueError):
+                # Sin h5py, sin permisos de escritura o con capas no soportadas:
+                # se usa el .npz existente o, si no hay, Keras
+                pass
+
+    if os.path.exists(ruta_npz):
+        return ann_numpy(ruta_npz)
+
+    from tensorflow.keras.models import load_model
+    return load_model(ruta_h5)
+
+
+if __name__ == '__main__':
+    import sys
+
+    ruta_modelo = sys.argv[1] if len(sys.argv) > 1 else os.path.join('models', 'modelo_pred_cultivopapa.h5')
+    print(exportar_npz(ruta_modelo, os.path.splitext(ruta_modelo)[0] + '.npz'))
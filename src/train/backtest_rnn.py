@@ -0,0 +1,169 @@
+"""
+Clase: backtest_rnn
+
+Objetivo: Backtesting walk-forward del pronóstico RNN: desliza la ventana de 12 meses sobre la
+historia y mide el error por horizonte, con todos los orígenes en un solo lote por paso
+
+Cambios:
+    1. Creacion de clase 19-10-2026
+    2. Reindexado mensual por serie: ventanas y valores reales sin cruzar huecos de meses 19-10-2026
+"""
+import os
+import time
+import logging
+import argparse
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.train.rnn import COLUMNAS_MODELO, VENTANA
+
+logger = logging.getLogger(__name__)
+
+
+class backtest_rnn:
+    """
+    Para cada mes de origen t con los VENTANA meses previos completos, pronostica t..t+horizonte-1
+    desde la ventana [t-VENTANA, t) y lo compara con la producción observada de esos meses. Los
+    orígenes de todas las series se apilan en un tensor: el modelo se llama una vez por paso del
+    horizonte.
+    """
+
+    def __init__(self, modelo_rnn, horizonte: int = 12):
+        """
+        Args:
+            modelo_rnn (rnn): Instancia de src.train.rnn.rnn
+            horizonte (int): Meses pronosticados desde cada origen
+        """
+        self.modelo_rnn = modelo_rnn
+        self.horizonte = horizonte
+
+    def _origenes(self, df: pd.DataFrame):
+        """
+        Ventanas de entrada, valores reales y fechas de cada origen de una serie. La serie se
+        reindexa a todos sus meses: los huecos quedan en NaN, las ventanas que los tocan se
+        descartan y los valores reales de meses faltantes no se comparan.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, pd.DatetimeIndex]: Ventanas (m, VENTANA, 4) sin escalar,
+            producción real (m, horizonte) con NaN en meses sin dato, fechas de origen
+        """
+        meses = pd.to_datetime(df['fecha']).dt.to_period('M')
+        if meses.duplicated().any():
+            raise ValueError("Hay meses repetidos dentro de una misma serie")
+        df = df.set_index(meses).sort_index()
+        df = df.reindex(pd.period_range(df.index.min(), df.index.max(), freq='M'))
+
+        valores = df[COLUMNAS_MODELO].to_numpy(dtype=np.float32)
+        if len(valores) <= VENTANA:
+            return (np.empty((0, VENTANA, len(COLUMNAS_MODELO)), dtype=np.float32),
+                    np.empty((0, self.horizonte)), pd.DatetimeIndex([]))
+
+        # Vistas sin copia: la ventana i cubre los meses i..i+VENTANA-1 y su origen es i+VENTANA
+        ventanas = sliding_window_view(valores, VENTANA, axis=0).transpose(0, 2, 1)[:-1]
+        completas = ~np.isnan(ventanas).any(axis=(1, 2))
+
+        produccion = df['produccion'].to_numpy(dtype=np.float64)[VENTANA:]
+        relleno = np.concatenate([produccion, np.full(self.horizonte - 1, np.nan)])
+        reales = sliding_window_view(relleno, self.horizonte)
+
+        return ventanas[completas], reales[completas], df.index[VENTANA:][completas].to_timestamp()
+
+    def ejecutar(self, df: pd.DataFrame, columna_serie: Optional[str] = None) -> dict:
+        """
+        Ejecuta el backtest sobre una o varias series (por ejemplo una por cantón).
+
+        Args:
+            df (pd.DataFrame): Historia con fecha y COLUMNAS_MODELO
+            columna_serie (str, optional): Columna que identifica cada serie
+
+        Returns:
+            dict: 'por_horizonte' (MAE, MAPE y MAE de persistencia por horizonte), 'predicciones'
+            (una fila por origen y horizonte), 'origenes' y 'segundos'
+        """
+        grupos = df.groupby(columna_serie, sort=True) if columna_serie else [(None, df)]
+
+        ventanas, reales, fechas, series = [], [], [], []
+        for serie, datos in grupos:
+            ventanas_serie, reales_serie, fechas_serie = self._origenes(datos)
+            ventanas.append(ventanas_serie)
+            reales.append(reales_serie)
+            fechas.append(fechas_serie.to_numpy())
+            series.append(np.full(len(ventanas_serie), serie, dtype=object))
+
+        ventanas = np.concatenate(ventanas)
+        if not len(ventanas):
+            raise ValueError(f"Ninguna serie tiene más de {VENTANA} meses de historia")
+        reales = np.concatenate(reales)
+
+        inicio = time.perf_counter()
+        escaladas = self.modelo_rnn._escalar(ventanas)
+        pronostico = self.modelo_rnn._desescalar_produccion(
+            self.modelo_rnn._pronosticar(escaladas, self.horizonte)).astype(np.float64)
+        segundos = time.perf_counter() - inicio
+        logger.info(f"{len(ventanas)} orígenes x {self.horizonte} horizontes en {segundos:.2f} s")
+
+        # Referencia ingenua: repetir la última producción observada de la ventana
+        persistencia = ventanas[:, -1, COLUMNAS_MODELO.index('produccion')].astype(np.float64)[:, np.newaxis]
+
+        error = np.abs(pronostico - reales)
+        valido = ~np.isnan(reales)
+        no_cero = valido & (reales != 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            por_horizonte = pd.DataFrame({
+                'horizonte': np.arange(1, self.horizonte + 1),
+                'n': valido.sum(axis=0),
+                'mae': np.nanmean(error, axis=0),
+                'mape': np.nanmean(np.where(no_cero, error / np.abs(reales), np.nan), axis=0) * 100,
+                'mae_persistencia': np.nanmean(np.abs(persistencia - reales), axis=0)
+            })
+
+        origenes = pd.DatetimeIndex(np.concatenate(fechas)).repeat(self.horizonte)
+        meses = np.tile(np.arange(self.horizonte), len(ventanas))
+        predicciones = pd.DataFrame({
+            'serie': np.repeat(np.concatenate(series), self.horizonte),
+            'origen': origenes,
+            'horizonte': meses + 1,
+            'fecha': (origenes.to_period('M') + meses).to_timestamp(),
+            'real': reales.ravel(),
+            'prediccion': pronostico.ravel()
+        })
+        if columna_serie is None:
+            predicciones = predicciones.drop(columns='serie')
+
+        return {
+            'por_horizonte': por_horizonte,
+            'predicciones': predicciones,
+            'origenes': len(ventanas),
+            'segundos': round(segundos, 3)
+        }
+
+
+def main():
+    from src.train.rnn import rnn
+
+    parser = argparse.ArgumentParser(description="Backtest walk-forward del pronóstico RNN")
+    parser.add_argument('--directorio-base', default='.', help="Directorio raíz del proyecto")
+    parser.add_argument('--archivo', default=os.path.join('data', 'processed', 'RNN', 'rnn_produccion.csv'),
+                        help="CSV de historia, relativo al directorio base")
+    parser.add_argument('--columna-serie', default=None, help="Columna que separa las series (ej. canton)")
+    parser.add_argument('--horizonte', type=int, default=12)
+    parser.add_argument('--salida', default=None, help="CSV donde guardar las predicciones por origen")
+    argumentos = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    ruta_raiz = os.path.abspath(argumentos.directorio_base)
+    df = pd.read_csv(os.path.join(ruta_raiz, argumentos.archivo))
+
+    resultado = backtest_rnn(rnn(ruta_raiz), argumentos.horizonte).ejecutar(df, argumentos.columna_serie)
+    print(f"{resultado['origenes']} orígenes en {resultado['segundos']} s")
+    print(resultado['por_horizonte'].round(3).to_string(index=False))
+
+    if argumentos.salida:
+        resultado['predicciones'].to_csv(argumentos.salida, index=False)
+
+
+if __name__ == '__main__':
+    main()
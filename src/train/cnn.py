@@ -6,22 +6,86 @@ Objetivo: Clase para llamado de modelo entrenado
 Cambios:
 
     1. Creacion de clase pmarin 13-07-2025
+    2. Preprocesamiento compartido y predicción por lotes 19-10-2026
+    3. Probabilidades, top-k y confianza calibrada en la respuesta de la API 19-10-2026
+    4. Catálogo de diagnósticos desde models/diagnosticos_cnn.json con fragmentos JSON preserializados 19-10-2026
+    5. Serialización de fragmentos con src.utils.serializacion 19-10-2026
+    6. Temperatura opcional en calibrar_probabilidades, compartida con evaluacion_cnn 19-10-2026
 """
 import os
+import json
 
 from PIL import Image
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
 import cv2
 import numpy as np
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, Tuple
+
+from src.utils.serializacion import a_json_bytes
+
+# Catálogo de diagnósticos por clase, junto al modelo
+RUTA_CATALOGO_DEFECTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..',
+                                     'models', 'diagnosticos_cnn.json')
+
+
+def _serializar_fragmento(info: Dict[str, Any]) -> bytes:
+    diagnostico = {
+        "resultado": info["emoji_resultado"],
+        "estado": info["mensaje_estado"],
+        "severidad": info["severidad"],
+        "descripcion": info["descripcion"],
+        "recomendacion": info["recomendacion"],
+        "acciones_sugeridas": info["acciones_sugeridas"]
+    }
+    metadata = {
+        "tipo_mensaje": info["tipo_mensaje"],
+        "icono_estado": info["icono_estado"],
+        "color_metrica": info["color_metrica"]
+    }
+    return b'"diagnostico":' + a_json_bytes(diagnostico) + b',"metadata":' + a_json_bytes(metadata)
+
+
+@lru_cache(maxsize=None)
+def cargar_catalogo_diagnosticos(ruta_catalogo: str) -> Tuple[Dict[str, Any], Dict[str, bytes]]:
+    """
+    Carga una sola vez por proceso el catálogo de diagnósticos y serializa el fragmento
+    de respuesta de cada clase
+
+    Args:
+        ruta_catalogo (str): Ruta del archivo JSON del catálogo
+
+    Returns:
+        Tuple[Dict, Dict[str, bytes]]: Catálogo y fragmentos JSON por clase
+    """
+    with open(ruta_catalogo, 'r', encoding='utf-8') as f:
+        catalogo = json.load(f)
+
+    fragmentos = {clase: _serializar_fragmento(info) for clase, info in catalogo["clases"].items()}
+    return catalogo, fragmentos
+
 # CNN training script
 class cnn:
-    def __init__(self, ruta_raiz):
-        self.model =load_model(os.path.join(ruta_raiz,'models/modelo_CNN_Papas.h5'))
+    def __init__(self, ruta_raiz, modelo=None):
+        if modelo is None:
+            # TensorFlow se importa solo al cargar el modelo para no penalizar el arranque
+            from tensorflow.keras.models import load_model
+            modelo = load_model(os.path.join(ruta_raiz,'models/modelo_CNN_Papas.h5'))
+        self.model = modelo
+        self.ruta_catalogo = os.path.join(ruta_raiz, 'models/diagnosticos_cnn.json') if ruta_raiz \
+            else os.path.normpath(RUTA_CATALOGO_DEFECTO)
         # Diccionario invertido para obtener nombre por índice
         self.clases = {0: 'Potato_Early_blight', 1: 'Potato_Late_blight', 2: 'Potato_healthy'}
 
+        # Calibración por temperatura generada con evaluacion_cnn --guardar-calibracion
+        self.temperatura = 1.0
+        self.umbral_baja_confianza = 0.6
+        ruta_calibracion = os.path.join(ruta_raiz, 'models/calibracion_cnn.json') if ruta_raiz else None
+        if ruta_calibracion and os.path.exists(ruta_calibracion):
+            with open(ruta_calibracion, 'r', encoding='utf-8') as f:
+                calibracion = json.load(f)
+            self.temperatura = float(calibracion.get('temperatura', self.temperatura))
+            self.umbral_baja_confianza = float(calibracion.get('umbral_baja_confianza', self.umbral_baja_confianza))
+
     def _get_diagnostico_info(self,resultado: str) -> Dict[str, Any]:
         """
         Obtiene información detallada del diagnóstico según el resultado
@@ -32,77 +96,43 @@ class cnn:
         Returns:
             Dict: Información estructurada del diagnóstico
         """
-        diagnosticos = {
-            "Potato_healthy": {
-                "emoji_resultado": "✅ Sana",
-                "color_metrica": "normal",
-                "tipo_mensaje": "success",
-                "icono_estado": "🌿",
-                "mensaje_estado": "La papa está completamente sana",
-                "recomendacion": "Mantener las prácticas actuales de cuidado",
-                "severidad": "ninguna",
-                "descripcion": "La planta no presenta signos de enfermedad y se encuentra en perfecto estado de salud.",
-                "acciones_sugeridas": [
-                    "Continuar con el riego regular",
-                    "Mantener el programa de fertilización",
-                    "Realizar inspecciones preventivas periódicas",
-                    "Conservar las condiciones ambientales actuales"
-                ]
-            },
-            "Potato_Early_blight": {
-                "emoji_resultado": "⚠️ Tizón Temprano",
-                "color_metrica": "normal",
-                "tipo_mensaje": "warning",
-                "icono_estado": "⚠️",
-                "mensaje_estado": "Se detectó tizón temprano (Early Blight)",
-                "recomendacion": "Aplicar fungicida preventivo y mejorar ventilación",
-                "severidad": "media",
-                "descripcion": "El tizón temprano es una enfermedad fúngica que puede causar manchas circulares en las hojas y reducir el rendimiento.",
-                "acciones_sugeridas": [
-                    "Aplicar fungicida preventivo (clorotalonil o mancozeb)",
-                    "Mejorar la ventilación del cultivo",
-                    "Remover hojas infectadas",
-                    "Evitar riego por aspersión",
-                    "Aumentar el espaciado entre plantas"
-                ]
-            },
-            "Potato_Late_blight": {
-                "emoji_resultado": "🚨 Tizón Tardío",
-                "color_metrica": "normal",
-                "tipo_mensaje": "error",
-                "icono_estado": "🚨",
-                "mensaje_estado": "Se detectó tizón tardío (Late Blight)",
-                "recomendacion": "Tratamiento urgente con fungicida específico",
-                "severidad": "alta",
-                "descripcion": "El tizón tardío es una enfermedad muy destructiva que puede devastar cultivos enteros rápidamente.",
-                "acciones_sugeridas": [
-                    "Aplicar fungicida específico inmediatamente (metalaxil + mancozeb)",
-                    "Aumentar frecuencia de aplicación",
-                    "Remover y destruir plantas severamente infectadas",
-                    "Mejorar drenaje del suelo",
-                    "Monitorear condiciones de humedad",
-                    "Considerar tratamiento de tubérculos"
-                ]
-            }
-        }
+        catalogo, _ = cargar_catalogo_diagnosticos(self.ruta_catalogo)
 
-        return diagnosticos.get(resultado, {
-            "emoji_resultado": "❓ Desconocido",
-            "color_metrica": "normal",
-            "tipo_mensaje": "warning",
-            "icono_estado": "❓",
-            "mensaje_estado": f"Resultado no reconocido: {resultado}",
-            "recomendacion": "Consultar con un especialista en patología vegetal",
-            "severidad": "desconocida",
-            "descripcion": "El resultado no corresponde a ninguna clase conocida del modelo.",
-            "acciones_sugeridas": [
-                "Revisar la calidad de la imagen",
-                "Consultar con un especialista",
-                "Realizar análisis adicionales"
-            ]
-        })
+        if resultado in catalogo["clases"]:
+            # Copia superficial: quien la recibe puede agregar campos sin alterar el catálogo
+            return dict(catalogo["clases"][resultado])
 
-    def predeccir_imagen_api(self, imagen):
+        desconocido = dict(catalogo["desconocido"])
+        desconocido["mensaje_estado"] = desconocido["mensaje_estado"].format(resultado=resultado)
+        return desconocido
+
+    def fragmento_respuesta(self, resultado: str) -> bytes:
+        """
+        Fragmento JSON ya serializado con las secciones "diagnostico" y "metadata" de la respuesta
+        de la API para una clase, sin llaves externas
+
+        Args:
+            resultado (str): Clase predicha por el modelo
+
+        Returns:
+            bytes: Fragmento UTF-8 listo para insertarse en el objeto de respuesta
+        """
+        _, fragmentos = cargar_catalogo_diagnosticos(self.ruta_catalogo)
+        fragmento = fragmentos.get(resultado)
+        if fragmento is None:
+            fragmento = _serializar_fragmento(self._get_diagnostico_info(resultado))
+        return fragmento
+
+    def _preprocesar_imagen(self, imagen) -> np.ndarray:
+        """
+        Convierte una imagen PIL o arreglo a la entrada del modelo: RGB, 256x256, float32 en [0, 1]
+
+        Args:
+            imagen (PIL.Image | np.ndarray): Imagen a preparar
+
+        Returns:
+            np.ndarray: Arreglo (256, 256, 3)
+        """
         # Convertir imagen PIL a numpy array
         if isinstance(imagen, Image.Image):
             imagen_array = np.array(imagen)
@@ -116,45 +146,100 @@ class cnn:
             imagen_array = cv2.cvtColor(imagen_array, cv2.COLOR_GRAY2RGB)
 
         imagen_nueva = cv2.resize(imagen_array, (256, 256))
-        nueva_imagen = image.img_to_array(imagen_nueva)
-        nueva_imagen = np.expand_dims(nueva_imagen, axis=0)
+        nueva_imagen = np.asarray(imagen_nueva, dtype=np.float32)
 
         if nueva_imagen.max() > 1.0:
             nueva_imagen = nueva_imagen / 255.0
 
-        prediccion_prob = self.model.predict(nueva_imagen)
-        indice_clase = np.argmax(prediccion_prob, axis=1)[0]
+        return nueva_imagen
 
+    def predecir_probabilidades_lote(self, imagenes, tamano_lote: int = 64) -> np.ndarray:
+        """
+        Probabilidades por clase para un lote de imágenes en una sola llamada al modelo
 
-        return self._get_diagnostico_info(self.clases[indice_clase])
+        Args:
+            imagenes (np.ndarray | list): Arreglo (n, 256, 256, 3) ya preprocesado, o lista de imágenes
+            tamano_lote (int): Tamaño de lote interno de Keras
 
-    def predeccir_imagen(self, imagen):
-        # Convertir imagen PIL a numpy array
-        if isinstance(imagen, Image.Image):
-            imagen_array = np.array(imagen)
-        else:
-            imagen_array = imagen
+        Returns:
+            np.ndarray: Probabilidades (n, clases)
+        """
+        if not isinstance(imagenes, np.ndarray):
+            imagenes = np.stack([self._preprocesar_imagen(imagen) for imagen in imagenes])
 
-        # Asegurar que la imagen tenga 3 canales (RGB)
-        if len(imagen_array.shape) == 3 and imagen_array.shape[2] == 4:
-            imagen_array = imagen_array[:, :, :3]
-        elif len(imagen_array.shape) == 2:
-            imagen_array = cv2.cvtColor(imagen_array, cv2.COLOR_GRAY2RGB)
+        return np.asarray(self.model.predict(imagenes, batch_size=tamano_lote, verbose=0))
 
-        imagen_nueva = cv2.resize(imagen_array, (256, 256))
-        nueva_imagen = image.img_to_array(imagen_nueva)
-        nueva_imagen = np.expand_dims(nueva_imagen, axis=0)
+    def predecir_lote(self, imagenes, tamano_lote: int = 64) -> list:
+        """
+        Clase predicha y probabilidades de cada imagen de un lote
 
-        if nueva_imagen.max() > 1.0:
-            nueva_imagen = nueva_imagen / 255.0
+        Returns:
+            list: Tuplas (clase, probabilidades)
+        """
+        probabilidades = self.predecir_probabilidades_lote(imagenes, tamano_lote)
+        return [(self.clases[int(indice)], fila)
+                for indice, fila in zip(np.argmax(probabilidades, axis=1), probabilidades)]
 
-        prediccion_prob = self.model.predict(nueva_imagen)
-        indice_clase = np.argmax(prediccion_prob, axis=1)[0]
+    def calibrar_probabilidades(self, probabilidades: np.ndarray, temperatura: float = None) -> np.ndarray:
+        """
+        Aplica la temperatura de calibración a probabilidades softmax: softmax(log(p) / T)
 
-        return self.clases[indice_clase]
+        Args:
+            probabilidades (np.ndarray): Probabilidades (n, clases) o (clases,)
+            temperatura (float, optional): Temperatura a aplicar; por defecto la cargada de
+                                           models/calibracion_cnn.json
+
+        Returns:
+            np.ndarray: Probabilidades calibradas con la misma forma
+        """
+        if temperatura is None:
+            temperatura = self.temperatura
+        if temperatura == 1.0:
+            return probabilidades
+        logits = np.log(np.clip(probabilidades, 1e-12, 1.0)) / temperatura
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def resumir_probabilidades(self, probabilidades: np.ndarray, k: int = 3) -> Dict[str, Any]:
+        """
+        Vector completo, top-k, confianza calibrada y marca de baja confianza de una predicción,
+        a partir de la salida del mismo forward
+
+        Args:
+            probabilidades (np.ndarray): Probabilidades (clases,) de una imagen
+            k (int): Número de clases en el top-k
+
+        Returns:
+            Dict: probabilidades, top_k, confianza y baja_confianza
+        """
+        probabilidades = np.asarray(probabilidades, dtype=np.float64)
+        calibradas = self.calibrar_probabilidades(probabilidades)
+        orden = np.argsort(-probabilidades)[:k]
+        confianza = float(calibradas[orden[0]])
+
+        return {
+            "probabilidades": {self.clases[i]: float(probabilidades[i]) for i in range(len(probabilidades))},
+            "top_k": [{"clase": self.clases[int(i)], "probabilidad": float(probabilidades[i])} for i in orden],
+            "confianza": confianza,
+            "baja_confianza": confianza < self.umbral_baja_confianza
+        }
 
+    def predeccir_imagen_api(self, imagen):
+        nueva_imagen = np.expand_dims(self._preprocesar_imagen(imagen), axis=0)
 
+        prediccion_prob = self.model.predict(nueva_imagen)
+        indice_clase = np.argmax(prediccion_prob, axis=1)[0]
 
+        diagnostico = self._get_diagnostico_info(self.clases[indice_clase])
+        diagnostico["clase"] = self.clases[indice_clase]
+        diagnostico.update(self.resumir_probabilidades(prediccion_prob[0]))
+        return diagnostico
 
+    def predeccir_imagen(self, imagen):
+        nueva_imagen = np.expand_dims(self._preprocesar_imagen(imagen), axis=0)
 
+        prediccion_prob = self.model.predict(nueva_imagen)
+        indice_clase = np.argmax(prediccion_prob, axis=1)[0]
 
+        return self.clases[indice_clase]
@@ -0,0 +1,267 @@
+"""
+Clase: diagnostico_lote
+
+Objetivo: Diagnóstico fuera de línea de carpetas completas de fotos de hojas con el modelo CNN.
+Decodifica en un pool de hilos, predice en lotes grandes, escribe CSV o Parquet y puede
+reanudarse donde se detuvo
+
+Cambios:
+    1. Creacion de clase 19-10-2026
+    2. Confianza calibrada y marca de baja confianza por imagen 19-10-2026
+    3. Salida reemplazada sin reanudar; partes .tmp y líneas incompletas descartadas al reanudar 19-10-2026
+"""
+import os
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from src.ManifiestoImagenes import ManifiestoImagenes
+
+logger = logging.getLogger(__name__)
+
+
+class diagnostico_lote:
+    """
+    Clasifica miles de imágenes con un modelo cnn ya cargado y guarda por imagen la clase,
+    las probabilidades, la confianza calibrada y los campos de _get_diagnostico_info.
+    """
+
+    # Campos de _get_diagnostico_info que se guardan en la salida
+    campos_diagnostico = ['emoji_resultado', 'mensaje_estado', 'severidad', 'recomendacion',
+                          'descripcion', 'tipo_mensaje', 'acciones_sugeridas']
+
+    def __init__(self, modelo_cnn, tamano_lote: int = 256, max_hilos: Optional[int] = None):
+        """
+        Args:
+            modelo_cnn (cnn): Instancia de src.train.cnn.cnn
+            tamano_lote (int): Imágenes por llamada al modelo
+            max_hilos (int, optional): Hilos de decodificación
+        """
+        self.modelo_cnn = modelo_cnn
+        self.tamano_lote = tamano_lote
+        self.max_hilos = max_hilos or min(32, (os.cpu_count() or 1) * 4)
+
+    @staticmethod
+    def listar_imagenes(directorio: str) -> List[str]:
+        """
+        Rutas de todas las imágenes bajo un directorio, recorrido recursivo y ordenado
+        """
+        rutas = []
+        for raiz, carpetas, archivos in os.walk(directorio):
+            carpetas.sort()
+            rutas.extend(os.path.join(raiz, archivo) for archivo in sorted(archivos)
+                         if archivo.lower().endswith(ManifiestoImagenes.EXTENSIONES_IMAGEN))
+        return rutas
+
+    @staticmethod
+    def _partes_parquet(ruta_salida: str) -> List[str]:
+        # Solo las partes terminadas: un parte_XXXXX.parquet.tmp es una escritura interrumpida
+        return sorted(os.path.join(ruta_salida, archivo) for archivo in os.listdir(ruta_salida)
+                      if archivo.startswith('parte_') and archivo.endswith('.parquet'))
+
+    @classmethod
+    def rutas_procesadas(cls, ruta_salida: str) -> set:
+        """
+        Rutas ya presentes en la salida, para reanudar un proceso interrumpido
+        """
+        if not os.path.exists(ruta_salida):
+            return set()
+        if ruta_salida.endswith('.parquet'):
+            partes = cls._partes_parquet(ruta_salida)
+            return set().union(*(pd.read_parquet(parte, columns=['ruta'])['ruta'] for parte in partes))
+        return set(pd.read_csv(ruta_salida, usecols=['ruta'])['ruta'])
+
+    @classmethod
+    def _preparar_salida(cls, ruta_salida: str, reanudar: bool) -> None:
+        """
+        Deja la salida lista para anexar: sin reanudar se vacía; al reanudar se descartan las
+        partes .tmp y la última línea incompleta del CSV que dejó un proceso interrumpido
+        """
+        if ruta_salida.endswith('.parquet'):
+            if not os.path.isdir(ruta_salida):
+                return
+            for archivo in os.listdir(ruta_salida):
+                if archivo.startswith('parte_') and archivo.endswith('.parquet.tmp'):
+                    os.remove(os.path.join(ruta_salida, archivo))
+            if not reanudar:
+                for parte in cls._partes_parquet(ruta_salida):
+                    os.remove(parte)
+            return
+
+        if not os.path.exists(ruta_salida):
+            return
+        if not reanudar:
+            os.remove(ruta_salida)
+            return
+
+        with open(ruta_salida, 'rb+') as f:
+            fin = f.seek(0, os.SEEK_END)
+            if fin == 0:
+                return
+            f.seek(fin - 1)
+            if f.read(1) == b'\n':
+                return
+            # Se retrocede por bloques hasta el último salto de línea y se corta ahí
+            posicion = fin
+            while posicion > 0:
+                paso = min(65536, posicion)
+                posicion -= paso
+                f.seek(posicion)
+                salto = f.read(paso).rfind(b'\n')
+                if salto >= 0:
+                    f.truncate(posicion + salto + 1)
+                    break
+            else:
+                f.truncate(0)
+        logger.info(f"Se descartó una línea incompleta al final de {ruta_salida}")
+
+    def _decodificar(self, ruta: str):
+        try:
+            with Image.open(ruta) as imagen:
+                return self.modelo_cnn._preprocesar_imagen(imagen.convert('RGB')), None
+        except Exception as e:
+            return None, str(e)
+
+    def _filas_lote(self, rutas: List[str], decodificadas) -> pd.DataFrame:
+        imagenes, errores = zip(*decodificadas)
+        validas = [i for i, imagen in enumerate(imagenes) if imagen is not None]
+
+        probabilidades = np.full((len(rutas), len(self.modelo_cnn.clases)), np.nan, dtype=np.float32)
+        if validas:
+            probabilidades[validas] = self.modelo_cnn.predecir_probabilidades_lote(
+                np.stack([imagenes[i] for i in validas]), self.tamano_lote)
+
+        # Confianza calibrada de la clase predicha, sobre las mismas probabilidades
+        confianza = self.modelo_cnn.calibrar_probabilidades(probabilidades).max(axis=1)
+
+        # La información de diagnóstico depende solo de la clase: se arma una vez por clase
+        info_clases = {clase: self.modelo_cnn._get_diagnostico_info(clase)
+                       for clase in self.modelo_cnn.clases.values()}
+
+        filas = []
+        for i, ruta in enumerate(rutas):
+            fila = {'ruta': ruta, 'clase': None, 'error': errores[i]}
+            for indice, clase in self.modelo_cnn.clases.items():
+                fila[f'prob_{clase}'] = float(probabilidades[i, indice])
+
+            if errores[i] is None:
+                fila['clase'] = self.modelo_cnn.clases[int(np.argmax(probabilidades[i]))]
+                fila['confianza'] = float(confianza[i])
+                fila['baja_confianza'] = bool(confianza[i] < self.modelo_cnn.umbral_baja_confianza)
+                info = info_clases[fila['clase']]
+                for campo in self.campos_diagnostico:
+                    valor = info[campo]
+                    fila[campo] = ' | '.join(valor) if isinstance(valor, list) else valor
+            else:
+                fila.update({'confianza': np.nan, 'baja_confianza': None})
+                fila.update({campo: None for campo in self.campos_diagnostico})
+
+            filas.append(fila)
+
+        # Tipos fijos para que todas las partes Parquet compartan esquema aunque un lote no tenga errores
+        columnas_texto = ['ruta', 'clase', 'error'] + self.campos_diagnostico
+        return pd.DataFrame(filas).astype({columna: 'string' for columna in columnas_texto}
+                                          | {'baja_confianza': 'boolean'})
+
+    @staticmethod
+    def _escribir(df: pd.DataFrame, ruta_salida: str) -> None:
+        if ruta_salida.endswith('.parquet'):
+            # Parquet no admite anexar: cada lote es un archivo dentro de la carpeta de salida
+            os.makedirs(ruta_salida, exist_ok=True)
+            numero = len(diagnostico_lote._partes_parquet(ruta_salida))
+            ruta_parte = os.path.join(ruta_salida, f'parte_{numero:05d}.parquet')
+            df.to_parquet(ruta_parte + '.tmp', index=False)
+            os.replace(ruta_parte + '.tmp', ruta_parte)
+        else:
+            nuevo = not os.path.exists(ruta_salida) or os.path.getsize(ruta_salida) == 0
+            df.to_csv(ruta_salida, mode='a', header=nuevo, index=False)
+
+    def procesar(self, rutas: List[str], ruta_salida: str, reanudar: bool = True) -> dict:
+        """
+        Diagnostica las imágenes y anexa los resultados a la salida lote por lote.
+        El siguiente lote se decodifica mientras el modelo procesa el actual.
+
+        Args:
+            rutas (List[str]): Imágenes a procesar
+            ruta_salida (str): Archivo .csv, o carpeta .parquet con un archivo por lote
+            reanudar (bool): Omitir las rutas que ya están en la salida; si es False la salida
+                             anterior se reemplaza
+
+        Returns:
+            dict: Imágenes procesadas, omitidas, con error, segundos e imágenes por segundo
+        """
+        self._preparar_salida(ruta_salida, reanudar)
+        procesadas = self.rutas_procesadas(ruta_salida) if reanudar else set()
+        pendientes = [ruta for ruta in rutas if ruta not in procesadas]
+        lotes = [pendientes[i:i + self.tamano_lote] for i in range(0, len(pendientes), self.tamano_lote)]
+
+        logger.info(f"{len(pendientes)} imágenes pendientes, {len(rutas) - len(pendientes)} ya procesadas")
+
+        inicio = time.perf_counter()
+        errores = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_hilos) as ejecutor:
+            # Executor.map envía todas las tareas al llamarse: el lote siguiente se decodifica en segundo plano
+            siguiente = ejecutor.map(self._decodificar, lotes[0]) if lotes else None
+
+            for numero, rutas_lote in enumerate(lotes):
+                decodificadas = list(siguiente)
+                if numero + 1 < len(lotes):
+                    siguiente = ejecutor.map(self._decodificar, lotes[numero + 1])
+
+                df = self._filas_lote(rutas_lote, decodificadas)
+                self._escribir(df, ruta_salida)
+                errores += int(df['error'].notna().sum())
+
+                transcurrido = time.perf_counter() - inicio
+                hechas = sum(len(l) for l in lotes[:numero + 1])
+                logger.info(f"Lote {numero + 1}/{len(lotes)}: {hechas} imágenes, "
+                            f"{hechas / transcurrido:.1f} imágenes/s")
+
+        segundos = time.perf_counter() - inicio
+        return {
+            'procesadas': len(pendientes),
+            'omitidas': len(rutas) - len(pendientes),
+            'con_error': errores,
+            'segundos': round(segundos, 3),
+            'imagenes_por_segundo': round(len(pendientes) / segundos, 1) if pendientes and segundos else 0.0
+        }
+
+
+def main():
+    from src.train.cnn import cnn
+    from src.utils.metrics import obtener_ruta_app
+
+    parser = argparse.ArgumentParser(description="Diagnóstico CNN por lotes para carpetas de imágenes")
+    parser.add_argument('origen', nargs='?', help="Carpeta con imágenes (se recorre de forma recursiva)")
+    parser.add_argument('--manifiesto', help="Usar el manifiesto de imágenes SQLite en lugar de una carpeta")
+    parser.add_argument('--conjunto', default='pruebas', help="Conjunto del manifiesto a procesar")
+    parser.add_argument('--salida', default='diagnosticos.csv', help="Archivo .csv o carpeta .parquet")
+    parser.add_argument('--tamano-lote', type=int, default=256)
+    parser.add_argument('--hilos', type=int, default=None)
+    parser.add_argument('--sin-reanudar', action='store_true', help="Procesar de nuevo todas las imágenes")
+    argumentos = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    ruta_raiz = obtener_ruta_app("AgroIA")
+
+    if argumentos.manifiesto:
+        rutas = ManifiestoImagenes(ruta_raiz, argumentos.manifiesto).rutas(argumentos.conjunto)
+    elif argumentos.origen:
+        rutas = diagnostico_lote.listar_imagenes(argumentos.origen)
+    else:
+        parser.error("Indique una carpeta de origen o --manifiesto")
+
+    lote = diagnostico_lote(cnn(ruta_raiz), argumentos.tamano_lote, argumentos.hilos)
+    resumen = lote.procesar(rutas, argumentos.salida, reanudar=not argumentos.sin_reanudar)
+    print(resumen)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""
+Clase: entrenar_ann
+
+Objetivo: Reentrenamiento reproducible en CPU del modelo ANN de recomendación, equivalente a
+04_ANN_Reco.ipynb: escalador persistido, semillas fijas, entrada tf.data en caché y artefactos
+versionados con reporte de tiempos
+
+Cambios:
+    1. Creacion de clase 19-10-2026
+    2. Parada temprana con una validación separada de entrenamiento; prueba solo para las métricas 19-10-2026
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import argparse
+from datetime import datetime
+from typing import Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import MinMaxScaler
+from sklearn.utils.class_weight import compute_class_weight
+
+from src.Transformaciones import Transformaciones
+from src.train.ann_grid import ann_grid
+from src.train.ann_numpy import exportar_npz
+
+logger = logging.getLogger(__name__)
+
+ARCHIVO_MODELO = 'modelo_pred_cultivopapa.h5'
+ARCHIVO_ESCALADOR = 'escalador_ann.pkl'
+
+
+class entrenar_ann:
+    """
+    Entrena la red densa 5-5-3 del notebook con los mismos datos, partición y pesos de clase,
+    y guarda modelo, pesos NumPy (.npz), escalador y reporte en models/ann_versiones/<versión>.
+    """
+
+    def __init__(self, ruta_raiz: str, ruta_datos: Optional[str] = None, semilla: int = 101,
+                 epocas: int = 500, tamano_lote: int = 256, paciencia: int = 15,
+                 fraccion_validacion: float = 0.2):
+        """
+        Args:
+            ruta_raiz (str): Directorio raíz del proyecto
+            ruta_datos (str, optional): CSV con las columnas de ann_grid.columnas y 'Recomendacion'
+            semilla (int): Semilla de la partición, la inicialización y el orden de los lotes
+            epocas (int): Épocas máximas
+            tamano_lote (int): Tamaño del lote
+            paciencia (int): Épocas sin mejora de val_loss antes de detener
+            fraccion_validacion (float): Fracción de entrenamiento usada para validar en fit()
+        """
+        self.ruta_raiz = ruta_raiz
+        self.ruta_datos = ruta_datos or os.path.join(ruta_raiz, 'data', 'raw', 'ANN',
+                                                     'datos_con_recomendaciones_completo.csv')
+        self.semilla = semilla
+        self.epocas = epocas
+        self.tamano_lote = tamano_lote
+        self.paciencia = paciencia
+        self.fraccion_validacion = fraccion_validacion
+        self.tiempos = {}
+
+    def _medir(self, etapa: str, inicio: float) -> None:
+        self.tiempos[etapa] = round(time.perf_counter() - inicio, 3)
+        logger.info(f"{etapa}: {self.tiempos[etapa]} s")
+
+    def cargar_datos(self):
+        """
+        Lee el CSV y convierte la recomendación a índice de clase 0..2 (riego, fertilización, poda)
+
+        Returns:
+            Tuple[pd.DataFrame, np.ndarray]: Variables de entrada y etiquetas
+        """
+        df = pd.read_csv(self.ruta_datos, encoding="ISO-8859-1")
+        df = Transformaciones().recomendacion_num(df)
+        if df['Recomendacion'].isnull().any():
+            raise ValueError("Hay recomendaciones no reconocidas en los datos")
+
+        return df[ann_grid.columnas], df['Recomendacion'].to_numpy(dtype=np.int64) - 1
+
+    def _dataset(self, X: np.ndarray, y: np.ndarray, pesos: np.ndarray, mezclar: bool):
+        import tensorflow as tf
+
+        dataset = tf.data.Dataset.from_tensor_slices((X, tf.one_hot(y, 3), pesos)).cache()
+        if mezclar:
+            dataset = dataset.shuffle(len(X), seed=self.semilla, reshuffle_each_iteration=True)
+        return dataset.batch(self.tamano_lote).prefetch(tf.data.AUTOTUNE)
+
+    def _crear_modelo(self, entradas: int):
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import Dense, Input
+
+        # Misma arquitectura que el notebook: tantas neuronas ocultas como variables de entrada
+        modelo = Sequential([
+            Input(shape=(entradas,)),
+            Dense(units=entradas, activation='relu'),
+            Dense(units=entradas, activation='relu'),
+            Dense(3, activation='softmax')
+        ])
+        modelo.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+        return modelo
+
+    def entrenar(self, directorio_salida: Optional[str] = None) -> dict:
+        """
+        Ejecuta el entrenamiento completo y guarda los artefactos versionados.
+
+        Args:
+            directorio_salida (str, optional): Carpeta de versiones; por defecto models/ann_versiones
+
+        Returns:
+            dict: Reporte con versión, métricas, épocas y tiempos por etapa
+        """
+        import tensorflow as tf
+        from tensorflow.keras.callbacks import EarlyStopping
+
+        inicio_total = time.perf_counter()
+
+        # Determinismo: semillas de Python/NumPy/TensorFlow y operaciones deterministas
+        tf.keras.utils.set_random_seed(self.semilla)
+        tf.config.experimental.enable_op_determinism()
+
+        inicio = time.perf_counter()
+        X, y = self.cargar_datos()
+        with open(self.ruta_datos, 'rb') as f:
+            huella_datos = hashlib.sha1(f.read()).hexdigest()
+        self._medir('lectura', inicio)
+
+        inicio = time.perf_counter()
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.25, random_state=self.semilla, stratify=y)
+        # La parada temprana se decide con una parte de entrenamiento: prueba solo mide el modelo final
+        X_train, X_validacion, y_train, y_validacion = train_test_split(
+            X_train, y_train, test_size=self.fraccion_validacion, random_state=self.semilla, stratify=y_train)
+
+        # El escalador se ajusta solo con entrenamiento y se guarda junto al modelo
+        escalador = MinMaxScaler().fit(X_train)
+        X_train = escalador.transform(X_train).astype(np.float32)
+        X_validacion = escalador.transform(X_validacion).astype(np.float32)
+        X_test = escalador.transform(X_test).astype(np.float32)
+
+        # Pesos de clase balanceados como en el notebook, aplicados como pesos por muestra
+        pesos_clase = compute_class_weight(class_weight='balanced', classes=np.arange(3), y=y_train)
+        datos_train = self._dataset(X_train, y_train, pesos_clase[y_train].astype(np.float32), mezclar=True)
+        datos_validacion = self._dataset(X_validacion, y_validacion, np.ones(len(y_validacion), dtype=np.float32),
+                                         mezclar=False)
+        self._medir('preparacion', inicio)
+
+        inicio = time.perf_counter()
+        modelo = self._crear_modelo(X_train.shape[1])
+        historia = modelo.fit(
+            datos_train, validation_data=datos_validacion, epochs=self.epocas, verbose=0,
+            callbacks=[EarlyStopping(monitor='val_loss', mode='min', patience=self.paciencia,
+                                     restore_best_weights=True)]
+        )
+        self._medir('entrenamiento', inicio)
+
+        inicio = time.perf_counter()
+        predicciones = np.argmax(modelo.predict(X_test, batch_size=len(X_test), verbose=0), axis=-1)
+        metricas = {
+            'exactitud': round(float(accuracy_score(y_test, predicciones)), 4),
+            'matriz_confusion': confusion_matrix(y_test, predicciones, labels=[0, 1, 2]).tolist(),
+            'reporte_clases': classification_report(
+                y_test, predicciones, labels=[0, 1, 2], target_names=['riego', 'fertilizacion', 'poda_preventiva'],
+                output_dict=True, zero_division=0)
+        }
+        self._medir('evaluacion', inicio)
+
+        inicio = time.perf_counter()
+        version = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{huella_datos[:8]}"
+        directorio = os.path.join(directorio_salida or os.path.join(self.ruta_raiz, 'models', 'ann_versiones'),
+                                  version)
+        os.makedirs(directorio, exist_ok=True)
+
+        ruta_modelo = os.path.join(directorio, ARCHIVO_MODELO)
+        modelo.save(ruta_modelo)
+        exportar_npz(ruta_modelo, os.path.splitext(ruta_modelo)[0] + '.npz')
+        joblib.dump(escalador, os.path.join(directorio, ARCHIVO_ESCALADOR))
+        self._medir('guardado', inicio)
+
+        self.tiempos['total'] = round(time.perf_counter() - inicio_total, 3)
+        reporte = {
+            'version': version,
+            'directorio': directorio,
+            'datos': {'ruta': os.path.relpath(self.ruta_datos, self.ruta_raiz), 'sha1': huella_datos,
+                      'entrenamiento': int(len(y_train)), 'validacion': int(len(y_validacion)),
+                      'prueba': int(len(y_test))},
+            'parametros': {'semilla': self.semilla, 'epocas_maximas': self.epocas,
+                           'tamano_lote': self.tamano_lote, 'paciencia': self.paciencia,
+                           'fraccion_validacion': self.fraccion_validacion},
+            'epocas_ejecutadas': len(historia.history['loss']),
+            'metricas': metricas,
+            'tiempos_segundos': self.tiempos
+        }
+        with open(os.path.join(directorio, 'reporte.json'), 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+
+        return reporte
+
+    def publicar(self, directorio_version: str) -> None:
+        """
+        Copia modelo, pesos NumPy y escalador de una versión a models/, donde los usa ann
+        """
+        destino = os.path.join(self.ruta_raiz, 'models')
+        nombre_npz = os.path.splitext(ARCHIVO_MODELO)[0] + '.npz'
+        # El .npz se copia después del .h5 para que cargar_modelo no lo considere desactualizado
+        for archivo in (ARCHIVO_ESCALADOR, ARCHIVO_MODELO, nombre_npz):
+            shutil.copy2(os.path.join(directorio_version, archivo), os.path.join(destino, archivo))
+        os.utime(os.path.join(destino, nombre_npz))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reentrenamiento reproducible del modelo ANN")
+    parser.add_argument('--directorio-base', default='.', help="Directorio raíz del proyecto")
+    parser.add_argument('--datos', default=None, help="CSV de entrenamiento (por defecto data/raw/ANN/...)")
+    parser.add_argument('--semilla', type=int, default=101)
+    parser.add_argument('--epocas', type=int, default=500)
+    parser.add_argument('--tamano-lote', type=int, default=256)
+    parser.add_argument('--paciencia', type=int, default=15)
+    parser.add_argument('--fraccion-validacion', type=float, default=0.2,
+                        help="Fracción de entrenamiento reservada para la parada temprana")
+    parser.add_argument('--publicar', action='store_true',
+                        help="Copiar la versión entrenada a models/ para que la usen la API y la app")
+    argumentos = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    entrenador = entrenar_ann(os.path.abspath(argumentos.directorio_base), argumentos.datos, argumentos.semilla,
+                              argumentos.epocas, argumentos.tamano_lote, argumentos.paciencia,
+                              argumentos.fraccion_validacion)
+    reporte = entrenador.entrenar()
+    if argumentos.publicar:
+        entrenador.publicar(reporte['directorio'])
+
+    print(f"Versión {reporte['version']}: exactitud {reporte['metricas']['exactitud']}, "
+          f"{reporte['epocas_ejecutadas']} épocas")
+    print(pd.Series(reporte['tiempos_segundos']).to_string())
+
+
+if __name__ == '__main__':
+    main()
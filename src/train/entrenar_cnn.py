@@ -0,0 +1,365 @@
+"""
+Clase: entrenar_cnn
+
+Objetivo: Entrenamiento en CPU del modelo CNN de hojas de papa, equivalente a 02_CNN_Leaves.ipynb,
+sobre el pipeline tf.data de DataPrepEdaCnn: hilos configurables, resolución reducida opcional,
+respaldo y reanudación por época, parada temprana y reporte de imágenes por segundo
+
+Cambios:
+    1. Creacion de clase 19-10-2026
+    2. Validación separada de entrenamiento, entrada redimensionada como el servicio y
+       restauración del mejor checkpoint también tras reanudar 19-10-2026
+"""
+import os
+import json
+import time
+import logging
+import argparse
+from typing import Optional
+
+import numpy as np
+
+from src.DataPrepEdaCnn import DataPrepEdaCnn
+
+logger = logging.getLogger(__name__)
+
+# Entrada que espera cnn._preprocesar_imagen; el modelo exportado siempre la acepta
+FORMA_SERVICIO = (256, 256, 3)
+
+
+def configurar_hilos(hilos_intra: int = 0, hilos_inter: int = 0) -> None:
+    """
+    Hilos de TensorFlow para operaciones internas (intra) y operaciones independientes (inter).
+    Debe llamarse antes de ejecutar cualquier operación; 0 deja el valor de TensorFlow.
+    """
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(hilos_intra)
+    tf.config.threading.set_inter_op_parallelism_threads(hilos_inter)
+
+
+def _callback_rendimiento(imagenes_por_epoca: int):
+    """
+    Callback que mide imágenes por segundo de cada época de entrenamiento, sin contar la validación
+    """
+    import tensorflow as tf
+
+    class Rendimiento(tf.keras.callbacks.Callback):
+        def __init__(self):
+            super().__init__()
+            self.epocas = []
+            self._inicio = None
+            self._fin = None
+
+        def on_epoch_begin(self, epoch, logs=None):
+            self._inicio = time.perf_counter()
+            self._fin = None
+
+        def on_test_begin(self, logs=None):
+            # La validación de fit() abre con on_test_begin: ahí termina el entrenamiento de la época
+            if self._inicio is not None and self._fin is None:
+                self._fin = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            segundos = (self._fin or time.perf_counter()) - self._inicio
+            self.epocas.append({'epoca': epoch + 1, 'segundos': round(segundos, 3),
+                                'imagenes_por_segundo': round(imagenes_por_epoca / segundos, 1)})
+            logger.info(f"Época {epoch + 1}: {self.epocas[-1]['imagenes_por_segundo']} imágenes/s")
+
+    return Rendimiento()
+
+
+def _callback_registro_mejor(checkpoint, ruta_registro: str):
+    """
+    Callback que guarda junto al checkpoint el mejor val_loss y su época, para que una ejecución
+    reanudada no reemplace el mejor modelo de la ejecución interrumpida por uno peor
+    """
+    import tensorflow as tf
+
+    class RegistroMejor(tf.keras.callbacks.Callback):
+        def __init__(self):
+            super().__init__()
+            self._mejor = checkpoint.best
+
+        def on_epoch_end(self, epoch, logs=None):
+            # Se ejecuta después de ModelCheckpoint: si su mejor valor cambió, guardó los pesos
+            if checkpoint.best != self._mejor:
+                self._mejor = checkpoint.best
+                with open(ruta_registro, 'w', encoding='utf-8') as f:
+                    json.dump({'val_loss': float(self._mejor), 'epoca': epoch + 1}, f)
+
+    return RegistroMejor()
+
+
+class entrenar_cnn:
+    """
+    Entrena la red convolucional del notebook (Conv32-Conv64-Conv64, Dense128, Dropout 0.5) con el
+    aumento de datos y las rutas de DataPrepEdaCnn. Las imágenes de entrenamiento pasan por el
+    mismo camino que en el servicio: cv2.resize a 256x256 y, con una resolución menor, la capa
+    Resizing 'nearest' que el modelo exportado antepone a las capas entrenadas.
+    """
+
+    def __init__(self, directorio_base: str, altura: int = 256, ancho: int = 256, tamano_lote: int = 32,
+                 epocas: int = 10, paciencia: int = 2, semilla: int = 101,
+                 directorio_trabajo: Optional[str] = None, fraccion_validacion: float = 0.1):
+        """
+        Args:
+            directorio_base (str): Directorio raíz del proyecto
+            altura (int): Altura de entrenamiento (menor que 256 acelera en CPU)
+            ancho (int): Ancho de entrenamiento
+            tamano_lote (int): Tamaño del lote
+            epocas (int): Épocas máximas
+            paciencia (int): Épocas sin mejora de val_loss antes de detener
+            semilla (int): Semilla de inicialización, mezcla y aumento
+            directorio_trabajo (str, optional): Respaldos, mejor checkpoint y reporte.
+                                                Por defecto models/cnn_entrenamiento
+            fraccion_validacion (float): Fracción de entrenamiento usada para validar en fit()
+        """
+        self.directorio_base = directorio_base
+        self.forma_imagen = (altura, ancho, 3)
+        self.tamano_lote = tamano_lote
+        self.epocas = epocas
+        self.paciencia = paciencia
+        self.semilla = semilla
+        if not 0 < fraccion_validacion < 1:
+            raise ValueError("fraccion_validacion debe estar entre 0 y 1: la parada temprana la necesita")
+        self.fraccion_validacion = fraccion_validacion
+        self.directorio_trabajo = directorio_trabajo or os.path.join(directorio_base, 'models', 'cnn_entrenamiento')
+        self.analizador = None
+        self.imagenes_entrenamiento = 0
+
+    def preparar_datos(self, usar_shards: bool = False, directorio_shards: Optional[str] = None,
+                       hilos_datos: int = 0) -> None:
+        """
+        Datasets tf.data de DataPrepEdaCnn con la forma de entrenamiento: caché en memoria de las
+        imágenes redimensionadas, o shards uint8 (se empaquetan la primera vez si no existen).
+        La validación es una partición estratificada de entrenamiento; prueba solo se usa al final.
+
+        Args:
+            usar_shards (bool): Leer desde shards en lugar de decodificar JPEG
+            directorio_shards (str, optional): Carpeta de shards 256x256 empaquetados como el servicio;
+                                               por defecto data/processed/CNN/shards/servicio
+            hilos_datos (int): Hilos propios del pipeline de entrada; 0 comparte los de TensorFlow
+        """
+        import tensorflow as tf
+
+        analizador = DataPrepEdaCnn(self.directorio_base)
+        analizador.configurar_rutas()
+        analizador.configurar_forma_imagen(*self.forma_imagen)
+        analizador.configurar_forma_servicio(*FORMA_SERVICIO[:2])
+        analizador.configurar_tamano_lote(self.tamano_lote)
+        # Mismos parámetros de aumento que PipeLineEDACnn usa para el notebook
+        analizador.configurar_generador_imagenes(rotacion_max=20, desplazamiento_ancho=0.10,
+                                                 desplazamiento_alto=0.10, distorsion=0.1,
+                                                 zoom_max=0.1, giro_horizontal=True)
+
+        if usar_shards:
+            if directorio_shards is None:
+                directorio_shards = os.path.join(self.directorio_base, 'data', 'processed', 'CNN',
+                                                 'shards', 'servicio')
+            try:
+                analizador.usar_shards(directorio_shards)
+            except FileNotFoundError:
+                logger.info(f"Empaquetando shards en {directorio_shards}")
+                analizador.empaquetar_shards(directorio_shards)
+
+        analizador.crear_datasets_tf(modo_clase='categorical', fraccion_validacion=self.fraccion_validacion,
+                                     semilla=self.semilla)
+        if hilos_datos:
+            opciones = tf.data.Options()
+            opciones.threading.private_threadpool_size = hilos_datos
+            analizador.dataset_train = analizador.dataset_train.with_options(opciones)
+            analizador.dataset_validacion = analizador.dataset_validacion.with_options(opciones)
+            analizador.dataset_test = analizador.dataset_test.with_options(opciones)
+
+        if analizador.shards is not None:
+            total = len(analizador.shards["entrenamiento"])
+        else:
+            total = len(analizador._listar_imagenes("entrenamiento")[0])
+        self.imagenes_entrenamiento = total - len(analizador.indices_validacion)
+        self.analizador = analizador
+
+    def _crear_capas(self, num_clases: int) -> list:
+        from tensorflow.keras.layers import Conv2D, Dense, Dropout, Flatten, MaxPooling2D
+
+        return [
+            Conv2D(filters=32, kernel_size=(3, 3), activation='relu'),
+            MaxPooling2D(pool_size=(2, 2)),
+            Conv2D(filters=64, kernel_size=(3, 3), activation='relu'),
+            MaxPooling2D(pool_size=(2, 2)),
+            Conv2D(filters=64, kernel_size=(3, 3), activation='relu'),
+            MaxPooling2D(pool_size=(2, 2)),
+            Flatten(),
+            Dense(128, activation='relu'),
+            Dropout(0.5),
+            Dense(num_clases, activation='softmax')
+        ]
+
+    def _modelo_servicio(self, capas: list):
+        """
+        Modelo con la entrada de FORMA_SERVICIO que comparte las capas entrenadas
+        """
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import Input, Resizing
+
+        # Con configurar_forma_servicio, DataPrepEdaCnn aplica esta misma reducción al entrenar
+        return Sequential([Input(shape=FORMA_SERVICIO),
+                           Resizing(*self.forma_imagen[:2], interpolation='nearest')] + capas)
+
+    def entrenar(self, ruta_salida: Optional[str] = None) -> dict:
+        """
+        Entrena, exporta el modelo en .h5 para src.train.cnn y escribe reporte.json en el
+        directorio de trabajo. Si una ejecución anterior se interrumpió, continúa desde la
+        última época respaldada. El modelo exportado tiene los pesos de la época con menor
+        val_loss, incluidas las épocas previas a una reanudación.
+
+        Args:
+            ruta_salida (str, optional): Archivo del modelo; por defecto models/modelo_CNN_Papas.h5
+
+        Returns:
+            dict: Reporte con métricas, épocas y rendimiento
+        """
+        import tensorflow as tf
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import Input
+        from tensorflow.keras.callbacks import BackupAndRestore, EarlyStopping, ModelCheckpoint
+
+        if self.analizador is None:
+            self.preparar_datos()
+        ruta_salida = ruta_salida or os.path.join(self.directorio_base, 'models', 'modelo_CNN_Papas.h5')
+        os.makedirs(self.directorio_trabajo, exist_ok=True)
+
+        tf.keras.utils.set_random_seed(self.semilla)
+        indices_clases = self.analizador.indices_clases
+        capas = self._crear_capas(len(indices_clases))
+        modelo = Sequential([Input(shape=self.forma_imagen)] + capas)
+        modelo.compile(loss='categorical_crossentropy', optimizer='adam', metrics=['accuracy'])
+
+        ruta_respaldo = os.path.join(self.directorio_trabajo, 'respaldo')
+        ruta_mejor = os.path.join(self.directorio_trabajo, 'mejor.weights.h5')
+        ruta_registro = os.path.join(self.directorio_trabajo, 'mejor.json')
+
+        # BackupAndRestore borra su respaldo al terminar: si existe, esta ejecución reanuda otra y
+        # el mejor checkpoint sigue vigente; si no, el de una ejecución anterior ya no corresponde
+        mejor_previo = None
+        if os.path.isdir(ruta_respaldo) and os.path.exists(ruta_registro):
+            with open(ruta_registro, 'r', encoding='utf-8') as f:
+                mejor_previo = json.load(f)
+        else:
+            for ruta in (ruta_mejor, ruta_registro):
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+
+        rendimiento = _callback_rendimiento(self.imagenes_entrenamiento)
+        checkpoint = ModelCheckpoint(ruta_mejor, monitor='val_loss', save_best_only=True, save_weights_only=True,
+                                     initial_value_threshold=mejor_previo['val_loss'] if mejor_previo else None)
+        callbacks = [
+            # Respaldo por época: si el proceso se corta, la siguiente ejecución retoma desde ahí
+            BackupAndRestore(ruta_respaldo),
+            checkpoint,
+            _callback_registro_mejor(checkpoint, ruta_registro),
+            EarlyStopping(monitor='val_loss', patience=self.paciencia),
+            rendimiento
+        ]
+
+        inicio = time.perf_counter()
+        historia = modelo.fit(self.analizador.dataset_train, validation_data=self.analizador.dataset_validacion,
+                              epochs=self.epocas, callbacks=callbacks, verbose=2)
+        segundos_entrenamiento = time.perf_counter() - inicio
+
+        # Pesos de la mejor época de todas las ejecuciones, no solo de la actual
+        mejor_epoca = None
+        if os.path.exists(ruta_mejor):
+            modelo.load_weights(ruta_mejor)
+            with open(ruta_registro, 'r', encoding='utf-8') as f:
+                mejor_epoca = json.load(f)['epoca']
+
+        # Inferencia sobre prueba, que no intervino en el entrenamiento: exactitud final y rendimiento
+        inicio = time.perf_counter()
+        etiquetas, predicciones = [], []
+        for imagenes, objetivo in self.analizador.dataset_test:
+            predicciones.append(np.argmax(modelo(imagenes, training=False).numpy(), axis=-1))
+            etiquetas.append(np.argmax(objetivo.numpy(), axis=-1))
+        segundos_prediccion = time.perf_counter() - inicio
+        etiquetas, predicciones = np.concatenate(etiquetas), np.concatenate(predicciones)
+
+        exportado = modelo if self.forma_imagen == FORMA_SERVICIO else self._modelo_servicio(capas)
+        os.makedirs(os.path.dirname(os.path.abspath(ruta_salida)), exist_ok=True)
+        exportado.save(ruta_salida)
+
+        # La primera época incluye el llenado de la caché; el promedio usa las demás si las hay
+        epocas = rendimiento.epocas
+        estables = epocas[1:] or epocas
+        reporte = {
+            'modelo': ruta_salida,
+            'forma_entrenamiento': list(self.forma_imagen),
+            'forma_servicio': list(exportado.input_shape[1:]),
+            'indices_clases': indices_clases,
+            'imagenes': {'entrenamiento': self.imagenes_entrenamiento,
+                         'validacion': len(self.analizador.indices_validacion)},
+            'origen_datos': 'shards' if self.analizador.shards is not None else 'jpeg',
+            'parametros': {'tamano_lote': self.tamano_lote, 'epocas_maximas': self.epocas,
+                           'paciencia': self.paciencia, 'semilla': self.semilla,
+                           'fraccion_validacion': self.fraccion_validacion,
+                           'hilos_intra': tf.config.threading.get_intra_op_parallelism_threads(),
+                           'hilos_inter': tf.config.threading.get_inter_op_parallelism_threads()},
+            'epocas_ejecutadas': len(historia.history.get('loss', [])),
+            # Tras reanudar, la historia solo cubre esta ejecución; la última época es la global
+            'ultima_epoca': epocas[-1]['epoca'] if epocas else None,
+            'mejor_epoca': mejor_epoca,
+            'historia': {clave: [round(float(v), 4) for v in valores] for clave, valores in historia.history.items()},
+            'exactitud_prueba': round(float(np.mean(etiquetas == predicciones)), 4),
+            'rendimiento': {
+                'por_epoca': epocas,
+                'entrenamiento_imagenes_por_segundo': round(
+                    float(np.mean([e['imagenes_por_segundo'] for e in estables])), 1) if estables else None,
+                'prediccion_imagenes_por_segundo': round(len(etiquetas) / segundos_prediccion, 1),
+                'segundos_entrenamiento': round(segundos_entrenamiento, 3)
+            }
+        }
+        with open(os.path.join(self.directorio_trabajo, 'reporte.json'), 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+
+        return reporte
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrenamiento del modelo CNN de hojas de papa")
+    parser.add_argument('--directorio-base', default='.', help="Directorio raíz del proyecto")
+    parser.add_argument('--resolucion', type=int, default=256,
+                        help="Lado de la imagen de entrenamiento (ej. 128 para entrenar más rápido)")
+    parser.add_argument('--tamano-lote', type=int, default=32)
+    parser.add_argument('--epocas', type=int, default=10)
+    parser.add_argument('--paciencia', type=int, default=2)
+    parser.add_argument('--semilla', type=int, default=101)
+    parser.add_argument('--fraccion-validacion', type=float, default=0.1,
+                        help="Fracción de entrenamiento reservada para validación y parada temprana")
+    parser.add_argument('--shards', action='store_true', help="Leer desde shards uint8 (se crean si faltan)")
+    parser.add_argument('--hilos-intra', type=int, default=os.cpu_count() or 1,
+                        help="Hilos por operación (convoluciones, matmul)")
+    parser.add_argument('--hilos-inter', type=int, default=2, help="Operaciones independientes en paralelo")
+    parser.add_argument('--hilos-datos', type=int, default=0,
+                        help="Hilos propios del pipeline de entrada; 0 comparte los de TensorFlow")
+    parser.add_argument('--salida', default=None, help="Archivo .h5 (por defecto models/modelo_CNN_Papas.h5)")
+    parser.add_argument('--directorio-trabajo', default=None,
+                        help="Respaldos y reporte (por defecto models/cnn_entrenamiento)")
+    argumentos = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    configurar_hilos(argumentos.hilos_intra, argumentos.hilos_inter)
+
+    entrenador = entrenar_cnn(os.path.abspath(argumentos.directorio_base), argumentos.resolucion,
+                              argumentos.resolucion, argumentos.tamano_lote, argumentos.epocas,
+                              argumentos.paciencia, argumentos.semilla, argumentos.directorio_trabajo,
+                              argumentos.fraccion_validacion)
+    entrenador.preparar_datos(argumentos.shards, hilos_datos=argumentos.hilos_datos)
+    reporte = entrenador.entrenar(argumentos.salida)
+
+    print(f"Modelo {reporte['modelo']}: exactitud {reporte['exactitud_prueba']}, "
+          f"{reporte['epocas_ejecutadas']} épocas")
+    print(f"Entrenamiento: {reporte['rendimiento']['entrenamiento_imagenes_por_segundo']} imágenes/s, "
+          f"predicción: {reporte['rendimiento']['prediccion_imagenes_por_segundo']} imágenes/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,351 @@
+"""
+Clase: evaluacion_cnn
+
+Objetivo: Evaluación del modelo CNN sobre el conjunto de prueba: exactitud, precisión y recall
+por clase, matriz de confusión, calibración y latencia por tamaño de lote
+
+Cambios:
+    1. Creacion de clase 19-10-2026
+    2. Ajuste y persistencia de la temperatura de calibración 19-10-2026
+    3. Conjunto de prueba por lotes; shards solo si equivalen al preprocesamiento del servicio 19-10-2026
+    4. Temperatura ajustada en una parte reservada y medida en el resto del conjunto de prueba 19-10-2026
+    5. Shards empaquetados como el servicio aceptados sin revisar las imágenes originales 19-10-2026
+"""
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+from sklearn.metrics import accuracy_score, confusion_matrix, precision_recall_fscore_support
+from sklearn.model_selection import train_test_split
+
+from src.DataPrepEdaCnn import DataPrepEdaCnn
+from src.ShardsImagenes import ShardsImagenes
+
+
+class evaluacion_cnn:
+    """
+    Ejecuta inferencia por lotes sobre el conjunto de prueba y calcula las métricas del modelo.
+    Usa los shards empaquetados si existen y equivalen a la entrada del servicio; si no, decodifica
+    los JPEG con cnn._preprocesar_imagen en un pool de hilos.
+    """
+
+    def __init__(self, modelo_cnn, directorio_base: str, tamano_lote: int = 128):
+        """
+        Args:
+            modelo_cnn (cnn): Instancia de src.train.cnn.cnn
+            directorio_base (str): Directorio raíz del proyecto
+            tamano_lote (int): Imágenes por llamada al modelo durante la evaluación
+        """
+        self.modelo_cnn = modelo_cnn
+        self.directorio_base = directorio_base
+        self.tamano_lote = tamano_lote
+        self.origen = None
+
+    @staticmethod
+    def _shards_como_servicio(lector: ShardsImagenes) -> bool:
+        """
+        Shards empaquetados con como_servicio ya usan el cv2.resize del servicio. Los demás guardan
+        imágenes redimensionadas con PIL 'nearest': solo son la misma entrada si ninguna imagen
+        original necesitó redimensionarse, lo que se comprueba leyendo solo los encabezados.
+        """
+        if lector.como_servicio:
+            return True
+        altura, ancho = lector.forma_imagen[:2]
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as ejecutor:
+            return all(dimensiones == (altura, ancho) for dimensiones in
+                       ejecutor.map(DataPrepEdaCnn._leer_dimensiones_encabezado, lector.rutas))
+
+    def lotes_prueba(self, directorio_shards: Optional[str] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Lotes de imágenes preprocesadas (float32 en [0, 1]) y etiquetas del conjunto de prueba,
+        con la misma entrada que recibe el modelo en el servicio. En memoria solo hay un lote
+        (y el siguiente, que se decodifica mientras se procesa el actual).
+
+        Args:
+            directorio_shards (str, optional): Carpeta de shards de prueba. Por defecto
+                                               data/processed/CNN/shards/servicio/pruebas si existe,
+                                               o data/processed/CNN/shards/pruebas
+
+        Returns:
+            Iterator[Tuple[np.ndarray, np.ndarray]]: Imágenes (lote, 256, 256, 3) y etiquetas (lote,)
+        """
+        if directorio_shards is None:
+            # Primero los shards empaquetados como el servicio (entrenar_cnn --shards)
+            base_shards = os.path.join(self.directorio_base, 'data', 'processed', 'CNN', 'shards')
+            directorio_shards = os.path.join(base_shards, 'servicio', 'pruebas')
+            if not os.path.exists(os.path.join(directorio_shards, ShardsImagenes.ARCHIVO_MANIFIESTO)):
+                directorio_shards = os.path.join(base_shards, 'pruebas')
+
+        # Los índices de los shards deben coincidir con los del modelo para poder usarlos
+        clases_modelo = {clase: indice for indice, clase in self.modelo_cnn.clases.items()}
+
+        if os.path.exists(os.path.join(directorio_shards, ShardsImagenes.ARCHIVO_MANIFIESTO)):
+            lector = ShardsImagenes(directorio_shards)
+            if (lector.indices_clases == clases_modelo and lector.forma_imagen == (256, 256, 3)
+                    and self._shards_como_servicio(lector)):
+                self.origen = 'shards'
+                for inicio in range(0, len(lector), self.tamano_lote):
+                    imagenes, etiquetas = lector.lote(np.arange(inicio, min(inicio + self.tamano_lote, len(lector))))
+                    yield imagenes.astype(np.float32) / 255.0, etiquetas
+                return
+
+        analizador = DataPrepEdaCnn(self.directorio_base)
+        analizador.configurar_rutas()
+        rutas, clases = analizador._listar_imagenes("pruebas")
+        etiquetas = np.array([clases_modelo[clase] for clase in clases], dtype=np.int64)
+
+        def decodificar(ruta):
+            with Image.open(ruta) as imagen:
+                return self.modelo_cnn._preprocesar_imagen(imagen.convert('RGB'))
+
+        self.origen = 'jpeg'
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as ejecutor:
+            # Executor.map envía todas las tareas al llamarse: el lote siguiente se decodifica en segundo plano
+            siguiente = ejecutor.map(decodificar, rutas[:self.tamano_lote])
+            for inicio in range(0, len(rutas), self.tamano_lote):
+                imagenes = np.stack(list(siguiente))
+                fin = inicio + self.tamano_lote
+                if fin < len(rutas):
+                    siguiente = ejecutor.map(decodificar, rutas[fin:fin + self.tamano_lote])
+                yield imagenes, etiquetas[inicio:fin]
+
+    @staticmethod
+    def calcular_calibracion(probabilidades: np.ndarray, etiquetas: np.ndarray, num_bins: int = 15) -> dict:
+        """
+        Error de calibración esperado (ECE), máximo (MCE), Brier y tabla de confiabilidad.
+
+        Args:
+            probabilidades (np.ndarray): Probabilidades (n, clases)
+            etiquetas (np.ndarray): Clase real (n,)
+            num_bins (int): Intervalos de confianza
+
+        Returns:
+            dict: Métricas de calibración
+        """
+        confianza = probabilidades.max(axis=1)
+        aciertos = (probabilidades.argmax(axis=1) == etiquetas).astype(np.float64)
+        bins = np.clip((confianza * num_bins).astype(int), 0, num_bins - 1)
+
+        tabla = []
+        ece = 0.0
+        mce = 0.0
+        for b in range(num_bins):
+            mascara = bins == b
+            if not mascara.any():
+                continue
+            brecha = abs(aciertos[mascara].mean() - confianza[mascara].mean())
+            ece += mascara.mean() * brecha
+            mce = max(mce, brecha)
+            tabla.append({'Bin': f'{b / num_bins:.2f}-{(b + 1) / num_bins:.2f}',
+                          'Imagenes': int(mascara.sum()),
+                          'Confianza_Media': round(float(confianza[mascara].mean()), 4),
+                          'Exactitud': round(float(aciertos[mascara].mean()), 4)})
+
+        una_caliente = np.eye(probabilidades.shape[1])[etiquetas]
+        return {
+            'ece': float(ece),
+            'mce': float(mce),
+            'brier': float(np.mean(np.sum((probabilidades - una_caliente) ** 2, axis=1))),
+            'confiabilidad': tabla
+        }
+
+    @staticmethod
+    def ajustar_temperatura(probabilidades: np.ndarray, etiquetas: np.ndarray) -> float:
+        """
+        Temperatura que minimiza la log-verosimilitud negativa de softmax(log(p) / T).
+        Búsqueda en escala logarítmica seguida de un refinamiento alrededor del mejor valor.
+
+        Returns:
+            float: Temperatura óptima
+        """
+        logits = np.log(np.clip(probabilidades, 1e-12, 1.0))
+
+        def nll(temperatura):
+            z = logits / temperatura
+            z = z - z.max(axis=1, keepdims=True)
+            log_prob = z - np.log(np.exp(z).sum(axis=1, keepdims=True))
+            return -log_prob[np.arange(len(etiquetas)), etiquetas].mean()
+
+        candidatas = np.logspace(-1, 1, 81)
+        mejor = candidatas[np.argmin([nll(t) for t in candidatas])]
+        finas = np.linspace(mejor / 1.06, mejor * 1.06, 41)
+        return float(finas[np.argmin([nll(t) for t in finas])])
+
+    def guardar_calibracion(self, temperatura: float, umbral_baja_confianza: float = 0.6) -> str:
+        """
+        Guarda la calibración en models/calibracion_cnn.json; la clase cnn la carga al iniciar
+        """
+        ruta = os.path.join(self.directorio_base, 'models', 'calibracion_cnn.json')
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump({'temperatura': temperatura, 'umbral_baja_confianza': umbral_baja_confianza}, f, indent=2)
+        return ruta
+
+    def medir_latencia(self, imagenes: np.ndarray, tamanos_lote: List[int] = (1, 8, 32, 128),
+                       repeticiones: int = 20) -> pd.DataFrame:
+        """
+        Percentiles de latencia por llamada al modelo para cada tamaño de lote, con la misma
+        llamada que usan la API y el diagnóstico por lotes.
+
+        Args:
+            imagenes (np.ndarray): Imágenes preprocesadas de donde se toman los lotes
+            tamanos_lote (List[int]): Tamaños de lote a medir
+            repeticiones (int): Llamadas medidas por tamaño, tras una de calentamiento
+
+        Returns:
+            pd.DataFrame: p50, p90, p99 en milisegundos e imágenes por segundo por tamaño de lote
+        """
+        filas = []
+        for tamano in tamanos_lote:
+            indices = np.arange(tamano) % len(imagenes)
+            lote = imagenes[indices]
+            self.modelo_cnn.predecir_probabilidades_lote(lote, tamano)
+
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                self.modelo_cnn.predecir_probabilidades_lote(lote, tamano)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+
+            tiempos = np.array(tiempos)
+            filas.append({
+                'Tamano_Lote': tamano,
+                'p50_ms': round(float(np.percentile(tiempos, 50)), 2),
+                'p90_ms': round(float(np.percentile(tiempos, 90)), 2),
+                'p99_ms': round(float(np.percentile(tiempos, 99)), 2),
+                'Imagenes_por_segundo': round(tamano / (np.median(tiempos) / 1000), 1)
+            })
+
+        return pd.DataFrame(filas)
+
+    def evaluar(self, tamanos_lote: List[int] = (1, 8, 32, 128), repeticiones: int = 20,
+                directorio_shards: Optional[str] = None, fraccion_calibracion: float = 0.5,
+                semilla: int = 101) -> dict:
+        """
+        Evaluación completa sobre el conjunto de prueba. La temperatura se ajusta con una fracción
+        estratificada de las imágenes y 'calibracion_medicion' / 'calibracion_ajustada' se miden,
+        antes y después de aplicarla, solo sobre las restantes.
+
+        Args:
+            tamanos_lote (List[int]): Tamaños de lote para medir la latencia
+            repeticiones (int): Llamadas medidas por tamaño de lote
+            directorio_shards (str, optional): Carpeta de shards de prueba
+            fraccion_calibracion (float): Fracción reservada para ajustar la temperatura
+            semilla (int): Semilla de la partición
+
+        Returns:
+            dict: Exactitud, métricas por clase, matriz de confusión, calibración,
+                  latencias y rendimiento de la pasada completa
+        """
+        inicio = time.perf_counter()
+        probabilidades, etiquetas, muestra = [], [], []
+        tamano_muestra = max(tamanos_lote)
+        segundos_inferencia = 0.0
+        for imagenes, etiquetas_lote in self.lotes_prueba(directorio_shards):
+            inicio_lote = time.perf_counter()
+            probabilidades.append(self.modelo_cnn.predecir_probabilidades_lote(imagenes, self.tamano_lote))
+            segundos_inferencia += time.perf_counter() - inicio_lote
+            etiquetas.append(etiquetas_lote)
+            # Solo se conservan las imágenes necesarias para medir la latencia
+            faltantes = tamano_muestra - sum(len(lote) for lote in muestra)
+            if faltantes > 0:
+                muestra.append(imagenes[:faltantes].copy())
+        segundos_carga = time.perf_counter() - inicio - segundos_inferencia
+
+        probabilidades = np.concatenate(probabilidades)
+        etiquetas = np.concatenate(etiquetas)
+        predicciones = probabilidades.argmax(axis=1)
+
+        indices = sorted(self.modelo_cnn.clases)
+        nombres = [self.modelo_cnn.clases[i] for i in indices]
+        precision, recall, f1, soporte = precision_recall_fscore_support(
+            etiquetas, predicciones, labels=indices, zero_division=0)
+
+        por_clase = pd.DataFrame({
+            'Clase': nombres,
+            'Precision': np.round(precision, 4),
+            'Recall': np.round(recall, 4),
+            'F1': np.round(f1, 4),
+            'Soporte': soporte
+        })
+
+        # La temperatura se ajusta en una parte reservada del conjunto de prueba y la calibración
+        # resultante se mide en el resto, con la misma función que aplica el servicio
+        estratos = etiquetas if np.bincount(etiquetas).min(initial=0) >= 2 else None
+        indices_calibracion, indices_medicion = train_test_split(
+            np.arange(len(etiquetas)), train_size=fraccion_calibracion, stratify=estratos, random_state=semilla)
+        temperatura = self.ajustar_temperatura(probabilidades[indices_calibracion], etiquetas[indices_calibracion])
+        calibradas = self.modelo_cnn.calibrar_probabilidades(probabilidades[indices_medicion], temperatura)
+
+        return {
+            'origen_datos': self.origen,
+            'imagenes': int(len(etiquetas)),
+            'exactitud': float(accuracy_score(etiquetas, predicciones)),
+            'por_clase': por_clase,
+            'matriz_confusion': pd.DataFrame(confusion_matrix(etiquetas, predicciones, labels=indices),
+                                             index=nombres, columns=nombres),
+            'calibracion': self.calcular_calibracion(probabilidades, etiquetas),
+            'temperatura_optima': temperatura,
+            'imagenes_calibracion': int(len(indices_calibracion)),
+            'calibracion_medicion': self.calcular_calibracion(probabilidades[indices_medicion],
+                                                              etiquetas[indices_medicion]),
+            'calibracion_ajustada': self.calcular_calibracion(calibradas, etiquetas[indices_medicion]),
+            'latencia': self.medir_latencia(np.concatenate(muestra), tamanos_lote, repeticiones),
+            'segundos_carga': round(segundos_carga, 3),
+            'imagenes_por_segundo_evaluacion': round(len(etiquetas) / segundos_inferencia, 1)
+        }
+
+
+def main():
+    from src.train.cnn import cnn
+    from src.utils.metrics import obtener_ruta_app
+
+    parser = argparse.ArgumentParser(description="Evalúa el modelo CNN sobre el conjunto de prueba")
+    parser.add_argument('--tamano-lote', type=int, default=128)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--salida', help="Guardar el resultado en un archivo JSON")
+    parser.add_argument('--guardar-calibracion', action='store_true',
+                        help="Guardar la temperatura óptima en models/calibracion_cnn.json")
+    parser.add_argument('--umbral-baja-confianza', type=float, default=0.6)
+    argumentos = parser.parse_args()
+
+    ruta_raiz = obtener_ruta_app("AgroIA")
+    evaluador = evaluacion_cnn(cnn(ruta_raiz), ruta_raiz, argumentos.tamano_lote)
+    resultado = evaluador.evaluar(repeticiones=argumentos.repeticiones)
+
+    print(f"Origen de datos: {resultado['origen_datos']} ({resultado['imagenes']} imágenes)")
+    print(f"Exactitud: {resultado['exactitud']:.4f}")
+    print("\nMétricas por clase:")
+    print(resultado['por_clase'].to_string(index=False))
+    print("\nMatriz de confusión (filas: real, columnas: predicha):")
+    print(resultado['matriz_confusion'].to_string())
+    calibracion = resultado['calibracion']
+    print(f"\nCalibración: ECE {calibracion['ece']:.4f} · MCE {calibracion['mce']:.4f} · "
+          f"Brier {calibracion['brier']:.4f}")
+    print(pd.DataFrame(calibracion['confiabilidad']).to_string(index=False))
+    print(f"Temperatura óptima: {resultado['temperatura_optima']:.3f} "
+          f"(ajustada con {resultado['imagenes_calibracion']} imágenes; ECE en las restantes "
+          f"{resultado['calibracion_medicion']['ece']:.4f} -> {resultado['calibracion_ajustada']['ece']:.4f})")
+    print("\nLatencia por tamaño de lote:")
+    print(resultado['latencia'].to_string(index=False))
+    print(f"\nEvaluación completa: {resultado['imagenes_por_segundo_evaluacion']} imágenes/s")
+
+    if argumentos.guardar_calibracion:
+        print(f"Calibración guardada en {evaluador.guardar_calibracion(resultado['temperatura_optima'], argumentos.umbral_baja_confianza)}")
+
+    if argumentos.salida:
+        serializable = dict(resultado)
+        serializable['por_clase'] = resultado['por_clase'].to_dict('records')
+        serializable['matriz_confusion'] = resultado['matriz_confusion'].to_dict('index')
+        serializable['latencia'] = resultado['latencia'].to_dict('records')
+        with open(argumentos.salida, 'w', encoding='utf-8') as f:
+            json.dump(serializable, f, ensure_ascii=False, indent=2, default=int)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,20 +5,158 @@ Objetivo: Clase para cargar modelo RNN entrenado y realizar predicciones a parti
 
 Cambios:
     1. Creación de clase basada en ejemplo CNN - Fiorella, 14-07-2025
+    2. Modo de solo la ventana final: lectura inversa de CSV, poda de row groups Parquet y escalador persistido 19-10-2026
+    3. Escalador persistido en todas las rutas de pronóstico, aplicado con vectores precalculados 19-10-2026
+    4. Modo de ensamble: escenarios perturbados en un solo lote y bandas por cuantiles 19-10-2026
+    5. Pronóstico separado de la graficación: datos livianos para gráficos nativos, figuras fuera de
+       pyplot y PNG en caché por hash de la entrada 19-10-2026
+    6. Verificación del pronóstico contra valores registrados de rnn_produccion.csv 19-10-2026
+    7. Fechas de la ventana final convertidas con los mismos formatos que la lectura completa 19-10-2026
+    8. Fecha inicial del pronóstico como máximo de las fechas convertidas, no del texto 19-10-2026
 """
 # src/train/rnn.py
+import io
 import os
+import json
+import time
+import hashlib
+import argparse
+from collections import OrderedDict
+from typing import BinaryIO, List, Sequence, Union
 
 import joblib
 import numpy as np
 import pandas as pd
-import pickle
 
-from matplotlib import pyplot as plt
-from sklearn.preprocessing import MinMaxScaler
-from tensorflow.keras.models import load_model
-from keras.losses import MeanSquaredError
-from dateutil.relativedelta import relativedelta
+# Variables de entrada del modelo, en el orden en que fue entrenado
+COLUMNAS_MODELO = ['lluvia', 'humedad', 'temperatura', 'produccion']
+
+# Meses de historia que recibe el modelo
+VENTANA = 12
+
+# Bytes leídos por paso al recorrer un CSV desde el final
+TAMANO_BLOQUE_COLA = 64 * 1024
+
+# Imágenes del dashboard que se conservan en memoria
+MAXIMO_GRAFICOS_CACHE = 16
+
+# Formatos de fecha aceptados en los archivos de historia, además de ISO 8601, en orden de prueba
+FORMATOS_FECHA_CSV = ['%Y-%m-%d', '%d/%m/%Y', '%Y/%m/%d']
+
+
+def convertir_fechas(fechas: pd.Series) -> pd.Series:
+    """
+    Convierte la columna fecha como lo hace el lector Arrow de la API: cada valor se prueba con
+    ISO 8601 y luego con FORMATOS_FECHA_CSV en orden, sin inferir el formato de todo el archivo
+
+    Args:
+        fechas (pd.Series): Fechas como texto o ya convertidas
+
+    Returns:
+        pd.Series: Fechas datetime64
+    """
+    if pd.api.types.is_datetime64_any_dtype(fechas):
+        return fechas
+
+    convertidas = pd.to_datetime(fechas, format='ISO8601', errors='coerce')
+    for formato in FORMATOS_FECHA_CSV:
+        faltantes = convertidas.isna() & fechas.notna()
+        if not faltantes.any():
+            break
+        convertidas[faltantes] = pd.to_datetime(fechas[faltantes], format=formato, errors='coerce')
+
+    invalidas = convertidas.isna() & fechas.notna()
+    if invalidas.any():
+        raise ValueError(f"Fecha no reconocida: {fechas[invalidas].iloc[0]}")
+    return convertidas
+
+
+def fecha_siguiente(df: pd.DataFrame) -> pd.Timestamp:
+    """
+    Primer mes del pronóstico: la fecha más reciente de la historia más un mes
+    """
+    return convertir_fechas(df['fecha']).max() + pd.DateOffset(months=1)
+
+
+def huella_entrada(df: pd.DataFrame) -> str:
+    """
+    Hash del contenido que usa el pronóstico (fecha y COLUMNAS_MODELO), para cachear resultados
+    """
+    valores = pd.util.hash_pandas_object(df[['fecha'] + COLUMNAS_MODELO], index=False).to_numpy()
+    return hashlib.sha1(valores.tobytes()).hexdigest()
+
+
+def leer_cola_csv(archivo: BinaryIO, filas: int = VENTANA, columnas: List[str] = None) -> pd.DataFrame:
+    """
+    Lee el encabezado y las últimas filas de un CSV recorriéndolo desde el final, sin leer el resto.
+    Supone una fila por línea (sin saltos de línea dentro de campos entre comillas). La columna
+    fecha se convierte con convertir_fechas, igual que en la lectura completa de la API.
+
+    Args:
+        archivo (BinaryIO): Archivo binario con acceso aleatorio
+        filas (int): Filas finales a leer
+        columnas (List[str], optional): Columnas a conservar
+
+    Returns:
+        pd.DataFrame: Últimas filas del archivo
+    """
+    archivo.seek(0)
+    encabezado = archivo.readline()
+    inicio_datos = archivo.tell()
+    posicion = archivo.seek(0, os.SEEK_END)
+
+    datos = b''
+    lineas = []
+    while posicion > inicio_datos:
+        paso = min(TAMANO_BLOQUE_COLA, posicion - inicio_datos)
+        posicion -= paso
+        archivo.seek(posicion)
+        datos = archivo.read(paso) + datos
+
+        # La primera línea del bloque puede estar incompleta salvo que se haya llegado a los datos
+        lineas = [linea for linea in datos.splitlines() if linea.strip()]
+        completas = lineas if posicion == inicio_datos else lineas[1:]
+        if len(completas) >= filas:
+            lineas = completas
+            break
+
+    contenido = encabezado.rstrip(b'\r\n') + b'\n' + b'\n'.join(lineas[-filas:])
+    cola = pd.read_csv(io.BytesIO(contenido), usecols=columnas, encoding='utf-8-sig')
+    if 'fecha' in cola.columns:
+        cola['fecha'] = convertir_fechas(cola['fecha'])
+    return cola[columnas] if columnas else cola
+
+
+def leer_cola_parquet(archivo, filas: int = VENTANA, columnas: List[str] = None) -> pd.DataFrame:
+    """
+    Lee las últimas filas de un Parquet cargando solo los row groups finales y las columnas pedidas.
+
+    Args:
+        archivo: Ruta o archivo binario
+        filas (int): Filas finales a leer
+        columnas (List[str], optional): Columnas a conservar
+
+    Returns:
+        pd.DataFrame: Últimas filas del archivo
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(archivo)
+    grupos = []
+    acumuladas = 0
+    for grupo in reversed(range(parquet.num_row_groups)):
+        if acumuladas >= filas:
+            break
+        tabla = parquet.read_row_group(grupo, columns=columnas)
+        grupos.insert(0, tabla)
+        acumuladas += tabla.num_rows
+
+    if not grupos:
+        return parquet.schema_arrow.empty_table().to_pandas()
+    tabla = pa.concat_tables(grupos)
+    return tabla.slice(max(0, tabla.num_rows - filas)).to_pandas(date_as_object=False)
+
 
 class rnn:
     """
@@ -31,199 +169,549 @@ class rnn:
     """
 
     def __init__(self, ruta_raiz):
+        # TensorFlow se importa solo al cargar el modelo para no penalizar el arranque
+        from tensorflow.keras.models import load_model
         self.model = load_model(os.path.join(ruta_raiz, 'models/modelo_forecast.keras'))
         self.scaler  = joblib.load(os.path.join(ruta_raiz,'models/scaler.pkl'))
-        # Diccionario invertido para obtener nombre por índice
+
+        # Parámetros del escalador persistido en el orden de entrada del modelo
+        # (el escalador se ajustó con otro orden de columnas, ver feature_names_in_)
+        orden = [list(self.scaler.feature_names_in_).index(columna) for columna in COLUMNAS_MODELO]
+        self.escala_modelo = self.scaler.scale_[orden].astype(np.float32)
+        self.minimo_modelo = self.scaler.min_[orden].astype(np.float32)
+        self.escala_inversa_modelo = (1.0 / self.scaler.scale_[orden]).astype(np.float32)
+        self.indice_produccion = COLUMNAS_MODELO.index('produccion')
+
+        # PNG del dashboard por hash de la entrada
+        self._graficos_png = OrderedDict()
+
+    def _escalar(self, valores: np.ndarray) -> np.ndarray:
+        """
+        Escala (..., 4) en el orden de COLUMNAS_MODELO con el escalador persistido:
+        una multiplicación y una suma sobre todo el tensor, sin copias intermedias
+        """
+        escalados = np.multiply(valores, self.escala_modelo, dtype=np.float32)
+        escalados += self.minimo_modelo
+        return escalados
+
+    def _desescalar(self, escalados: np.ndarray) -> np.ndarray:
+        """
+        Inversa de _escalar, equivalente a MinMaxScaler.inverse_transform: (x - min_) / scale_
+        """
+        valores = np.subtract(escalados, self.minimo_modelo, dtype=np.float32)
+        valores *= self.escala_inversa_modelo
+        return valores
 
     def obtener_prediccion(self,df: pd.DataFrame):
-        # Obtener solo la fecha más reciente
-        fecha_mas_reciente = pd.to_datetime(df['fecha'].max())
+        # Fecha más reciente más un mes, comparando fechas y no texto
+        nueva_fecha = fecha_siguiente(df)
+
+        forecast_df_prueba = self._pronostico_dataframe(df, nueva_fecha)
+
+        fig = self._crear_graficos_dinamicos(df,forecast_df_prueba)
+        return fig
 
-        # Sumar un mes a la fecha más reciente
-        nueva_fecha = fecha_mas_reciente + pd.DateOffset(months=1)
-        df_aux = df.copy()
+    def obtener_datos_pronostico(self, df: pd.DataFrame) -> dict:
+        """
+        Pronóstico y datos para graficar, sin construir figuras: lo que necesita un gráfico
+        nativo (Streamlit/Altair) para dibujarse en el navegador.
+
+        Args:
+            df (pd.DataFrame): Historia con fecha y COLUMNAS_MODELO
+
+        Returns:
+            dict: 'forecast' (DataFrame indexado por mes), 'serie' (histórico y predicción en
+            formato largo: periodo, fecha, produccion, serie) y 'promedio' de la producción histórica
+        """
+        forecast_df = self.obtener_prediccion_api(df)
+
+        historico = pd.DataFrame({
+            'fecha': convertir_fechas(df['fecha']).to_numpy(),
+            'produccion': df['produccion'].to_numpy(dtype=np.float64),
+            'serie': 'Histórico'
+        })
+        prediccion = pd.DataFrame({
+            'fecha': forecast_df.index,
+            'produccion': forecast_df['Forecast'].to_numpy(dtype=np.float64),
+            'serie': 'Predicción'
+        })
+        serie = pd.concat([historico, prediccion], ignore_index=True)
+        serie.insert(0, 'periodo', np.arange(len(serie)))
+
+        return {
+            'forecast': forecast_df,
+            'serie': serie,
+            'promedio': float(historico['produccion'].mean())
+        }
+
+    def obtener_grafico_png(self, df: pd.DataFrame, dpi: int = 80) -> bytes:
+        """
+        Dashboard Matplotlib como PNG, en caché por hash de la entrada: la misma historia no
+        se vuelve a pronosticar ni a dibujar
+
+        Args:
+            df (pd.DataFrame): Historia con fecha y COLUMNAS_MODELO
+            dpi (int): Resolución de la imagen
+
+        Returns:
+            bytes: Imagen PNG
+        """
+        clave = (huella_entrada(df), dpi)
+        if clave in self._graficos_png:
+            self._graficos_png.move_to_end(clave)
+            return self._graficos_png[clave]
+
+        fig = self.obtener_prediccion(df)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=dpi)
+        fig.clear()
+
+        self._graficos_png[clave] = buffer.getvalue()
+        while len(self._graficos_png) > MAXIMO_GRAFICOS_CACHE:
+            self._graficos_png.popitem(last=False)
+        return self._graficos_png[clave]
 
-        df = df[['lluvia', 'humedad', 'temperatura', 'produccion']]
+    def _crear_graficos_dinamicos(self, df, forecast_df_prueba):
+        """
+        Gráficos mejorados y dinámicos. La figura no se registra en pyplot: se libera cuando
+        deja de usarse, sin plt.close, y el estilo no altera la configuración global
+        """
+        from matplotlib import pyplot as plt
+        from matplotlib.figure import Figure
 
-        full_scaler_prediccion = MinMaxScaler()
-        scaled_full_data_prediccion = full_scaler_prediccion.fit_transform(df)
+        # Configurar estilo moderno
+        with plt.style.context('seaborn-v0_8-whitegrid'):
+            # Crear figura más grande y atractiva
+            fig = Figure(figsize=(18, 12), facecolor='white')
+            ((ax1, ax2), (ax3, ax4)) = fig.subplots(2, 2)
+
+            # Colores modernos
+            color_produccion = '#2E86AB'  # Azul moderno
+            color_forecast = '#A23B72'  # Rosa/magenta
+
+            # 1. Gráfico de Producción con área rellena
+            ax1.fill_between(range(len(df)), df['produccion'], alpha=0.3, color=color_produccion)
+            ax1.plot(df['produccion'], linewidth=3, color=color_produccion,
+                     marker='o', markersize=8, markerfacecolor='white',
+                     markeredgecolor=color_produccion, markeredgewidth=2)
+            ax1.set_title('📈 Producción Histórica', fontsize=16, fontweight='bold', pad=20)
+            ax1.set_xlabel('Período', fontweight='bold')
+            ax1.set_ylabel('Producción (toneladas)', fontweight='bold')
+            ax1.grid(True, alpha=0.3, linestyle='--')
+
+            # Añadir estadísticas
+            media = df['produccion'].mean()
+            ax1.axhline(y=media, color='red', linestyle='--', alpha=0.7, linewidth=2)
+            ax1.text(0.02, 0.98, f'📊 Promedio: {media:.1f}', transform=ax1.transAxes,
+                     verticalalignment='top', bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
+
+            # 2. Gráfico de Forecast mejorado
+            x_forecast = range(len(forecast_df_prueba))
+            y_forecast = forecast_df_prueba['Forecast'].values
+
+            ax2.fill_between(x_forecast, y_forecast, alpha=0.4, color=color_forecast)
+            ax2.plot(x_forecast, y_forecast, linewidth=3, color=color_forecast,
+                     marker='s', markersize=8, markerfacecolor='white',
+                     markeredgecolor=color_forecast, markeredgewidth=2)
+
+            ax2.set_title('🔮 Predicción Futura', fontsize=16, fontweight='bold', pad=20)
+            ax2.set_xlabel('Meses Futuros', fontweight='bold')
+            ax2.set_ylabel('Producción Predicha (toneladas)', fontweight='bold')
+            ax2.grid(True, alpha=0.3, linestyle='--')
+
+            # Etiquetas de meses
+            meses = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun',
+                     'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+            ax2.set_xticks(range(len(forecast_df_prueba)))
+            ax2.set_xticklabels(meses[:len(forecast_df_prueba)], rotation=45)
+
+            # 3. Gráfico con tendencia
+            ax3.fill_between(range(len(df)), df['produccion'], alpha=0.3, color=color_produccion)
+            ax3.plot(df['produccion'], linewidth=3, color=color_produccion,
+                     marker='o', markersize=8, markerfacecolor='white',
+                     markeredgecolor=color_produccion, markeredgewidth=2)
+            ax3.set_title('📊 Producción Histórica (Copia)', fontsize=16, fontweight='bold', pad=20)
+            ax3.set_xlabel('Período', fontweight='bold')
+            ax3.set_ylabel('Producción (toneladas)', fontweight='bold')
+            ax3.grid(True, alpha=0.3, linestyle='--')
+
+            # 4. Gráfico combinado mejorado
+            # Datos históricos
+            x_hist = range(len(df))
+            ax4.fill_between(x_hist, df['produccion'], alpha=0.3, color=color_produccion, label='Histórico')
+            ax4.plot(x_hist, df['produccion'], linewidth=3, color=color_produccion,
+                     marker='o', markersize=8, markerfacecolor='white',
+                     markeredgecolor=color_produccion, markeredgewidth=2)
+
+            # Datos de predicción
+            x_pred = range(len(df), len(df) + len(forecast_df_prueba))
+            ax4.fill_between(x_pred, y_forecast, alpha=0.4, color=color_forecast, label='Predicción')
+            ax4.plot(x_pred, y_forecast, linewidth=3, color=color_forecast,
+                     marker='s', markersize=8, markerfacecolor='white',
+                     markeredgecolor=color_forecast, markeredgewidth=2)
+
+            # Línea de conexión
+            ax4.plot([len(df) - 1, len(df)], [df['produccion'].iloc[-1], y_forecast[0]],
+                     color='gray', linestyle=':', linewidth=2, alpha=0.7)
+
+            ax4.set_title('🔄 Histórico vs Predicción', fontsize=16, fontweight='bold', pad=20)
+            ax4.set_xlabel('Período Total', fontweight='bold')
+            ax4.set_ylabel('Producción (toneladas)', fontweight='bold')
+            ax4.grid(True, alpha=0.3, linestyle='--')
+            ax4.legend(loc='upper left', frameon=True, fancybox=True, shadow=True)
+
+            # Línea vertical para separar histórico de predicción
+            ax4.axvline(x=len(df) - 0.5, color='red', linestyle='--', alpha=0.5, linewidth=2)
+            ax4.text(len(df) - 0.5, ax4.get_ylim()[1] * 0.9, 'Inicio Predicción',
+                     rotation=90, verticalalignment='top', horizontalalignment='right',
+                     bbox=dict(boxstyle='round', facecolor='yellow', alpha=0.7))
+
+            # Mejorar aspecto general
+            for ax in [ax1, ax2, ax3, ax4]:
+                ax.spines['top'].set_visible(False)
+                ax.spines['right'].set_visible(False)
+                ax.spines['left'].set_linewidth(0.5)
+                ax.spines['bottom'].set_linewidth(0.5)
+
+            fig.suptitle('🚀 Dashboard de Predicción de Producción de Papa',
+                         fontsize=20, fontweight='bold', y=0.98)
+
+            fig.tight_layout()
+        return fig
 
-        forecast = []
+    def _pronosticar(self, ventanas_escaladas: np.ndarray, periodos: int = 12) -> np.ndarray:
+        """
+        Pronóstico multistep con ventana rodante sobre un lote de ventanas ya escaladas.
 
-        periodos = 12  # Indicamos el número de periodos en base a la longitud del forecast deseada (12 meses)
+        Args:
+            ventanas_escaladas (np.ndarray): (n, VENTANA, 4)
+            periodos (int): Meses a pronosticar (12 por defecto, largo del forecast deseado)
 
-        primer_batch = scaled_full_data_prediccion[-12:]
-        batch_actual = primer_batch.reshape((1, 12, 4))
+        Returns:
+            np.ndarray: Pronóstico escalado (n, periodos)
+        """
+        batch_actual = np.array(ventanas_escaladas, dtype=np.float32)
+        forecast = np.empty((len(batch_actual), periodos), dtype=np.float32)
 
         for i in range(periodos):
-            pred_actual = self.model.predict(batch_actual)[0]
-            forecast.append(pred_actual)
+            # Llamada directa al modelo: todo el lote en una sola ejecución, sin el costo fijo de predict()
+            pred_actual = self.model(batch_actual, training=False).numpy()[:, 0]
+            forecast[:, i] = pred_actual
 
-            # Actualizar batch_actual de forma más simple
+            # Desplazar la ventana y repetir la predicción en las 4 variables, como en el entrenamiento
             batch_actual = np.roll(batch_actual, -1, axis=1)
-            batch_actual[0, -1, :] = pred_actual
+            batch_actual[:, -1, :] = pred_actual[:, np.newaxis]
 
-        forecast = np.array(forecast)
+        return forecast
 
-        # Extraer parámetros de la primera variable del scaler original
-        min_val = self.scaler.min_[0]
-        scale_val = self.scaler.scale_[0]
+    def _desescalar_produccion(self, forecast: np.ndarray) -> np.ndarray:
+        # La predicción se repite en las 4 variables; se desescala en bloque y se toma la producción
+        return self._desescalar(
+            np.repeat(forecast[..., np.newaxis], len(COLUMNAS_MODELO), axis=-1))[..., self.indice_produccion]
 
-        # Aplicar inverse transform manualmente
-        forecast_original = (forecast / scale_val) + min_val
+    def _forecast_a_dataframe(self, forecast: np.ndarray, nueva_fecha) -> pd.DataFrame:
+        forecast_original = self._desescalar_produccion(forecast)
 
-        forecast_index_prueba = pd.date_range(start=nueva_fecha, periods=12, freq='MS')  #MS = Monthly Start
-        forecast_df_prueba = pd.DataFrame(data=forecast_original, index=forecast_index_prueba,
-                                          columns=['Forecast'])
+        forecast_index_prueba = pd.date_range(start=nueva_fecha, periods=len(forecast), freq='MS')  #MS = Monthly Start
+        return pd.DataFrame(data=forecast_original, index=forecast_index_prueba, columns=['Forecast'])
 
-        fig = self._crear_graficos_dinamicos(df_aux,forecast_df_prueba)
-        return fig
-
-    def _crear_graficos_dinamicos(self, df, forecast_df_prueba):
-        """Gráficos mejorados y dinámicos"""
+    def _pronostico_dataframe(self, df: pd.DataFrame, nueva_fecha) -> pd.DataFrame:
+        # Solo la ventana final entra al modelo, escalada con el escalador persistido
+        if len(df) < VENTANA:
+            raise ValueError(f"Se requieren al menos {VENTANA} filas de historia, se recibieron {len(df)}")
 
-        # Configurar estilo moderno
-        plt.style.use('seaborn-v0_8-whitegrid')
-
-        # Crear figura más grande y atractiva
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(18, 12),
-                                                     facecolor='white')
-
-        # Colores modernos
-        color_produccion = '#2E86AB'  # Azul moderno
-        color_forecast = '#A23B72'  # Rosa/magenta
-
-        # 1. Gráfico de Producción con área rellena
-        ax1.fill_between(range(len(df)), df['produccion'], alpha=0.3, color=color_produccion)
-        ax1.plot(df['produccion'], linewidth=3, color=color_produccion,
-                 marker='o', markersize=8, markerfacecolor='white',
-                 markeredgecolor=color_produccion, markeredgewidth=2)
-        ax1.set_title('📈 Producción Histórica', fontsize=16, fontweight='bold', pad=20)
-        ax1.set_xlabel('Período', fontweight='bold')
-        ax1.set_ylabel('Producción (toneladas)', fontweight='bold')
-        ax1.grid(True, alpha=0.3, linestyle='--')
-
-        # Añadir estadísticas
-        media = df['produccion'].mean()
-        ax1.axhline(y=media, color='red', linestyle='--', alpha=0.7, linewidth=2)
-        ax1.text(0.02, 0.98, f'📊 Promedio: {media:.1f}', transform=ax1.transAxes,
-                 verticalalignment='top', bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
-
-        # 2. Gráfico de Forecast mejorado
-        x_forecast = range(len(forecast_df_prueba))
-        y_forecast = forecast_df_prueba['Forecast'].values
-
-        ax2.fill_between(x_forecast, y_forecast, alpha=0.4, color=color_forecast)
-        ax2.plot(x_forecast, y_forecast, linewidth=3, color=color_forecast,
-                 marker='s', markersize=8, markerfacecolor='white',
-                 markeredgecolor=color_forecast, markeredgewidth=2)
-
-        ax2.set_title('🔮 Predicción Futura', fontsize=16, fontweight='bold', pad=20)
-        ax2.set_xlabel('Meses Futuros', fontweight='bold')
-        ax2.set_ylabel('Producción Predicha (toneladas)', fontweight='bold')
-        ax2.grid(True, alpha=0.3, linestyle='--')
-
-        # Etiquetas de meses
-        meses = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun',
-                 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
-        ax2.set_xticks(range(len(forecast_df_prueba)))
-        ax2.set_xticklabels(meses[:len(forecast_df_prueba)], rotation=45)
-
-        # 3. Gráfico con tendencia
-        ax3.fill_between(range(len(df)), df['produccion'], alpha=0.3, color=color_produccion)
-        ax3.plot(df['produccion'], linewidth=3, color=color_produccion,
-                 marker='o', markersize=8, markerfacecolor='white',
-                 markeredgecolor=color_produccion, markeredgewidth=2)
-        ax3.set_title('📊 Producción Histórica (Copia)', fontsize=16, fontweight='bold', pad=20)
-        ax3.set_xlabel('Período', fontweight='bold')
-        ax3.set_ylabel('Producción (toneladas)', fontweight='bold')
-        ax3.grid(True, alpha=0.3, linestyle='--')
-
-        # 4. Gráfico combinado mejorado
-        # Datos históricos
-        x_hist = range(len(df))
-        ax4.fill_between(x_hist, df['produccion'], alpha=0.3, color=color_produccion, label='Histórico')
-        ax4.plot(x_hist, df['produccion'], linewidth=3, color=color_produccion,
-                 marker='o', markersize=8, markerfacecolor='white',
-                 markeredgecolor=color_produccion, markeredgewidth=2)
-
-        # Datos de predicción
-        x_pred = range(len(df), len(df) + len(forecast_df_prueba))
-        ax4.fill_between(x_pred, y_forecast, alpha=0.4, color=color_forecast, label='Predicción')
-        ax4.plot(x_pred, y_forecast, linewidth=3, color=color_forecast,
-                 marker='s', markersize=8, markerfacecolor='white',
-                 markeredgecolor=color_forecast, markeredgewidth=2)
-
-        # Línea de conexión
-        ax4.plot([len(df) - 1, len(df)], [df['produccion'].iloc[-1], y_forecast[0]],
-                 color='gray', linestyle=':', linewidth=2, alpha=0.7)
-
-        ax4.set_title('🔄 Histórico vs Predicción', fontsize=16, fontweight='bold', pad=20)
-        ax4.set_xlabel('Período Total', fontweight='bold')
-        ax4.set_ylabel('Producción (toneladas)', fontweight='bold')
-        ax4.grid(True, alpha=0.3, linestyle='--')
-        ax4.legend(loc='upper left', frameon=True, fancybox=True, shadow=True)
-
-        # Línea vertical para separar histórico de predicción
-        ax4.axvline(x=len(df) - 0.5, color='red', linestyle='--', alpha=0.5, linewidth=2)
-        ax4.text(len(df) - 0.5, ax4.get_ylim()[1] * 0.9, 'Inicio Predicción',
-                 rotation=90, verticalalignment='top', horizontalalignment='right',
-                 bbox=dict(boxstyle='round', facecolor='yellow', alpha=0.7))
-
-        # Mejorar aspecto general
-        for ax in [ax1, ax2, ax3, ax4]:
-            ax.spines['top'].set_visible(False)
-            ax.spines['right'].set_visible(False)
-            ax.spines['left'].set_linewidth(0.5)
-            ax.spines['bottom'].set_linewidth(0.5)
-
-        fig.suptitle('🚀 Dashboard de Predicción de Producción de Papa',
-                     fontsize=20, fontweight='bold', y=0.98)
-
-        plt.tight_layout()
-        return fig
+        ventana = df[COLUMNAS_MODELO].to_numpy(dtype=np.float32)[-VENTANA:]
+        forecast = self._pronosticar(self._escalar(ventana)[np.newaxis])
+        return self._forecast_a_dataframe(forecast[0], nueva_fecha)
 
     def obtener_prediccion_api(self,df: pd.DataFrame):
-        # Obtener solo la fecha más reciente
-        fecha_mas_reciente = pd.to_datetime(df['fecha'].max())
+        # Fecha más reciente más un mes, comparando fechas y no texto
+        nueva_fecha = fecha_siguiente(df)
+
+        return self._pronostico_dataframe(df, nueva_fecha)
+
+    def obtener_prediccion_api_ventana(self, ventana: pd.DataFrame) -> pd.DataFrame:
+        """
+        Pronóstico a partir de solo las últimas filas de la historia (ordenada por fecha).
+        El costo no depende del largo del archivo.
+
+        Args:
+            ventana (pd.DataFrame): Al menos VENTANA filas con fecha y COLUMNAS_MODELO
+
+        Returns:
+            pd.DataFrame: Columna 'Forecast' indexada por mes
+        """
+        ventana = ventana.iloc[-VENTANA:]
+        return self._pronostico_dataframe(ventana, fecha_siguiente(ventana))
+
+    def _perturbar_ventana(self, ventana: np.ndarray, escenarios: Union[int, np.ndarray],
+                           ruido: float, semilla=None) -> np.ndarray:
+        """
+        Copias perturbadas de una ventana (VENTANA, 4) en unidades originales.
+
+        Args:
+            ventana (np.ndarray): Ventana sin escalar
+            escenarios (int | np.ndarray): K copias con ruido gaussiano relativo en las variables
+                climáticas, o factores multiplicativos (K, 4) por variable en el orden de COLUMNAS_MODELO
+            ruido (float): Desviación relativa del ruido cuando escenarios es un entero
+            semilla (int, optional): Semilla del generador
+
+        Returns:
+            np.ndarray: (K, VENTANA, 4)
+        """
+        if np.ndim(escenarios) == 0:
+            generador = np.random.default_rng(semilla)
+            factores = 1.0 + generador.normal(0.0, ruido, size=(int(escenarios),) + ventana.shape)
+            # La producción histórica es un dato observado: solo varía el clima
+            factores[..., self.indice_produccion] = 1.0
+        else:
+            factores = np.asarray(escenarios, dtype=np.float64)
+            if factores.ndim != 2 or factores.shape[1] != len(COLUMNAS_MODELO):
+                raise ValueError(f"Los escenarios deben tener forma (K, {len(COLUMNAS_MODELO)})")
+            factores = factores[:, np.newaxis, :]
+
+        return (ventana[np.newaxis] * factores).astype(np.float32)
+
+    def obtener_prediccion_ensamble(self, df: pd.DataFrame, escenarios: Union[int, np.ndarray] = 100,
+                                    ruido: float = 0.05, cuantiles: Sequence[float] = (0.1, 0.5, 0.9),
+                                    semilla=None) -> pd.DataFrame:
+        """
+        Pronóstico con bandas: la ventana original y K copias perturbadas pasan juntas como un
+        solo lote por el bucle rodante, de modo que K escenarios cuestan casi lo mismo que uno.
+
+        Args:
+            df (pd.DataFrame): Historia con fecha y COLUMNAS_MODELO, ordenada por fecha
+            escenarios (int | np.ndarray): Número de escenarios con ruido o factores (K, 4)
+            ruido (float): Desviación relativa del ruido climático
+            cuantiles (Sequence[float]): Cuantiles de las bandas
+            semilla (int, optional): Semilla para resultados reproducibles
+
+        Returns:
+            pd.DataFrame: 'Forecast' sin perturbar y una columna por cuantil (q10, q50, q90...)
+        """
+        if len(df) < VENTANA:
+            raise ValueError(f"Se requieren al menos {VENTANA} filas de historia, se recibieron {len(df)}")
+
+        nueva_fecha = fecha_siguiente(df)
+        ventana = df[COLUMNAS_MODELO].to_numpy(dtype=np.float32)[-VENTANA:]
+
+        ventanas = np.concatenate([ventana[np.newaxis],
+                                   self._perturbar_ventana(ventana, escenarios, ruido, semilla)])
+        forecast = self._desescalar_produccion(self._pronosticar(self._escalar(ventanas)))
+
+        resultado = pd.DataFrame({'Forecast': forecast[0]},
+                                 index=pd.date_range(start=nueva_fecha, periods=forecast.shape[1], freq='MS'))
+        bandas = np.quantile(forecast[1:], cuantiles, axis=0)
+        for cuantil, banda in zip(cuantiles, bandas):
+            resultado[f'q{round(cuantil * 100):02d}'] = banda
+        return resultado
+
+    def medir_costo_ensamble(self, df: pd.DataFrame, valores_k: Sequence[int] = (1, 10, 100, 1000),
+                             repeticiones: int = 3) -> pd.DataFrame:
+        """
+        Tiempo del modo de ensamble según el número de escenarios
+
+        Returns:
+            pd.DataFrame: k, segundos (mediana) y costo relativo a un solo pronóstico
+        """
+        self.obtener_prediccion_api(df)  # Calentamiento: la primera llamada traza el modelo
+
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            self.obtener_prediccion_api(df)
+        base = (time.perf_counter() - inicio) / repeticiones
+
+        filas = []
+        for k in valores_k:
+            self.obtener_prediccion_ensamble(df, k, semilla=0)
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                self.obtener_prediccion_ensamble(df, k, semilla=0)
+                tiempos.append(time.perf_counter() - inicio)
+            segundos = float(np.median(tiempos))
+            filas.append({'k': k, 'segundos': round(segundos, 4), 'relativo': round(segundos / base, 2)})
+        return pd.DataFrame(filas)
+
+    @staticmethod
+    def leer_ventana(archivo, nombre: str) -> pd.DataFrame:
+        """
+        Lee solo la ventana final y las columnas que usa el modelo. CSV se recorre desde el
+        final y Parquet carga solo los últimos row groups; Excel no admite lectura parcial.
+
+        Args:
+            archivo: Ruta o archivo binario con acceso aleatorio
+            nombre (str): Nombre del archivo, para determinar el formato
+
+        Returns:
+            pd.DataFrame: Últimas VENTANA filas con fecha y COLUMNAS_MODELO
+        """
+        columnas = ['fecha'] + COLUMNAS_MODELO
+        if nombre.endswith('.csv'):
+            if isinstance(archivo, str):
+                with open(archivo, 'rb') as f:
+                    return leer_cola_csv(f, VENTANA, columnas)
+            return leer_cola_csv(archivo, VENTANA, columnas)
+        if nombre.endswith('.parquet'):
+            return leer_cola_parquet(archivo, VENTANA, columnas)
+        return pd.read_excel(archivo, usecols=columnas).iloc[-VENTANA:]
+
+
+def _pronostico_sklearn(modelo: 'rnn', df: pd.DataFrame):
+    """
+    Camino de referencia, independiente del escalado vectorizado: scaler.transform de sklearn
+    sobre las columnas en el orden del escalador, el bucle de pronóstico original paso a paso y
+    scaler.inverse_transform
 
-        # Sumar un mes a la fecha más reciente
-        nueva_fecha = fecha_mas_reciente + pd.DateOffset(months=1)
-        df_aux = df.copy()
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Ventana escalada (VENTANA, 4) y pronóstico de producción (12,)
+    """
+    nombres = list(modelo.scaler.feature_names_in_)
+    orden = [nombres.index(columna) for columna in COLUMNAS_MODELO]
+    ventana_referencia = modelo.scaler.transform(df[nombres])[-VENTANA:][:, orden]
 
-        df = df[['lluvia', 'humedad', 'temperatura', 'produccion']]
+    batch_actual = ventana_referencia.reshape((1, VENTANA, len(COLUMNAS_MODELO)))
+    forecast = []
+    for i in range(12):
+        pred_actual = modelo.model.predict(batch_actual, verbose=0)[0]
+        forecast.append(pred_actual)
+        batch_actual = np.roll(batch_actual, -1, axis=1)
+        batch_actual[0, -1, :] = pred_actual
 
-        full_scaler_prediccion = MinMaxScaler()
-        scaled_full_data_prediccion = full_scaler_prediccion.fit_transform(df)
+    repetido = np.repeat(np.array(forecast), len(nombres), axis=1)
+    forecast_referencia = modelo.scaler.inverse_transform(pd.DataFrame(repetido, columns=nombres))[
+        :, nombres.index('produccion')]
+    return ventana_referencia, forecast_referencia
 
-        forecast = []
 
-        periodos = 12  # Indicamos el número de periodos en base a la longitud del forecast deseada (12 meses)
+def _huella_archivo(ruta: str) -> str:
+    with open(ruta, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
 
-        primer_batch = scaled_full_data_prediccion[-12:]
-        batch_actual = primer_batch.reshape((1, 12, 4))
 
-        for i in range(periodos):
-            pred_actual = self.model.predict(batch_actual)[0]
-            forecast.append(pred_actual)
+def _rutas_referencia(ruta_raiz: str) -> dict:
+    return {
+        'csv': os.path.join(ruta_raiz, 'data', 'processed', 'RNN', 'rnn_produccion.csv'),
+        'referencia': os.path.join(ruta_raiz, 'data', 'processed', 'RNN', 'rnn_produccion_pronostico.json'),
+        'modelo': os.path.join(ruta_raiz, 'models', 'modelo_forecast.keras'),
+        'escalador': os.path.join(ruta_raiz, 'models', 'scaler.pkl')
+    }
 
-            # Actualizar batch_actual de forma más simple
-            batch_actual = np.roll(batch_actual, -1, axis=1)
-            batch_actual[0, -1, :] = pred_actual
 
-        forecast = np.array(forecast)
+def registrar_pronostico_referencia(ruta_raiz: str) -> str:
+    """
+    Guarda el pronóstico de referencia (_pronostico_sklearn) de rnn_produccion.csv junto con las
+    huellas del CSV, el modelo y el escalador. Solo debe regenerarse al cambiar alguno de ellos.
+
+    Returns:
+        str: Ruta del archivo de referencia
+    """
+    rutas = _rutas_referencia(ruta_raiz)
+    df = pd.read_csv(rutas['csv'])
+    _, forecast = _pronostico_sklearn(rnn(ruta_raiz), df)
+    fechas = pd.date_range(fecha_siguiente(df), periods=12, freq='MS')
 
-        # Extraer parámetros de la primera variable del scaler original
-        min_val = self.scaler.min_[0]
-        scale_val = self.scaler.scale_[0]
+    with open(rutas['referencia'], 'w', encoding='utf-8') as f:
+        json.dump({
+            'huellas_sha1': {clave: _huella_archivo(rutas[clave]) for clave in ('csv', 'modelo', 'escalador')},
+            'fechas': [fecha.strftime('%Y-%m-%d') for fecha in fechas],
+            'forecast': [float(valor) for valor in forecast]
+        }, f, indent=2)
+    return rutas['referencia']
 
-        # Aplicar inverse transform manualmente
-        forecast_original = (forecast / scale_val) + min_val
 
-        forecast_index_prueba = pd.date_range(start=nueva_fecha, periods=12, freq='MS')  #MS = Monthly Start
-        forecast_df_prueba = pd.DataFrame(data=forecast_original, index=forecast_index_prueba,
-                                          columns=['Forecast'])
+def verificar_paridad_escalador(ruta_raiz: str, tolerancia: float = 1e-4) -> dict:
+    """
+    Verificación de regresión del pronóstico sobre data/processed/RNN/rnn_produccion.csv:
+    la ventana escalada se compara con scaler.transform de sklearn, y el pronóstico de
+    obtener_prediccion_api con los valores registrados en rnn_produccion_pronostico.json
 
+    Args:
+        ruta_raiz (str): Directorio raíz del proyecto
+        tolerancia (float): Diferencia absoluta máxima aceptada en la ventana y en el pronóstico
 
-        return forecast_df_prueba
+    Returns:
+        dict: Diferencias máximas de la ventana escalada y del pronóstico, y si hay paridad
+    """
+    rutas = _rutas_referencia(ruta_raiz)
+    with open(rutas['referencia'], 'r', encoding='utf-8') as f:
+        referencia = json.load(f)
+
+    # Un modelo, escalador o CSV distinto invalida los valores registrados
+    for clave, huella in referencia['huellas_sha1'].items():
+        if _huella_archivo(rutas[clave]) != huella:
+            raise ValueError(f"{rutas[clave]} cambió desde que se registró la referencia; "
+                             f"regenérela con --registrar-referencia")
+
+    modelo = rnn(ruta_raiz)
+    df = pd.read_csv(rutas['csv'])
+    nombres = list(modelo.scaler.feature_names_in_)
+    ventana_referencia = modelo.scaler.transform(df[nombres])[-VENTANA:][
+        :, [nombres.index(columna) for columna in COLUMNAS_MODELO]]
+    ventana = modelo._escalar(df[COLUMNAS_MODELO].to_numpy(dtype=np.float32)[-VENTANA:])
+    pronostico = modelo.obtener_prediccion_api(df)
+
+    diferencia_ventana = float(np.abs(ventana - ventana_referencia).max())
+    diferencia_forecast = float(np.abs(pronostico['Forecast'].to_numpy() - np.array(referencia['forecast'])).max())
+    fechas_iguales = [fecha.strftime('%Y-%m-%d') for fecha in pronostico.index] == referencia['fechas']
+    return {
+        'diferencia_ventana': diferencia_ventana,
+        'diferencia_forecast': diferencia_forecast,
+        'fechas_iguales': fechas_iguales,
+        'paridad': diferencia_ventana <= tolerancia and diferencia_forecast <= tolerancia and fechas_iguales
+    }
+
+
+def verificar_lectura_ventana(ruta_raiz: str) -> dict:
+    """
+    Comprueba que la lectura de solo la ventana final (leer_cola_csv) dé las mismas fechas y el
+    mismo pronóstico que la historia completa, con rnn_produccion.csv escrito en cada formato
+    de FORMATOS_FECHA_CSV
+
+    Args:
+        ruta_raiz (str): Directorio raíz del proyecto
 
+    Returns:
+        dict: Por formato, si coinciden las fechas de la ventana y las del pronóstico
+    """
+    modelo = rnn(ruta_raiz)
+    df = pd.read_csv(_rutas_referencia(ruta_raiz)['csv'])
+    df['fecha'] = convertir_fechas(df['fecha'])
+    completo = modelo.obtener_prediccion_api(df)
+
+    resultado = {}
+    for formato in FORMATOS_FECHA_CSV:
+        archivo = io.BytesIO(df.to_csv(index=False, date_format=formato).encode('utf-8'))
+        ventana = leer_cola_csv(archivo, VENTANA, ['fecha'] + COLUMNAS_MODELO)
+        pronostico = modelo.obtener_prediccion_api_ventana(ventana)
+        resultado[formato] = bool(ventana['fecha'].equals(df['fecha'].iloc[-VENTANA:].reset_index(drop=True))
+                                  and pronostico.index.equals(completo.index))
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verificaciones del pronóstico RNN")
+    parser.add_argument('--directorio-base', default='.', help="Directorio raíz del proyecto")
+    parser.add_argument('--costo-ensamble', action='store_true',
+                        help="Medir el costo del modo de ensamble según el número de escenarios")
+    parser.add_argument('--registrar-referencia', action='store_true',
+                        help="Registrar el pronóstico de referencia (solo tras cambiar modelo, escalador o CSV)")
+    argumentos = parser.parse_args()
+
+    ruta_raiz = os.path.abspath(argumentos.directorio_base)
+    if argumentos.costo_ensamble:
+        df = pd.read_csv(os.path.join(ruta_raiz, 'data', 'processed', 'RNN', 'rnn_produccion.csv'))
+        print(rnn(ruta_raiz).medir_costo_ensamble(df).to_string(index=False))
+    elif argumentos.registrar_referencia:
+        print(f"Referencia guardada en {registrar_pronostico_referencia(ruta_raiz)}")
+    else:
+        resultado = verificar_paridad_escalador(ruta_raiz)
+        lectura_ventana = verificar_lectura_ventana(ruta_raiz)
+        print(resultado)
+        print(lectura_ventana)
+        if not resultado['paridad'] or not all(lectura_ventana.values()):
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
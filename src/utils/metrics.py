@@ -10,6 +10,8 @@ Cambios:
     pmarin 18-07-2025
     3. Mejoras para prevenir errores NoneType en os.stat()
     pmarin 18-07-2025
+    4. obtener_ruta_app resuelve la ruta una sola vez por proceso, con variable de entorno
+    AGROIA_RUTA_RAIZ para forzarla e invalidar_cache_ruta_app para pruebas 19-10-2026
 """
 import os
 import logging
@@ -18,6 +20,12 @@ import sys
 # Configurar logger para esta clase
 logger = logging.getLogger(__name__)
 
+# Variable de entorno que, si está definida, fija la ruta raíz sin buscarla
+VARIABLE_RUTA_RAIZ = 'AGROIA_RUTA_RAIZ'
+
+# Rutas ya resueltas por nombre_objetivo
+_cache_rutas_app = {}
+
 
 def es_azure_app_service():
     """
@@ -104,12 +112,38 @@ def obtener_ruta_app(nombre_objetivo="AgroIA"):
     Versión simplificada y robusta para Azure App Service y entornos locales
     GARANTIZA que nunca retorne None
 
+    La ruta se resuelve en la primera llamada y se memoriza para el resto del proceso.
+    Si la variable de entorno AGROIA_RUTA_RAIZ está definida, se usa directamente.
+
     Args:
         nombre_objetivo (str): Nombre de la carpeta objetivo a buscar (solo para entornos locales)
 
     Returns:
         str: Ruta completa válida (NUNCA None)
     """
+    ruta_entorno = os.environ.get(VARIABLE_RUTA_RAIZ)
+    if ruta_entorno:
+        return ruta_entorno
+
+    ruta = _cache_rutas_app.get(nombre_objetivo)
+    if ruta is None:
+        ruta = _resolver_ruta_app(nombre_objetivo)
+        _cache_rutas_app[nombre_objetivo] = ruta
+    return ruta
+
+
+def invalidar_cache_ruta_app():
+    """
+    Descarta las rutas memorizadas por obtener_ruta_app; la siguiente llamada vuelve a resolverla.
+    Pensada para pruebas o para cuando cambia el directorio de trabajo.
+    """
+    _cache_rutas_app.clear()
+
+
+def _resolver_ruta_app(nombre_objetivo="AgroIA"):
+    """
+    Resuelve la ruta raíz revisando el directorio actual, Azure App Service y el entorno local
+    """
     try:
         directorio_actual = os.getcwd()
         logger.info(f"Directorio actual: {directorio_actual}")
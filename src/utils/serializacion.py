@@ -0,0 +1,132 @@
+"""
+Clase: serializacion
+
+Objetivo: Serialización directa a bytes de las respuestas de la API (diccionarios con tipos NumPy,
+arreglos y DataFrames), sin recorrer árboles de objetos Python intermedios
+
+Cambios:
+    1. Creacion del modulo 19-10-2026
+"""
+import io
+import json
+import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional; sin él se usa json de la biblioteca estándar
+    orjson = None
+
+# Formato de las claves de fecha, igual al que producía jsonable_encoder de FastAPI
+FORMATO_FECHA = '%Y-%m-%dT%H:%M:%S'
+
+TIPO_JSON = 'application/json'
+TIPO_ARROW = 'application/vnd.apache.arrow.stream'
+TIPO_PARQUET = 'application/vnd.apache.parquet'
+
+
+class JSONCrudo(bytes):
+    """
+    Fragmento JSON ya serializado que se inserta tal cual al armar un objeto con objeto_json
+    """
+
+
+def _por_defecto(valor):
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, np.ndarray):
+        return valor.tolist()
+    if isinstance(valor, (datetime.datetime, datetime.date)):
+        return valor.strftime(FORMATO_FECHA)
+    raise TypeError(f"Tipo no serializable a JSON: {type(valor).__name__}")
+
+
+def a_json_bytes(valor: Any) -> bytes:
+    """
+    Serializa un valor a JSON UTF-8. Acepta escalares y arreglos NumPy sin convertirlos antes.
+
+    Args:
+        valor: Objeto a serializar
+
+    Returns:
+        bytes: JSON compacto
+    """
+    if orjson is not None:
+        return orjson.dumps(valor, default=_por_defecto,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(valor, default=_por_defecto, ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def dataframe_a_json(df: pd.DataFrame, orient: str = 'index') -> JSONCrudo:
+    """
+    Serializa un DataFrame con el serializador en C de pandas. Un índice de fechas se
+    formatea con FORMATO_FECHA para conservar las claves que recibían los clientes.
+
+    Args:
+        df (pd.DataFrame): Datos a serializar
+        orient (str): Orientación de pandas.DataFrame.to_json
+
+    Returns:
+        JSONCrudo: Fragmento JSON listo para objeto_json
+    """
+    if isinstance(df.index, pd.DatetimeIndex):
+        df = df.set_axis(df.index.strftime(FORMATO_FECHA), axis=0)
+    return JSONCrudo(df.to_json(orient=orient, double_precision=15, force_ascii=False).encode("utf-8"))
+
+
+def objeto_json(campos: Dict[str, Any]) -> bytes:
+    """
+    Arma un objeto JSON a partir de sus campos; los JSONCrudo se insertan sin volver a serializarse
+
+    Args:
+        campos (Dict[str, Any]): Campos del objeto en el orden de salida
+
+    Returns:
+        bytes: Objeto JSON
+    """
+    partes = [a_json_bytes(str(clave)) + b":" + (valor if isinstance(valor, JSONCrudo) else a_json_bytes(valor))
+              for clave, valor in campos.items()]
+    return b"{" + b",".join(partes) + b"}"
+
+
+def dataframe_a_arrow(df: pd.DataFrame) -> bytes:
+    """
+    DataFrame en formato Arrow IPC (stream), con el índice como columna
+    """
+    import pyarrow as pa
+
+    tabla = pa.Table.from_pandas(df, preserve_index=True)
+    sumidero = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sumidero, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    return sumidero.getvalue().to_pybytes()
+
+
+def dataframe_a_parquet(df: pd.DataFrame) -> bytes:
+    """
+    DataFrame en formato Parquet, con el índice como columna
+    """
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=True)
+    return buffer.getvalue()
+
+
+def negociar_formato(accept: Optional[str]) -> str:
+    """
+    Elige el formato de respuesta según el encabezado Accept: Arrow, Parquet o JSON por defecto.
+    Si pyarrow no está instalado siempre responde JSON.
+    """
+    accept = (accept or '').lower()
+    if TIPO_ARROW not in accept and TIPO_PARQUET not in accept and 'application/x-parquet' not in accept:
+        return TIPO_JSON
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return TIPO_JSON
+
+    return TIPO_ARROW if TIPO_ARROW in accept else TIPO_PARQUET